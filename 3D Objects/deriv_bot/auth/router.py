@@ -1,5 +1,7 @@
 # auth/router.py
 
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
@@ -12,6 +14,7 @@ from core.config import settings # Importa as configurações do sistema
 
 # Cria uma instância do APIRouter para as rotas de autenticação
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Schema para criação de usuário (registro)
 class UserCreate(BaseModel):
@@ -40,7 +43,7 @@ async def register_user(user_data: UserCreate):
     user.premium_trial_end_date = datetime.now(timezone.utc) + timedelta(days=7)
     await user.save()
 
-    print(f"DEBUG: Usuário {user.username} registrado com sucesso com trial até {user.premium_trial_end_date}.")
+    logger.debug("Usuário %s registrado com sucesso com trial até %s.", user.username, user.premium_trial_end_date)
     return user_data # Retorna os dados do usuário (sem a senha hasheada)
 
 # Helper para criar tokens de acesso JWT
@@ -75,6 +78,6 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     
-    print(f"INFO: Usuário {user.username} logado com sucesso.")
+    logger.info("Usuário %s logado com sucesso.", user.username)
     return {"access_token": access_token, "token_type": "bearer"}
 
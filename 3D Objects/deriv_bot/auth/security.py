@@ -1,3 +1,5 @@
+import logging
+
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
@@ -5,6 +7,8 @@ from core.config import settings # Importa as configurações, incluindo ENCRYPT
 from cryptography.fernet import Fernet
 import base64
 
+logger = logging.getLogger(__name__)
+
 # Contexto para hashing de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -16,7 +20,7 @@ try:
 except Exception as e:
     # Em um ambiente real, você pode querer logar isso e sair,
     # ou ter um fallback mais robusto.
-    print(f"ERRO: Chave de criptografia inválida ou ausente em settings.ENCRYPTION_KEY. {e}")
+    logger.error("Chave de criptografia inválida ou ausente em settings.ENCRYPTION_KEY. %s", e)
     # Para desenvolvimento, pode-se usar uma chave de fallback INSEGURA, mas NUNCA em produção.
     # fernet = Fernet(Fernet.generate_key()) # NÃO FAÇA ISSO EM PRODUÇÃO!
     fernet = None # Marcar como None para indicar falha na inicialização
@@ -53,13 +57,13 @@ def encrypt_data(data: str) -> str | None:
     Retorna None se Fernet não foi inicializado corretamente.
     """
     if fernet is None:
-        print("ERRO: Fernet não inicializado. Não é possível criptografar.")
+        logger.error("Fernet não inicializado. Não é possível criptografar.")
         return None
     try:
         encrypted_bytes = fernet.encrypt(data.encode('utf-8'))
         return encrypted_bytes.decode('utf-8') # Retorna como string base64
     except Exception as e:
-        print(f"ERRO ao criptografar dados: {e}")
+        logger.error("Erro ao criptografar dados: %s", e)
         return None
 
 def decrypt_data(encrypted_data: str) -> str | None:
@@ -69,12 +73,12 @@ def decrypt_data(encrypted_data: str) -> str | None:
     Retorna None se Fernet não foi inicializado corretamente ou se a descriptografia falhar.
     """
     if fernet is None:
-        print("ERRO: Fernet não inicializado. Não é possível descriptografar.")
+        logger.error("Fernet não inicializado. Não é possível descriptografar.")
         return None
     try:
         decrypted_bytes = fernet.decrypt(encrypted_data.encode('utf-8'))
         return decrypted_bytes.decode('utf-8')
     except Exception as e:
-        print(f"ERRO ao descriptografar dados: {e}. Verifique a chave de criptografia ou os dados.")
+        logger.error("Erro ao descriptografar dados: %s. Verifique a chave de criptografia ou os dados.", e)
         return None
 
@@ -0,0 +1,246 @@
+# backtest/engine.py
+
+import argparse
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from estrategia.plan import compile_plan
+from estrategia.registry import get_strategy
+from utils.indicator_cache import CandleSnapshot
+from utils.market_recorder import TICKS, read_directory, ticks_to_candles
+from utils.signal_series import SIGNAL_SELL, no_signals
+
+# Backtest vetorizado: cada estratégia calcula a série completa de sinais de uma só vez
+# (signals() em vez de analyze() vela a vela), as séries são combinadas com a mesma regra
+# OR/AND/WEIGHTED de apply_strategies (StrategyPlan.combine) e os contratos são simulados
+# um de cada vez, como no bot.
+#
+# Convenções da simulação (resolução de uma vela):
+#   - A decisão na vela i usa as velas 0..i fechadas; a entrada é ao fecho da vela i.
+#   - Só há um contrato aberto de cada vez; o próximo sinal só conta depois do fecho.
+
+DEFAULT_PAYOUT = 0.95       # Lucro por unidade de stake num CALL/PUT ganho
+TICK_SECONDS = 2            # Intervalo entre ticks do símbolo (R_100), usado no ACCUMULATOR
+ACCUMULATOR_BARRIER = 0.001  # Variação relativa entre velas que elimina um ACCUMULATOR
+ACCUMULATOR_MAX_TICKS = 230  # Duração máxima de um ACCUMULATOR, em ticks (fecha automaticamente)
+MAX_HOLD_BARS = 1440        # Velas máximas com um MULTIPLIER aberto sem TP/SL
+
+
+@dataclass
+class BacktestResult:
+    """Resultado de um backtest: sinais por estratégia, decisões combinadas e contratos simulados."""
+    settings: dict
+    strategy_signals: dict[str, np.ndarray]
+    decisions: np.ndarray
+    trades: pd.DataFrame
+    candles: int = 0
+    unknown: tuple[str, ...] = field(default_factory=tuple)
+
+    def summary(self) -> dict:
+        profits = self.trades['profit'].to_numpy() if len(self.trades) else np.zeros(0)
+        equity = np.cumsum(profits)
+        drawdown = np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity if len(equity) else np.zeros(0)
+        win_count = int((profits >= 0).sum())
+        return {
+            'candles': self.candles,
+            'trade_count': int(len(profits)),
+            'win_count': win_count,
+            'loss_count': int(len(profits) - win_count),
+            'win_rate': win_count / len(profits) if len(profits) else 0.0,
+            'total_profit_loss': float(profits.sum()),
+            'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+            'signals': {name: int(np.count_nonzero(sig)) for name, sig in self.strategy_signals.items()},
+        }
+
+
+def load_candles(source, granularity: int | None = None) -> CandleSnapshot:
+    """
+    Carrega velas históricas para o backtest.
+
+    :param source: CandleSnapshot, DataFrame, caminho para um ficheiro CSV, Parquet ou .npz
+                   (colunas epoch, open, high, low, close e, opcionalmente, volume) ou um diretório
+                   gravado pelo MarketRecorder (ex: "recordings/R_100/candles_60"; um diretório
+                   "ticks" é agregado em velas de `granularity`, por omissão 60s).
+    :param granularity: Granularidade em segundos; se omitida, é inferida dos epochs.
+    """
+    if isinstance(source, CandleSnapshot):
+        snapshot = source
+    else:
+        if isinstance(source, pd.DataFrame):
+            df = source
+        else:
+            path = str(source)
+            if os.path.isdir(path):
+                arrays = read_directory(path)
+                if os.path.basename(os.path.normpath(path)) == TICKS:
+                    granularity = granularity or 60
+                    arrays = ticks_to_candles(arrays, granularity)
+                df = pd.DataFrame(arrays)
+            elif path.endswith('.parquet'):
+                df = pd.read_parquet(path)
+            elif path.endswith('.npz'):
+                with np.load(path) as data:
+                    df = pd.DataFrame({key: data[key] for key in data.files})
+            else:
+                df = pd.read_csv(path)
+        snapshot = CandleSnapshot.from_dataframe(df)
+
+    if granularity:
+        snapshot.granularity = granularity
+    elif snapshot.granularity is None:
+        epochs = snapshot.arrays.get('epoch')
+        snapshot.granularity = int(np.median(np.diff(epochs))) if epochs is not None and len(epochs) > 1 else 60
+    if 'epoch' not in snapshot:
+        snapshot.arrays['epoch'] = np.arange(len(snapshot), dtype=np.int64) * snapshot.granularity
+    return snapshot
+
+
+def strategy_signals(snapshot: CandleSnapshot, plan) -> dict[str, np.ndarray]:
+    """Série completa de sinais de cada estratégia do plano."""
+    return {
+        step.name: get_strategy(step.name).signals(snapshot, **dict(step.params))
+        for step in plan.steps
+    }
+
+
+def _settle_callput(direction: int, i: int, close: np.ndarray, close_times: np.ndarray,
+                    stake: float, duration: int, payout: float) -> tuple[int, float] | None:
+    # Preço no fim do contrato: o fecho da última vela terminada até lá (pelo menos a seguinte)
+    j = max(int(np.searchsorted(close_times, close_times[i] + duration, side='right')) - 1, i + 1)
+    if j >= len(close):
+        return None
+    won = direction * (close[j] - close[i]) > 0  # Na Deriv, preço igual à entrada conta como perda
+    return j, stake * payout if won else -stake
+
+
+def _settle_multiplier(direction: int, i: int, close: np.ndarray, stake: float, multiplier: float,
+                       take_profit: float | None, stop_loss: float | None) -> tuple[int, float] | None:
+    path = close[i + 1:i + 1 + MAX_HOLD_BARS]
+    if len(path) == 0:
+        return None
+    pnl = stake * multiplier * direction * (path / close[i] - 1)
+    exit_now = pnl <= -stake  # Stop out: a perda nunca passa do stake
+    if take_profit:
+        exit_now |= pnl >= take_profit
+    if stop_loss:
+        exit_now |= pnl <= -stop_loss
+    k = int(np.argmax(exit_now)) if exit_now.any() else len(path) - 1
+    return i + 1 + k, max(float(pnl[k]), -stake)
+
+
+def _settle_accumulator(i: int, close: np.ndarray, high: np.ndarray, low: np.ndarray, stake: float,
+                        growth_rate: float, ticks_per_bar: float, take_profit: float | None) -> tuple[int, float] | None:
+    end = min(i + 1 + max(int(ACCUMULATOR_MAX_TICKS // ticks_per_bar), 1), len(close))
+    if end <= i + 1:
+        return None
+    prev_close = close[i:end - 1]
+    move = np.maximum(high[i + 1:end] / prev_close - 1, 1 - low[i + 1:end] / prev_close)
+    ticks = np.minimum(ticks_per_bar * np.arange(1, end - i), ACCUMULATOR_MAX_TICKS)
+    payoff = stake * ((1 + growth_rate) ** ticks - 1)
+    knocked_out = move > ACCUMULATOR_BARRIER
+    hit_tp = payoff >= take_profit if take_profit else np.zeros(len(payoff), dtype=bool)
+
+    first_ko = int(np.argmax(knocked_out)) if knocked_out.any() else len(payoff)
+    first_tp = int(np.argmax(hit_tp)) if hit_tp.any() else len(payoff)
+    if first_ko < len(payoff) and first_ko <= first_tp:
+        return i + 1 + first_ko, -stake
+    k = min(first_tp, len(payoff) - 1)
+    return i + 1 + k, float(payoff[k])
+
+
+def simulate_trades(snapshot: CandleSnapshot, decisions: np.ndarray, settings: dict,
+                    payout: float = DEFAULT_PAYOUT) -> pd.DataFrame:
+    """
+    Simula os contratos abertos pelas decisões, um de cada vez (como o BotSession).
+
+    :param settings: Configurações do utilizador (mesmas chaves de SettingsUpdate).
+    :return: DataFrame com entry_index, exit_index, entry_epoch, direction e profit de cada contrato.
+    """
+    ctype = settings.get('contract_type_to_trade') or "CALLPUT"
+    stake = float(settings.get('stake') or 1.0)
+    close, high, low = snapshot['close'], snapshot['high'], snapshot['low']
+    epochs = snapshot['epoch']
+    close_times = epochs + snapshot.granularity
+
+    if ctype == "ACCUMULATOR":
+        decisions = np.where(decisions == SIGNAL_SELL, 0, decisions)  # ACCUMULATOR não suporta 'SELL'
+    candidates = np.flatnonzero(decisions)
+    candidate_times = close_times[candidates]
+
+    rows = []
+    free_at = -np.inf  # Hora a partir da qual não há contrato aberto
+    pos = 0
+    while pos < len(candidates):
+        i = int(candidates[pos])
+        direction = int(decisions[i])
+
+        if ctype == "CALLPUT":
+            settled = _settle_callput(direction, i, close, close_times, stake,
+                                      int(settings.get('duration') or snapshot.granularity), payout)
+        elif ctype == "MULTIPLIER":
+            settled = _settle_multiplier(direction, i, close, stake,
+                                         float(settings.get('multiplier_value') or 100),
+                                         settings.get('take_profit_multiplier'), settings.get('stop_loss_multiplier'))
+        else:
+            settled = _settle_accumulator(i, close, high, low, stake,
+                                          float(settings.get('accumulator_growth_rate') or 0.02),
+                                          snapshot.granularity / TICK_SECONDS, settings.get('take_profit_accumulator'))
+        if settled is None:
+            break
+
+        exit_index, profit = settled
+        rows.append((i, exit_index, int(epochs[i]), direction, profit))
+        if ctype == "CALLPUT":
+            free_at = close_times[i] + int(settings.get('duration') or snapshot.granularity)
+        else:
+            free_at = close_times[exit_index]
+        # Próximo sinal cuja entrada (fecho da vela) é posterior ao fecho do contrato
+        pos = int(np.searchsorted(candidate_times, free_at, side='left'))
+
+    return pd.DataFrame(rows, columns=['entry_index', 'exit_index', 'entry_epoch', 'direction', 'profit'])
+
+
+def run_backtest(candles, settings: dict, payout: float = DEFAULT_PAYOUT,
+                 granularity: int | None = None) -> BacktestResult:
+    """
+    Executa o backtest de uma configuração sobre velas históricas.
+
+    :param candles: Fonte aceite por load_candles (ficheiro, DataFrame ou CandleSnapshot).
+    :param settings: Configurações do utilizador, incluindo 'estrategias_config_json',
+                     'logica_estrategia' e os parâmetros do contrato.
+    :param payout: Lucro por unidade de stake num CALL/PUT ganho.
+    :param granularity: Granularidade em segundos (por omissão, candle_granularity ou inferida).
+    :return: BacktestResult.
+    """
+    snapshot = load_candles(candles, granularity or settings.get('candle_granularity'))
+    plan = compile_plan(settings.get('estrategias_config_json'), settings.get('logica_estrategia'),
+                        settings.get('contract_type_to_trade'))
+
+    signals = strategy_signals(snapshot, plan)
+    if signals:
+        decisions = plan.combine(np.vstack(list(signals.values())))
+    else:
+        decisions = no_signals(len(snapshot))
+    # Tal como no bot, não há decisões antes do aquecimento do plano
+    decisions[:max(plan.min_candles - 1, 0)] = 0
+
+    trades = simulate_trades(snapshot, decisions, settings, payout)
+    return BacktestResult(settings, signals, decisions, trades, len(snapshot), plan.unknown)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest de uma configuração de estratégias do KingBot.")
+    parser.add_argument("candles", help="Ficheiro de velas (CSV, Parquet ou .npz) ou diretório do MarketRecorder.")
+    parser.add_argument("settings", help="Ficheiro JSON com as configurações (como em /api/user/settings).")
+    parser.add_argument("--payout", type=float, default=DEFAULT_PAYOUT)
+    parser.add_argument("--granularity", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.settings, encoding='utf-8') as f:
+        user_settings = json.load(f)
+    result = run_backtest(args.candles, user_settings, args.payout, args.granularity)
+    print(json.dumps(result.summary(), indent=2))
@@ -0,0 +1,206 @@
+# backtest/optimizer.py
+
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest.engine import DEFAULT_PAYOUT, load_candles, run_backtest
+from utils.candle_builder import VALUE_COLUMNS
+from utils.indicator_cache import CandleSnapshot, IndicatorCache
+
+# Otimizador de parâmetros: avalia combinações dos parâmetros das estratégias
+# (as chaves do estrategias_config_json) com o backtest, num pool de processos.
+# As velas são colocadas uma vez em memória partilhada e cada processo cria
+# views NumPy sobre esse bloco, sem copiar os arrays.
+
+# Otimizações simultâneas no servidor (todos os utilizadores): cada uma já ocupa todos os CPUs
+MAX_CONCURRENT_RUNS = 1
+_run_slots = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+
+
+def is_range(options) -> bool:
+    """Indica se o valor de um parâmetro é um intervalo {"min": ..., "max": ...} (e não uma lista de opções)."""
+    return isinstance(options, dict)
+
+
+def param_grid(grid: dict[str, list]) -> list[dict]:
+    """Todas as combinações de uma grelha, ex: {"rsi_period": [7, 14], "rsi_oversold": [20, 30]}."""
+    if ranges := [key for key, options in grid.items() if is_range(options)]:
+        raise ValueError(f"Intervalos só podem ser usados com amostras aleatórias: {', '.join(ranges)}")
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def random_samples(space: dict[str, list | dict], samples: int, seed: int | None = None) -> list[dict]:
+    """
+    Amostras aleatórias do espaço de parâmetros.
+    Cada valor é uma lista de opções ou um intervalo {"min": ..., "max": ...} (como chega do JSON);
+    intervalos de inteiros geram inteiros e intervalos com floats geram floats.
+    """
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(samples):
+        candidate = {}
+        for key, options in space.items():
+            if is_range(options):
+                low, high = options['min'], options['max']
+                candidate[key] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                candidate[key] = rng.choice(list(options))
+        candidates.append(candidate)
+    return candidates
+
+
+def rank_results(results: list[dict]) -> list[dict]:
+    """Ordena os resultados por lucro total, taxa de acerto e drawdown (menor primeiro)."""
+    return sorted(results, key=lambda r: (-r['total_profit_loss'], -r['win_rate'], r['max_drawdown']))
+
+
+@dataclass(frozen=True)
+class SharedCandles:
+    """Descrição de um bloco de memória partilhada com as velas (epoch int64 + OHLCV float64)."""
+    name: str
+    length: int
+    granularity: int
+    columns: tuple[str, ...]
+
+    @classmethod
+    def create(cls, snapshot: CandleSnapshot) -> tuple['SharedCandles', shared_memory.SharedMemory]:
+        """Copia a snapshot para um novo bloco partilhado; quem cria é responsável pelo unlink()."""
+        n = len(snapshot)
+        columns = tuple(col for col in VALUE_COLUMNS if col in snapshot)
+        shm = shared_memory.SharedMemory(create=True, size=max(n * 8 * (1 + len(columns)), 1))
+        descriptor = cls(shm.name, n, snapshot.granularity, columns)
+        epochs, values = descriptor.views(shm)
+        epochs[:] = snapshot['epoch']
+        for row, col in enumerate(columns):
+            values[row] = snapshot[col]
+        return descriptor, shm
+
+    def views(self, shm: shared_memory.SharedMemory) -> tuple[np.ndarray, np.ndarray]:
+        epochs = np.ndarray((self.length,), dtype=np.int64, buffer=shm.buf)
+        values = np.ndarray((len(self.columns), self.length), dtype=np.float64, buffer=shm.buf, offset=self.length * 8)
+        return epochs, values
+
+    def snapshot(self, shm: shared_memory.SharedMemory) -> CandleSnapshot:
+        epochs, values = self.views(shm)
+        arrays = {'epoch': epochs}
+        arrays.update({col: values[row] for row, col in enumerate(self.columns)})
+        # Cache própria do processo: candidatos com os mesmos parâmetros de um indicador partilham o cálculo
+        return CandleSnapshot(arrays, None, self.granularity, IndicatorCache(maxsize=256))
+
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_worker_shm: shared_memory.SharedMemory | None = None
+_worker_snapshot: CandleSnapshot | None = None
+
+
+def _init_worker(descriptor: SharedCandles):
+    global _worker_shm, _worker_snapshot
+    # O resource_tracker é partilhado com o processo principal, que é quem faz o unlink() no fim
+    _worker_shm = shared_memory.SharedMemory(name=descriptor.name)
+    _worker_snapshot = descriptor.snapshot(_worker_shm)
+
+
+def _evaluate(settings: dict, params: dict, payout: float) -> dict:
+    summary = run_backtest(_worker_snapshot, settings, payout).summary()
+    summary['params'] = params
+    return summary
+
+
+def build_candidates(base_settings: dict, param_sets: list[dict]) -> list[tuple[dict, dict]]:
+    """Aplica cada conjunto de parâmetros ao estrategias_config_json das configurações base."""
+    candidates = []
+    for params in param_sets:
+        settings = copy.deepcopy(base_settings)
+        settings['estrategias_config_json'] = {**(settings.get('estrategias_config_json') or {}), **params}
+        candidates.append((settings, params))
+    return candidates
+
+
+async def optimize_async(candles, base_settings: dict, param_sets: list[dict], max_workers: int | None = None,
+                         payout: float = DEFAULT_PAYOUT, top: int | None = None, progress=None) -> list[dict]:
+    """
+    Avalia `param_sets` em paralelo, sem bloquear o event loop, e retorna os resultados ordenados
+    (melhor primeiro).
+
+    No máximo MAX_CONCURRENT_RUNS otimizações correm ao mesmo tempo no processo (as outras esperam
+    a vez). Se a otimização falhar ou for cancelada, os candidatos por começar são cancelados e o
+    pool é encerrado sem esperar pelos que estão a meio.
+
+    :param candles: Fonte aceite por load_candles (ficheiro, DataFrame ou CandleSnapshot).
+    :param base_settings: Configurações do utilizador; cada candidato altera o estrategias_config_json.
+    :param param_sets: Conjuntos de parâmetros (ver param_grid e random_samples).
+    :param max_workers: Número de processos (por omissão, os CPUs disponíveis).
+    :param top: Se definido, retorna só os `top` melhores.
+    :param progress: Corrotina progress(concluidos, total, resultado), chamada a cada candidato
+                     avaliado (ex: para emitir via Socket.IO).
+    """
+    async with _run_slots:
+        snapshot = load_candles(candles, base_settings.get('candle_granularity'))
+        candidates = build_candidates(base_settings, param_sets)
+        descriptor, shm = SharedCandles.create(snapshot)
+        loop = asyncio.get_running_loop()
+        pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                   initializer=_init_worker, initargs=(descriptor,))
+        results = []
+        try:
+            futures = [loop.run_in_executor(pool, _evaluate, settings, params, payout) for settings, params in candidates]
+            for future in asyncio.as_completed(futures):
+                results.append(await future)
+                if progress:
+                    await progress(len(results), len(candidates), results[-1])
+        finally:
+            # Não bloqueia o event loop: com todos os candidatos concluídos, os processos terminam logo
+            pool.shutdown(wait=False, cancel_futures=True)
+            shm.close()
+            shm.unlink()
+    ranked = rank_results(results)
+    return ranked[:top] if top else ranked
+
+
+def optimize(candles, base_settings: dict, param_sets: list[dict], max_workers: int | None = None,
+             payout: float = DEFAULT_PAYOUT, top: int | None = None, progress=None) -> list[dict]:
+    """
+    Versão síncrona de optimize_async() (ex: linha de comandos); `progress` é uma função normal
+    progress(concluidos, total, resultado).
+    """
+    async def report(done: int, total: int, result: dict):
+        progress(done, total, result)
+
+    return asyncio.run(optimize_async(candles, base_settings, param_sets, max_workers, payout, top,
+                                      report if progress else None))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Otimização de parâmetros das estratégias do KingBot.")
+    parser.add_argument("candles", help="Ficheiro de velas (CSV, Parquet ou .npz) ou diretório do MarketRecorder.")
+    parser.add_argument("settings", help="Ficheiro JSON com as configurações base.")
+    parser.add_argument("grid", help='Ficheiro JSON com a grelha, ex: {"rsi_period": [7, 14, 21]}.')
+    parser.add_argument("--samples", type=int, default=None, help="Amostras aleatórias em vez da grelha completa.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--payout", type=float, default=DEFAULT_PAYOUT)
+    args = parser.parse_args()
+
+    with open(args.settings, encoding='utf-8') as f:
+        user_settings = json.load(f)
+    with open(args.grid, encoding='utf-8') as f:
+        grid = json.load(f)
+    param_sets = random_samples(grid, args.samples, args.seed) if args.samples else param_grid(grid)
+
+    def print_progress(done, total, result):
+        print(f"[{done}/{total}] P/L {result['total_profit_loss']:.2f} | {result['params']}")
+
+    ranked = optimize(args.candles, user_settings, param_sets, args.workers, args.payout, args.top, print_progress)
+    print(json.dumps(ranked, indent=2))
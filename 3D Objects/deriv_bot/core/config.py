@@ -23,6 +23,44 @@ class Settings(BaseSettings):
     DERIV_APP_ID: int = int(os.environ.get("DERIV_APP_ID", 1089)) # Exemplo de ID de APP, use o seu
     DERIV_WEBSOCKET_URL: str = os.environ.get("DERIV_WEBSOCKET_URL", "wss://ws.binaryws.com/websockets/v3")
 
+    # Cálculo dos indicadores: "numpy" (kernels de utils/kernels.py) ou "ta" (biblioteca ta, mais lenta)
+    INDICATOR_BACKEND: str = os.environ.get("INDICATOR_BACKEND", "numpy")
+
+    # Execução das estratégias fora do event loop: "thread", "process" ou "inline" (no próprio loop)
+    STRATEGY_EXECUTOR: str = os.environ.get("STRATEGY_EXECUTOR", "thread")
+    STRATEGY_WORKERS: int = int(os.environ.get("STRATEGY_WORKERS", min(4, os.cpu_count() or 1)))
+    # Máximo de avaliações à espera (uma por sessão, no máximo); acima disso os pedidos são recusados
+    STRATEGY_QUEUE_SIZE: int = int(os.environ.get("STRATEGY_QUEUE_SIZE", 64))
+    # Máximo de sessões avaliadas ao mesmo tempo pelo agendador de decisões (utils/scheduler.py)
+    DECISION_CONCURRENCY: int = int(os.environ.get("DECISION_CONCURRENCY", 8))
+
+    # Origem das velas: "candles" (uma subscrição 'ohlc' por granularidade) ou "ticks"
+    # (uma subscrição de ticks por símbolo, agregada localmente; permite velas de segundos, ex: 15s)
+    MARKET_DATA_MODE: str = os.environ.get("MARKET_DATA_MODE", "candles")
+    # Em modo "ticks", granularidades sempre agregadas além das pedidas pelas sessões (ex: "15,60,300")
+    TICK_GRANULARITIES: str = os.environ.get("TICK_GRANULARITIES", "")
+    # Gravação dos ticks e velas recebidos (utils/market_recorder.py): diretório (vazio = desligada),
+    # linhas por pedaço e idade máxima (segundos) das linhas à espera de serem escritas
+    MARKET_RECORDER_DIR: str = os.environ.get("MARKET_RECORDER_DIR", "")
+    MARKET_RECORDER_CHUNK_ROWS: int = int(os.environ.get("MARKET_RECORDER_CHUNK_ROWS", 10000))
+    MARKET_RECORDER_MAX_AGE: float = float(os.environ.get("MARKET_RECORDER_MAX_AGE", 300.0))
+
+    # Logs do bot: nível inicial de cada cliente do dashboard (cada um pode mudá-lo) e nível mínimo no log do processo
+    LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "info")
+    LOG_CONSOLE_LEVEL: str = os.environ.get("LOG_CONSOLE_LEVEL", "info")
+    # Logging estruturado do processo (core/log.py): níveis por módulo (ex: "info,utils.market_data=warning")
+    # e ficheiro com rotação por tamanho (vazio = stdout)
+    LOG_LEVELS: str = os.environ.get("LOG_LEVELS", "info")
+    LOG_FILE: str = os.environ.get("LOG_FILE", "")
+    LOG_MAX_BYTES: int = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT: int = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+
+    # Diário de trades (utils/trade_journal.py): inserção em lote a cada N trades ou T segundos
+    TRADE_JOURNAL_BATCH: int = int(os.environ.get("TRADE_JOURNAL_BATCH", 50))
+    TRADE_JOURNAL_INTERVAL: float = float(os.environ.get("TRADE_JOURNAL_INTERVAL", 5.0))
+    # Agregados de desempenho (utils/performance.py): intervalo do upsert dos agregados alterados
+    PERFORMANCE_FLUSH_INTERVAL: float = float(os.environ.get("PERFORMANCE_FLUSH_INTERVAL", 5.0))
+
     class Config:
         """
         Configurações para Pydantic Settings.
@@ -0,0 +1,191 @@
+# core/log.py
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Logging estruturado do processo: cada registo é uma linha JSON com o contexto da sessão.
+# O event loop só coloca o registo numa fila (sem formatar nem escrever); uma thread de
+# escrita (QueueListener) formata e escreve no stdout ou num ficheiro com rotação por tamanho.
+# Assim, a pressão do stdout (ex: o supervisor do processo a ler devagar) nunca bloqueia o loop.
+
+# Nível extra usado pelos logs do bot (entre INFO e WARNING)
+SUCCESS = 25
+logging.addLevelName(SUCCESS, "SUCCESS")
+
+# Atributos do registo copiados para a linha JSON quando presentes (via extra= ou ContextLogger)
+CONTEXT_FIELDS = ('session_id', 'user_id', 'msg_type', 'symbol', 'granularity', 'contract_id', 'sid')
+
+QUEUE_SIZE = 10000
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata cada registo como uma linha JSON: ts, level, logger, msg, o contexto e a exceção."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Coloca o registo na fila sem esperar: com a fila cheia o registo é descartado (e contado).
+    A mensagem (`msg % args`) e o JSON só são construídos na thread de escrita.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record  # A fila é do mesmo processo: não é preciso serializar o registo aqui
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Writer(QueueListener):
+    """Thread de escrita; ao parar, espera por lugar na fila para o sentinela (a fila pode estar cheia)."""
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class ContextLogger(logging.LoggerAdapter):
+    """Logger com contexto fixo (ex: user_id e session_id de uma BotSession), juntado ao `extra` de cada chamada."""
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **(kwargs.get('extra') or {})}
+        return msg, kwargs
+
+
+def get_logger(name: str, **context) -> logging.Logger | ContextLogger:
+    """Logger do módulo `name`; com `context`, cada registo leva esses campos (ex: user_id=1)."""
+    logger = logging.getLogger(name)
+    return ContextLogger(logger, context) if context else logger
+
+
+def parse_levels(value: str) -> dict[str, int]:
+    """
+    Níveis por módulo, ex: "info,utils.market_data=warning,main=debug".
+    Um nível sem módulo aplica-se ao logger raiz. Entradas inválidas são ignoradas.
+    """
+    levels = {}
+    for item in (value or "").split(','):
+        name, _, level = item.strip().rpartition('=')
+        number = logging.getLevelName(level.strip().upper())
+        if isinstance(number, int):
+            levels[name.strip()] = number
+    return levels
+
+
+_listener: _Writer | None = None
+_handler: _NonBlockingQueueHandler | None = None
+
+
+def setup_logging(levels: str = "info", log_file: str = "", max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, queue_size: int = QUEUE_SIZE) -> QueueListener:
+    """
+    Liga o logger raiz à fila e arranca a thread de escrita (uma vez por processo).
+
+    :param levels: Níveis por módulo (ver parse_levels).
+    :param log_file: Ficheiro de destino, com rotação a cada `max_bytes` (`backup_count` cópias);
+                     vazio para escrever no stdout.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+
+    if log_file:
+        sink = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    else:
+        sink = logging.StreamHandler(sys.stdout)
+    sink.setFormatter(JsonFormatter())
+
+    _handler = _NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(logging.INFO)
+    for name, level in parse_levels(levels).items():
+        logging.getLogger(name or None).setLevel(level)
+
+    _listener = _Writer(_handler.queue, sink, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Escreve os registos pendentes e para a thread de escrita."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_handler)
+        _listener, _handler = None, None
+
+
+def dropped_records() -> int:
+    """Registos descartados por a fila estar cheia desde o arranque."""
+    return _handler.dropped if _handler else 0
+
+
+if __name__ == "__main__":
+    import os
+    import subprocess
+
+    import numpy as np
+
+    from utils.candle_builder import CandleBuilder
+
+    # Custo do logging por tick: um registo por tick (o pior caso) com print() direto ao stdout
+    # e com a fila + thread de escrita. O stdout é um pipe lido devagar, como o de um supervisor.
+    n = 20000
+    quotes = 1000 + np.cumsum(np.random.default_rng(3).normal(0, 1, n))
+
+    def run(log_tick) -> float:
+        builder = CandleBuilder(60)
+        started = time.perf_counter()
+        for i, quote in enumerate(quotes):
+            builder.add_tick(1_700_000_000 + i, float(quote))
+            log_tick(i, quote)
+        return (time.perf_counter() - started) / n * 1e6
+
+    reader = subprocess.Popen([sys.executable, "-c", "import sys, time\nfor line in sys.stdin: time.sleep(0.00002)"],
+                              stdin=subprocess.PIPE)
+    saved_stdout = os.dup(1)
+    os.dup2(reader.stdin.fileno(), 1)
+    try:
+        baseline = run(lambda i, quote: None)
+        printed = run(lambda i, quote: print(f"Tick {i}: {quote}", flush=True))
+        setup_logging("info")
+        logger = get_logger("bench", user_id=1, session_id="bench")
+        filtered = run(lambda i, quote: logger.debug("Tick %d: %s", i, quote))
+        queued = run(lambda i, quote: logger.info("Tick %d: %s", i, quote, extra={'msg_type': 'tick'}))
+        dropped = dropped_records()
+        shutdown_logging()
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        reader.stdin.close()
+        reader.wait()
+    print(f"sem logging      {baseline:7.2f} µs/tick")
+    print(f"print()          {printed:7.2f} µs/tick")
+    print(f"fila (filtrado)  {filtered:7.2f} µs/tick")
+    print(f"fila (info)      {queued:7.2f} µs/tick ({dropped} descartados com a fila cheia)")
@@ -0,0 +1 @@
+# estrategia/__init__.py
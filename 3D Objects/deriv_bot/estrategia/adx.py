@@ -1,14 +1,40 @@
 # estrategia/adx.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, adx_period: int = 14, adx_threshold: int = 25) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import ADX, StreamingSignal
+
+SPEC = StrategySpec(
+    name="adx",
+    params=(Param("adx_period", 14), Param("adx_threshold", 25, float)),
+    warmup=lambda p: p["adx_period"] * 2,
+    cost=4.0,
+    stream=lambda p: ADXStream(**p),
+)
+
+def decide(prev_plus_di: float, prev_minus_di: float, last_adx: float, last_plus_di: float,
+           last_minus_di: float, adx_threshold: int = 25) -> str | None:
+    """Regra de sinal do ADX, partilhada por analyze() e ADXStream."""
+    is_strong_trend = last_adx > adx_threshold
+
+    if is_strong_trend:
+        if last_plus_di > last_minus_di and prev_plus_di <= prev_minus_di:
+            return "UP"
+        elif last_minus_di > last_plus_di and prev_minus_di <= prev_plus_di:
+            return "DOWN"
+
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, adx_period: int = 14, adx_threshold: int = 25) -> str | None:
     """
     Analisa o ADX (Average Directional Index) para sinais de início de tendência.
     Gera um sinal com base no cruzamento do +DI e -DI, mas apenas se o ADX
     estiver acima de um limiar, indicando que uma tendência forte está presente.
 
-    :param df: DataFrame com colunas 'high', 'low', 'close'.
+    :param df: DataFrame (ou CandleSnapshot) com colunas 'high', 'low', 'close'.
     :param adx_period: O período de tempo para o cálculo do ADX.
     :param adx_threshold: O limiar do ADX para validar a força da tendência.
     :return: "UP", "DOWN", ou None.
@@ -17,35 +43,51 @@ def analyze(df: pd.DataFrame, adx_period: int = 14, adx_threshold: int = 25) ->
         return None
 
     try:
-        for col in ['high', 'low', 'close']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        df = df.dropna(subset=['high', 'low', 'close'])
-
-        if df.empty or len(df) < adx_period * 2: return None
-
-        adx_indicator = ta.trend.ADXIndicator(
-            high=df['high'], low=df['low'], close=df['close'], window=adx_period
-        )
-        df['adx'] = adx_indicator.adx()
-        df['plus_di'] = adx_indicator.adx_pos()
-        df['minus_di'] = adx_indicator.adx_neg()
-
-        # Obtém os valores mais recentes
-        last_adx = df['adx'].iloc[-1]
-        last_plus_di = df['plus_di'].iloc[-1]
-        last_minus_di = df['minus_di'].iloc[-1]
-        prev_plus_di = df['plus_di'].iloc[-2]
-        prev_minus_di = df['minus_di'].iloc[-2]
-
-        # Lógica do sinal
-        is_strong_trend = last_adx > adx_threshold
-
-        if is_strong_trend:
-            if last_plus_di > last_minus_di and prev_plus_di <= prev_minus_di:
-                return "UP"
-            elif last_minus_di > last_plus_di and prev_minus_di <= prev_plus_di:
-                return "DOWN"
+        snapshot = as_snapshot(df)
+        if len(snapshot) < adx_period * 2: return None
+
+        adx_values, plus_di, minus_di = snapshot.indicator('adx', window=adx_period)
 
+        # Lógica do sinal com os valores mais recentes
+        return decide(plus_di[-2], minus_di[-2], adx_values[-1], plus_di[-1], minus_di[-1], adx_threshold)
+    except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, adx_period: int = 14, adx_threshold: int = 25) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = adx_period * 2
+    if len(snapshot) < warmup:
+        return no_signals(len(snapshot))
+
+    try:
+        adx_values, plus_di, minus_di = snapshot.indicator('adx', window=adx_period)
+        prev_plus_di, prev_minus_di = shift(plus_di), shift(minus_di)
+        is_strong_trend = adx_values > adx_threshold
+        up = is_strong_trend & (plus_di > minus_di) & (prev_plus_di <= prev_minus_di)
+        down = is_strong_trend & (minus_di > plus_di) & (prev_minus_di <= prev_plus_di)
+        return to_signals(up, down, warmup)
     except Exception:
-        return None
\ No newline at end of file
+        return no_signals(len(snapshot))
+
+class ADXStream(StreamingSignal):
+    """Versão streaming de analyze(): ADX/+DI/-DI atualizados em O(1) por vela fechada."""
+    def __init__(self, adx_period: int = 14, adx_threshold: int = 25):
+        super().__init__()
+        self.adx = ADX(adx_period)
+        self.adx_threshold = adx_threshold
+
+    def _compute(self, candle: dict, commit: bool):
+        args = (float(candle['high']), float(candle['low']), float(candle['close']))
+        result = self.adx.update(*args) if commit else self.adx.peek(*args)
+        if result is None:
+            return None
+        adx, plus_di, minus_di = result
+        # Tal como na `ta`, o ADX vale 0 durante o aquecimento
+        return (adx if adx is not None else 0.0), plus_di, minus_di
+
+    def _decide(self, prev, last):
+        return decide(prev[1], prev[2], *last, self.adx_threshold)
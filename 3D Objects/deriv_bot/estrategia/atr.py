@@ -1,14 +1,16 @@
 # estrategia/atr.py
 import pandas as pd
-import ta
 
-def calculate(df: pd.DataFrame, window: int = 14) -> float | None:
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.streaming_indicators import ATR
+
+def calculate(df: pd.DataFrame | CandleSnapshot, window: int = 14) -> float | None:
     """
     Calcula o Average True Range (ATR) para medir a volatilidade.
     Esta função não gera um sinal, mas fornece o valor do ATR para ser usado
     em outras lógicas, como a definição de um stop loss dinâmico.
 
-    :param df: DataFrame com 'high', 'low', 'close'.
+    :param df: DataFrame (ou CandleSnapshot) com 'high', 'low', 'close'.
     :param window: O período para o cálculo do ATR.
     :return: O valor do último ATR ou None se houver erro.
     """
@@ -16,21 +18,22 @@ def calculate(df: pd.DataFrame, window: int = 14) -> float | None:
         return None
 
     try:
-        # Garante que os dados de entrada são numéricos
-        for col in ['high', 'low', 'close']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        df = df.dropna(subset=['high', 'low', 'close'])
-        if df.empty or len(df) < window + 1: return None
-
-        # Calcula o indicador ATR
-        atr_indicator = ta.volatility.AverageTrueRange(
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
-            window=window
-        )
+        snapshot = as_snapshot(df)
+        if len(snapshot) < window + 1: return None
+
         # Retorna o valor mais recente do ATR
-        return atr_indicator.average_true_range().iloc[-1]
+        return snapshot.indicator('atr', window=window)[-1]
 
     except Exception:
         return None
+
+class ATRStream:
+    """Versão streaming de calculate(): ATR de Wilder atualizado em O(1) por vela fechada."""
+    def __init__(self, window: int = 14):
+        self.atr = ATR(window)
+
+    def update(self, candle: dict) -> float | None:
+        return self.atr.update(float(candle['high']), float(candle['low']), float(candle['close']))
+
+    def peek(self, candle: dict) -> float | None:
+        return self.atr.peek(float(candle['high']), float(candle['low']), float(candle['close']))
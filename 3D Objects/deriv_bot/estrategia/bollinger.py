@@ -1,14 +1,39 @@
 # estrategia/bollinger.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, bollinger_period: int = 20, bollinger_dev: float = 2.0) -> str | None:
+from estrategia.spec import TRIGGER_UPDATE, Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, to_signals
+from utils.streaming_indicators import Bollinger, StreamingSignal
+
+SPEC = StrategySpec(
+    name="bollinger",
+    params=(
+        Param("bollinger_period", 20),
+        Param("bollinger_dev", 2.0, float, ("bollinger_std_dev", "bollinger_dev")),
+    ),
+    warmup=lambda p: p["bollinger_period"],
+    cost=1.0,
+    trigger=TRIGGER_UPDATE,  # O toque na banda é válido ainda com a vela aberta
+    stream=lambda p: BollingerStream(**p),
+)
+
+def decide(last_close: float, last_upper_band: float, last_lower_band: float) -> str | None:
+    """Regra de sinal das Bandas de Bollinger, partilhada por analyze() e BollingerStream."""
+    if last_close <= last_lower_band:
+        return "UP"
+    elif last_close >= last_upper_band:
+        return "DOWN"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, bollinger_period: int = 20, bollinger_dev: float = 2.0) -> str | None:
     """
     Analisa as Bandas de Bollinger para sinais de reversão à média.
     Sinal UP: Preço toca ou cruza a banda inferior.
     Sinal DOWN: Preço toca ou cruza a banda superior.
     
-    :param df: DataFrame do pandas com a coluna 'close'.
+    :param df: DataFrame do pandas (ou CandleSnapshot) com a coluna 'close'.
     :param bollinger_period: Período da média móvel.
     :param bollinger_dev: Número de desvios padrão para as bandas.
     :return: "UP", "DOWN", ou None.
@@ -17,20 +42,44 @@ def analyze(df: pd.DataFrame, bollinger_period: int = 20, bollinger_dev: float =
         return None
         
     try:
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df = df.dropna(subset=['close'])
-        if df.empty or len(df) < bollinger_period: return None
-
-        bollinger = ta.volatility.BollingerBands(close=df['close'], window=bollinger_period, window_dev=bollinger_dev)
-        last_close = df['close'].iloc[-1]
-        last_upper_band = bollinger.bollinger_hband().iloc[-1]
-        last_lower_band = bollinger.bollinger_lband().iloc[-1]
-
-        if last_close <= last_lower_band:
-            return "UP"
-        elif last_close >= last_upper_band:
-            return "DOWN"
-            
+        snapshot = as_snapshot(df)
+        if len(snapshot) < bollinger_period: return None
+
+        upper_band, lower_band = snapshot.indicator('bollinger', window=bollinger_period, window_dev=bollinger_dev)
+        last_close = snapshot['close'][-1]
+
+        return decide(last_close, upper_band[-1], lower_band[-1])
+    except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, bollinger_period: int = 20, bollinger_dev: float = 2.0) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    if len(snapshot) < bollinger_period:
+        return no_signals(len(snapshot))
+
+    try:
+        upper_band, lower_band = snapshot.indicator('bollinger', window=bollinger_period, window_dev=bollinger_dev)
+        close = snapshot['close']
+        return to_signals(close <= lower_band, close >= upper_band, bollinger_period)
     except Exception:
-        return None
\ No newline at end of file
+        return no_signals(len(snapshot))
+
+class BollingerStream(StreamingSignal):
+    """Versão streaming de analyze(): bandas atualizadas em O(1) por vela fechada."""
+    needs_prev = False
+
+    def __init__(self, bollinger_period: int = 20, bollinger_dev: float = 2.0):
+        super().__init__()
+        self.bands = Bollinger(bollinger_period, bollinger_dev)
+
+    def _compute(self, candle: dict, commit: bool):
+        close = float(candle['close'])
+        bands = self.bands.update(close) if commit else self.bands.peek(close)
+        return None if bands is None else (close, bands[1], bands[2])
+
+    def _decide(self, prev, last):
+        return decide(*last)
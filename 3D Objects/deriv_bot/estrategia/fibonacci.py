@@ -1,47 +1,148 @@
 # estrategia/fibonacci.py
+import numpy as np
 import pandas as pd
 
-def analyze(df: pd.DataFrame, fib_period: int = 50) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import RollingExtrema, StreamingSignal
+
+# Níveis de retração por omissão (só o 61.8%, como na versão original da estratégia)
+DEFAULT_FIB_LEVELS = (0.618,)
+
+
+def parse_levels(value) -> tuple[float, ...]:
+    """
+    Converte os níveis do estrategias_config_json (lista ou string separada por vírgulas,
+    em fração ou percentagem: 0.382 ou 38.2) num tuplo ordenado de frações em (0, 1).
+    """
+    items = value.split(',') if isinstance(value, str) else value
+    levels = set()
+    for item in items:
+        try:
+            level = float(item)
+        except (TypeError, ValueError):
+            continue
+        level = level / 100 if level > 1 else level
+        if 0 < level < 1:
+            levels.add(round(level, 6))
+    return tuple(sorted(levels)) or DEFAULT_FIB_LEVELS
+
+
+SPEC = StrategySpec(
+    name="fibonacci",
+    params=(Param("fib_period", 50), Param("fib_levels", DEFAULT_FIB_LEVELS, parse_levels)),
+    warmup=lambda p: max(p["fib_period"], 2),
+    cost=0.3,
+    stream=lambda p: FibonacciStream(**p),
+)
+
+def decide(swing_high: float, swing_low: float, prev_high: float, prev_low: float,
+           last_open: float, last_close: float, fib_levels=DEFAULT_FIB_LEVELS) -> str | None:
+    """
+    Regra de sinal, partilhada por analyze() e FibonacciStream.
+    Todos os níveis são avaliados na mesma passagem; uma reversão para alta em qualquer
+    nível tem prioridade sobre uma reversão para baixa.
+    """
+    price_range = swing_high - swing_low
+    if price_range == 0: return None
+
+    levels = np.asarray(fib_levels, dtype=np.float64)
+    # Retrações de um movimento de alta (suportes) e de um movimento de baixa (resistências)
+    support_levels = swing_high - levels * price_range
+    resistance_levels = swing_low + levels * price_range
+
+    # Lógica de Reversão para Alta (UP)
+    # O preço caiu abaixo do suporte e depois fechou acima dele, com uma vela de alta.
+    if last_close > last_open and np.any((prev_low <= support_levels) & (last_close > support_levels)):
+        return "UP"
+
+    # Lógica de Reversão para Baixa (DOWN)
+    # O preço subiu acima da resistência e depois fechou abaixo dela, com uma vela de baixa.
+    if last_close < last_open and np.any((prev_high >= resistance_levels) & (last_close < resistance_levels)):
+        return "DOWN"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, fib_period: int = 50, fib_levels=DEFAULT_FIB_LEVELS) -> str | None:
     """
     Análise simplificada de retração de Fibonacci.
-    Busca por reversões em níveis chave (61.8%) após um swing de alta ou baixa.
+    Busca por reversões nos níveis de retração (por omissão, 61.8%) após um swing de alta ou baixa.
     
-    :param df: DataFrame do pandas com 'high', 'low', 'close'.
+    :param df: DataFrame do pandas (ou CandleSnapshot) com 'high', 'low', 'close'.
     :param fib_period: Período para determinar o swing high/low.
+    :param fib_levels: Níveis de retração, em fração (ex: (0.382, 0.5, 0.618, 0.786)).
     :return: "UP", "DOWN", ou None.
     """
     if len(df) < fib_period:
         return None
         
     try:
-        recent_df = df.iloc[-fib_period:]
-        swing_high = recent_df['high'].max()
-        swing_low = recent_df['low'].min()
-        price_range = swing_high - swing_low
+        snapshot = as_snapshot(df)
+        if len(snapshot) < max(fib_period, 2): return None
+
+        high, low = snapshot['high'], snapshot['low']
+        open_, close = snapshot['open'], snapshot['close']
+        return decide(high[-fib_period:].max(), low[-fib_period:].min(), high[-2], low[-2],
+                      open_[-1], close[-1], fib_levels)
+    except Exception:
+        return None
 
-        if price_range == 0: return None
 
-        # Nível de retração de 61.8% para um movimento de alta (suporte)
-        support_level = swing_high - 0.618 * price_range
-        
-        # Nível de retração de 61.8% para um movimento de baixa (resistência)
-        resistance_level = swing_low + 0.618 * price_range
+def signals(df: pd.DataFrame | CandleSnapshot, fib_period: int = 50, fib_levels=DEFAULT_FIB_LEVELS) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = max(fib_period, 2)
+    if len(snapshot) < warmup:
+        return no_signals(len(snapshot))
 
-        last_candle = df.iloc[-1]
-        prev_candle = df.iloc[-2]
-        
-        # Lógica de Reversão para Alta (UP)
-        # O preço caiu abaixo do suporte e depois fechou acima dele, com uma vela de alta.
-        if prev_candle['low'] <= support_level and last_candle['close'] > support_level:
-            if last_candle['close'] > last_candle['open']: # Confirmação com candle de alta
-                return "UP"
-
-        # Lógica de Reversão para Baixa (DOWN)
-        # O preço subiu acima da resistência e depois fechou abaixo dela, com uma vela de baixa.
-        if prev_candle['high'] >= resistance_level and last_candle['close'] < resistance_level:
-            if last_candle['close'] < last_candle['open']: # Confirmação com candle de baixa
-                return "DOWN"
-                
-        return None
+    try:
+        high, low = snapshot['high'], snapshot['low']
+        open_, close = snapshot['open'], snapshot['close']
+        swing_high = snapshot.series('high').rolling(fib_period).max().to_numpy()
+        swing_low = snapshot.series('low').rolling(fib_period).min().to_numpy()
+        price_range = swing_high - swing_low
+        has_range = price_range != 0
+        prev_high, prev_low = shift(high), shift(low)
+
+        up = np.zeros(len(snapshot), dtype=bool)
+        down = np.zeros(len(snapshot), dtype=bool)
+        for level in fib_levels:
+            support_level = swing_high - level * price_range
+            resistance_level = swing_low + level * price_range
+            up |= (prev_low <= support_level) & (close > support_level)
+            down |= (prev_high >= resistance_level) & (close < resistance_level)
+        up &= has_range & (close > open_)
+        down &= has_range & (close < open_)
+        return to_signals(up, down, warmup)
     except Exception:
-        return None
\ No newline at end of file
+        return no_signals(len(snapshot))
+
+
+class FibonacciStream(StreamingSignal):
+    """
+    Versão streaming de analyze(): o swing high/low é mantido com deques monotónicas
+    (RollingExtrema), em O(1) amortizado por vela, em vez de percorrer as últimas `fib_period` velas.
+    """
+    def __init__(self, fib_period: int = 50, fib_levels=DEFAULT_FIB_LEVELS):
+        super().__init__()
+        self.swing_high = RollingExtrema(fib_period, 'max')
+        self.swing_low = RollingExtrema(fib_period, 'min')
+        self.fib_levels = fib_levels
+
+    def _compute(self, candle: dict, commit: bool):
+        high, low = float(candle['high']), float(candle['low'])
+        if commit:
+            swing_high, swing_low = self.swing_high.update(high), self.swing_low.update(low)
+        else:
+            swing_high, swing_low = self.swing_high.peek(high), self.swing_low.peek(low)
+        # A máxima/mínima da vela são guardadas mesmo antes do aquecimento: a vela seguinte usa-as
+        return swing_high, swing_low, high, low, float(candle['open']), float(candle['close'])
+
+    def _decide(self, prev, last):
+        swing_high, swing_low, _, _, last_open, last_close = last
+        if swing_high is None or swing_low is None:
+            return None
+        return decide(swing_high, swing_low, prev[2], prev[3], last_open, last_close, self.fib_levels)
@@ -1,14 +1,37 @@
 # estrategia/macd_histogram.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, macd_fast: int = 12, macd_slow: int = 26, macd_sign: int = 9) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import MACD, StreamingSignal
+
+SPEC = StrategySpec(
+    name="macd_histogram",
+    params=(Param("macd_fast", 12), Param("macd_slow", 26), Param("macd_sign", 9)),
+    warmup=lambda p: p["macd_slow"] + 1,
+    cost=1.5,
+    stream=lambda p: MACDHistogramStream(**p),
+)
+
+def decide(prev_hist: float, last_hist: float) -> str | None:
+    """Regra de sinal do histograma MACD, partilhada por analyze() e MACDHistogramStream."""
+    # Sinal de compra (UP): Histograma cruza de negativo para positivo
+    if prev_hist < 0 and last_hist >= 0:
+        return "buy"
+    # Sinal de venda (DOWN): Histograma cruza de positivo para negativo
+    elif prev_hist > 0 and last_hist <= 0:
+        return "sell"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, macd_fast: int = 12, macd_slow: int = 26, macd_sign: int = 9) -> str | None:
     """
     Analisa o histograma do MACD para sinais de momentum.
     Sinal "UP": Histograma cruza de negativo para positivo.
     Sinal "DOWN": Histograma cruza de positivo para negativo.
 
-    :param df: DataFrame com a coluna 'close'.
+    :param df: DataFrame (ou CandleSnapshot) com a coluna 'close'.
     :param macd_slow: Período da MME lenta.
     :param macd_fast: Período da MME rápida.
     :param macd_sign: Período da linha de sinal.
@@ -18,33 +41,48 @@ def analyze(df: pd.DataFrame, macd_fast: int = 12, macd_slow: int = 26, macd_sig
         return None
 
     try:
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df = df.dropna(subset=['close'])
-        if df.empty or len(df) < macd_slow + 1: return None
-
-        # Calcula o MACD
-        macd_indicator = ta.trend.MACD(
-            close=df['close'],
-            window_slow=macd_slow,
-            window_fast=macd_fast,
-            window_sign=macd_sign
-        )
-        df['macd_hist'] = macd_indicator.macd_diff()
+        snapshot = as_snapshot(df)
+        if len(snapshot) < macd_slow + 1: return None
+
+        # Calcula o histograma do MACD
+        macd_hist = snapshot.indicator('macd_diff', window_fast=macd_fast, window_slow=macd_slow, window_sign=macd_sign)
 
         # Obtém os valores mais recentes do histograma
-        last_hist = df['macd_hist'].iloc[-1]
-        prev_hist = df['macd_hist'].iloc[-2] if len(df) >= 2 else None
-
-        if prev_hist is None: return None
-
-        # Sinal de compra (UP): Histograma cruza de negativo para positivo
-        if prev_hist < 0 and last_hist >= 0:
-            return "buy"
-        # Sinal de venda (DOWN): Histograma cruza de positivo para negativo
-        elif prev_hist > 0 and last_hist <= 0:
-            return "sell"
-        
-        return None
+        last_hist = macd_hist[-1]
+        prev_hist = macd_hist[-2]
+
+        return decide(prev_hist, last_hist)
 
     except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, macd_fast: int = 12, macd_slow: int = 26, macd_sign: int = 9) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = macd_slow + 1
+    if len(snapshot) < warmup:
+        return no_signals(len(snapshot))
+
+    try:
+        last_hist = snapshot.indicator('macd_diff', window_fast=macd_fast, window_slow=macd_slow, window_sign=macd_sign)
+        prev_hist = shift(last_hist)
+        return to_signals((prev_hist < 0) & (last_hist >= 0), (prev_hist > 0) & (last_hist <= 0), warmup)
+    except Exception:
+        return no_signals(len(snapshot))
+
+class MACDHistogramStream(StreamingSignal):
+    """Versão streaming de analyze(): MACD atualizado em O(1) por vela fechada."""
+    def __init__(self, macd_fast: int = 12, macd_slow: int = 26, macd_sign: int = 9):
+        super().__init__()
+        self.macd = MACD(macd_fast, macd_slow, macd_sign)
+
+    def _compute(self, candle: dict, commit: bool):
+        close = float(candle['close'])
+        result = self.macd.update(close) if commit else self.macd.peek(close)
+        return None if result is None else result[2]
+
+    def _decide(self, prev, last):
+        return decide(prev, last)
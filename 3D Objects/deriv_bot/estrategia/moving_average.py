@@ -1,12 +1,35 @@
 # estrategia/moving_average.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, ma_window: int = 20) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import SMA, StreamingSignal
+
+SPEC = StrategySpec(
+    name="moving_average",
+    params=(Param("ma_window", 20),),
+    warmup=lambda p: p["ma_window"] + 1,
+    cost=0.5,
+    stream=lambda p: MovingAverageStream(**p),
+)
+
+def decide(prev_close: float, prev_sma: float, last_close: float, last_sma: float) -> str | None:
+    """Regra de cruzamento preço/SMA, partilhada por analyze() e MovingAverageStream."""
+    # Cruzamento para cima
+    if last_close > last_sma and prev_close <= prev_sma:
+        return "UP"
+    # Cruzamento para baixo
+    elif last_close < last_sma and prev_close >= prev_sma:
+        return "DOWN"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, ma_window: int = 20) -> str | None:
     """
     Analisa o cruzamento do preço com uma Média Móvel Simples (SMA).
     
-    :param df: DataFrame do pandas com a coluna 'close'.
+    :param df: DataFrame do pandas (ou CandleSnapshot) com a coluna 'close'.
     :param ma_window: Período da média móvel.
     :return: "UP", "DOWN", ou None.
     """
@@ -14,24 +37,46 @@ def analyze(df: pd.DataFrame, ma_window: int = 20) -> str | None:
         return None
         
     try:
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df = df.dropna(subset=['close'])
-        if df.empty or len(df) < ma_window + 1: return None
-
-        df['sma'] = ta.trend.sma_indicator(close=df['close'], window=ma_window)
-
-        last_close = df['close'].iloc[-1]
-        prev_close = df['close'].iloc[-2]
-        last_sma = df['sma'].iloc[-1]
-        prev_sma = df['sma'].iloc[-2]
-
-        # Cruzamento para cima
-        if last_close > last_sma and prev_close <= prev_sma:
-            return "UP"
-        # Cruzamento para baixo
-        elif last_close < last_sma and prev_close >= prev_sma:
-            return "DOWN"
-            
+        snapshot = as_snapshot(df)
+        if len(snapshot) < ma_window + 1: return None
+
+        sma = snapshot.indicator('sma', window=ma_window)
+        close = snapshot['close']
+
+        return decide(close[-2], sma[-2], close[-1], sma[-1])
+    except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, ma_window: int = 20) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = ma_window + 1
+    if len(snapshot) < warmup:
+        return no_signals(len(snapshot))
+
+    try:
+        last_sma = snapshot.indicator('sma', window=ma_window)
+        last_close = snapshot['close']
+        prev_sma, prev_close = shift(last_sma), shift(last_close)
+        up = (last_close > last_sma) & (prev_close <= prev_sma)
+        down = (last_close < last_sma) & (prev_close >= prev_sma)
+        return to_signals(up, down, warmup)
     except Exception:
-        return None
\ No newline at end of file
+        return no_signals(len(snapshot))
+
+class MovingAverageStream(StreamingSignal):
+    """Versão streaming de analyze(): SMA atualizada em O(1) por vela fechada."""
+    def __init__(self, ma_window: int = 20):
+        super().__init__()
+        self.sma = SMA(ma_window)
+
+    def _compute(self, candle: dict, commit: bool):
+        close = float(candle['close'])
+        sma = self.sma.update(close) if commit else self.sma.peek(close)
+        return None if sma is None else (close, sma)
+
+    def _decide(self, prev, last):
+        return decide(*prev, *last)
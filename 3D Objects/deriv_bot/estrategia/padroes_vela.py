@@ -1,38 +1,47 @@
 # estrategia/padroes_vela.py
+import numpy as np
 import pandas as pd
 
-def analyze(df: pd.DataFrame) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils import candle_patterns
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+
+# Padrões avaliados por omissão: Engolfo de Alta e Engolfo de Baixa
+ENGULFING = ("bullish_engulfing", "bearish_engulfing")
+
+
+def _patterns(value) -> tuple[str, ...]:
+    """Padrões do estrategias_config_json['candle_patterns']; sem nenhum válido, volta ao Engolfo."""
+    return candle_patterns.parse_patterns(value) or ENGULFING
+
+
+SPEC = StrategySpec(
+    name="padroes_vela",
+    params=(Param("patterns", ENGULFING, _patterns, ("candle_patterns",)),),
+    warmup=lambda p: candle_patterns.max_bars(p["patterns"]),
+    cost=0.1,
+)
+
+def analyze(df: pd.DataFrame | CandleSnapshot, patterns: tuple[str, ...] = ENGULFING) -> str | None:
     """
-    Analisa padrões de velas de Engolfo (Engulfing).
+    Analisa padrões de velas (por omissão, Engolfo/Engulfing) na última vela.
     
-    :param df: DataFrame do pandas com 'open' e 'close'.
+    :param df: DataFrame do pandas (ou CandleSnapshot) com 'open', 'high', 'low' e 'close'.
+    :param patterns: Nomes dos padrões de utils/candle_patterns.py (ex: "hammer", "three_white_soldiers").
     :return: "UP", "DOWN", ou None.
     """
-    if len(df) < 2:
+    if len(df) < candle_patterns.max_bars(patterns):
         return None
         
     try:
-        last_candle = df.iloc[-1]
-        prev_candle = df.iloc[-2]
-
-        # Engolfo de Alta (Bullish Engulfing)
-        # A vela anterior é de baixa, a atual é de alta e "engole" a anterior.
-        is_bullish_engulfing = (prev_candle['close'] < prev_candle['open'] and 
-                                last_candle['close'] > last_candle['open'] and 
-                                last_candle['close'] > prev_candle['open'] and 
-                                last_candle['open'] < prev_candle['close'])
-        if is_bullish_engulfing:
-            return "UP"
-
-        # Engolfo de Baixa (Bearish Engulfing)
-        # A vela anterior é de alta, a atual é de baixa e "engole" a anterior.
-        is_bearish_engulfing = (prev_candle['close'] > prev_candle['open'] and
-                                last_candle['close'] < last_candle['open'] and
-                                last_candle['close'] < prev_candle['open'] and
-                                last_candle['open'] > prev_candle['close'])
-        if is_bearish_engulfing:
-            return "DOWN"
-            
-        return None
+        return candle_patterns.last_signal(as_snapshot(df), patterns)
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+def signals(df: pd.DataFrame | CandleSnapshot, patterns: tuple[str, ...] = ENGULFING) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    return candle_patterns.pattern_signals(as_snapshot(df), patterns)
@@ -0,0 +1,255 @@
+# estrategia/plan.py
+
+import logging
+import math
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable
+
+import numpy as np
+
+from estrategia.registry import get_strategy
+from estrategia.spec import TRIGGER_CLOSE, TRIGGER_UPDATE
+from utils.signal_series import DEFAULT_THRESHOLD, LOGIC_AND, LOGIC_OR, LOGIC_WEIGHTED, combine, threshold_decisions
+
+logger = logging.getLogger(__name__)
+
+# Margem de velas extra, além do aquecimento declarado pelas estratégias
+WARMUP_MARGIN = 5
+
+# Sinais em texto -> pontuação
+SIGNAL_SCORES = {"UP": 1.0, "buy": 1.0, "DOWN": -1.0, "sell": -1.0}
+
+# Peso das novas medições nas médias móveis de StepStats
+STATS_ALPHA = 0.1
+# Probabilidade assumida (sinal / sem sinal) de uma estratégia ainda sem medições
+DEFAULT_SIGNAL_RATE = 0.5
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """
+    Uma estratégia com os parâmetros já resolvidos. Só guarda dados simples (nome, parâmetros):
+    o analyze() é procurado pelo nome no registo por quem o executa (ex: noutro processo).
+    """
+    name: str
+    params: tuple[tuple[str, object], ...]
+    warmup: int
+    cost: float
+    trigger: str = TRIGGER_CLOSE
+    stream: Callable | None = None  # Cria o StreamingSignal da estratégia (sem argumentos), se existir
+
+
+def to_score(signal) -> float:
+    """
+    Normaliza o resultado de um analyze() numa pontuação em [-1, 1]: "UP"/"DOWN" (ou "buy"/"sell")
+    valem +1/-1, None vale 0 e um número é usado como força do sinal (limitado a [-1, 1]).
+    """
+    if signal is None:
+        return 0.0
+    if isinstance(signal, str):
+        return SIGNAL_SCORES.get(signal, 0.0)
+    try:
+        score = float(signal)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(score) else max(-1.0, min(1.0, score))
+
+
+def config_number(config: dict, key: str, default: float, name: str | None = None) -> float:
+    """
+    Número finito em config[key] (ex: um peso ou o limiar vindos do estrategias_config_json);
+    em falta ou inválido, `default` (com um aviso no log se o valor era inválido).
+    """
+    value = config.get(key)
+    if value is None:
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if not math.isfinite(number):
+        logger.warning("Valor inválido para '%s' (%r); a usar %r.", name or key, value, default)
+        return default
+    return number
+
+
+def score_to_decision(score: float) -> str | None:
+    """Sentido de uma pontuação: "buy", "sell" ou None (sem sinal)."""
+    return "buy" if score > 0 else "sell" if score < 0 else None
+
+
+@dataclass(frozen=True)
+class StrategyPlan:
+    """
+    Plano de execução imutável, compilado uma vez a partir do estrategias_config_json
+    (ao iniciar a sessão ou quando as configurações mudam). Cada tick apenas percorre `steps`.
+    """
+    steps: tuple[PlanStep, ...]
+    logic: str
+    min_candles: int
+    unknown: tuple[str, ...] = ()
+    weights: tuple[float, ...] = ()       # Peso de cada estratégia (lógica WEIGHTED), alinhado com steps
+    threshold: float = DEFAULT_THRESHOLD  # Pontuação média mínima para decidir (lógica WEIGHTED)
+
+    def __bool__(self) -> bool:
+        return bool(self.steps)
+
+    @property
+    def trigger(self) -> str:
+        """TRIGGER_UPDATE se alguma estratégia precisa da vela aberta; caso contrário TRIGGER_CLOSE."""
+        return TRIGGER_UPDATE if any(step.trigger == TRIGGER_UPDATE for step in self.steps) else TRIGGER_CLOSE
+
+    def combine(self, scores: np.ndarray) -> np.ndarray:
+        """Decisões (+1/-1/0) para as pontuações das estratégias (uma linha por step), como em combine()."""
+        return combine(scores, self.logic, self.weights or None, self.threshold)
+
+    def decide(self, scores: dict[str, float]) -> str:
+        """Decisão ("buy", "sell" ou "hold") para as pontuações de cada estratégia (em falta = 0)."""
+        decision = self.combine(np.array([scores.get(step.name) or 0.0 for step in self.steps]))[0]
+        return score_to_decision(float(decision)) or "hold"
+
+    def weight(self, name: str) -> float:
+        if not self.weights:
+            return 1.0
+        return next((w for step, w in zip(self.steps, self.weights) if step.name == name), 1.0)
+
+
+def compile_plan(config: dict | None, logic: str | None = "OR", contract_type: str | None = None) -> StrategyPlan:
+    """
+    Compila a configuração de estratégias do utilizador num StrategyPlan.
+
+    :param config: O estrategias_config_json do utilizador.
+    :param logic: Lógica de combinação ("OR", "AND" ou "WEIGHTED"); na lógica WEIGHTED os pesos vêm de
+                  config['strategy_weights'] (nome -> peso, por omissão 1) e o limiar de
+                  config['decision_threshold'].
+    :param contract_type: Tipo de contrato; ACCUMULATOR com use_dynamic_sl exige aquecimento do ATR.
+    :return: O plano de execução.
+    """
+    config = config or {}
+    steps, unknown = [], []
+    min_candles = 1
+
+    for name in dict.fromkeys(config.get('strategies_enabled', [])):
+        module = get_strategy(name)
+        if module is None:
+            unknown.append(name)
+            continue
+        spec = module.SPEC
+        params = spec.resolve_params(config)
+        warmup = int(spec.warmup(params))
+        steps.append(PlanStep(
+            name=name,
+            params=tuple(params.items()),
+            warmup=warmup,
+            cost=spec.cost,
+            trigger=spec.trigger,
+            stream=partial(spec.stream, params) if spec.stream else None,
+        ))
+        min_candles = max(min_candles, warmup)
+
+    if contract_type == "ACCUMULATOR" and config.get('use_dynamic_sl', False):
+        min_candles = max(min_candles, int(config.get('atr_window') or 14) + 1)
+
+    weights = config.get('strategy_weights') or {}
+    if not isinstance(weights, dict):
+        logger.warning("strategy_weights inválido (%r); todas as estratégias com peso 1.", weights)
+        weights = {}
+    return StrategyPlan(
+        steps=tuple(steps),
+        logic=logic if logic in (LOGIC_AND, LOGIC_WEIGHTED) else LOGIC_OR,
+        min_candles=min_candles + WARMUP_MARGIN,
+        unknown=tuple(unknown),
+        weights=tuple(max(config_number(weights, step.name, 1.0, f"strategy_weights.{step.name}"), 0.0) for step in steps),
+        threshold=abs(config_number(config, 'decision_threshold', DEFAULT_THRESHOLD)),
+    )
+
+
+def outcome_decided(logic: str, scores: list[float], remaining: list[float],
+                    weights: list[float] | None = None, threshold: float = DEFAULT_THRESHOLD) -> bool:
+    """
+    Indica se as estratégias por avaliar já não podem mudar a decisão final.
+
+    AND: basta uma estratégia sem sinal ou duas em sentidos opostos para o resultado ser "hold".
+    OR: o lado com mais sinais vence; a decisão está tomada quando a diferença é maior do que
+        o número de estratégias por avaliar (uma diferença igual ainda pode acabar em empate).
+    WEIGHTED: a média final fica entre (S - R) / W e (S + R) / W, com S a soma pesada já conhecida,
+        R o peso das que faltam e W o peso total; está decidida se os dois extremos dão a mesma decisão.
+
+    :param scores: Pontuações já conhecidas.
+    :param remaining: Pesos das estratégias por avaliar (na lógica OR/AND só conta o número).
+    :param weights: Pesos das pontuações conhecidas (por omissão, 1).
+    """
+    if logic == LOGIC_AND:
+        return any(score == 0 for score in scores) or (any(score > 0 for score in scores) and any(score < 0 for score in scores))
+    if logic == LOGIC_WEIGHTED:
+        weights = weights if weights is not None else [1.0] * len(scores)
+        total = sum(weights) + sum(remaining)
+        if total <= 0:
+            return True
+        known = sum(w * score for w, score in zip(weights, scores))
+        low, high = threshold_decisions([(known - sum(remaining)) / total, (known + sum(remaining)) / total], threshold)
+        return low == high
+    balance = sum(score > 0 for score in scores) - sum(score < 0 for score in scores)
+    return abs(balance) > len(remaining)
+
+
+class StepStats:
+    """
+    Custo medido e seletividade de cada estratégia (médias móveis exponenciais, por nome),
+    usados para ordenar a avaliação de modo a que a decisão fique tomada o mais cedo possível.
+    """
+    def __init__(self, alpha: float = STATS_ALPHA):
+        self.alpha = alpha
+        self._stats: dict[str, dict] = {}
+        self._spec_costs: dict[str, float] = {}  # Custo declarado no SPEC de cada estratégia vista
+
+    def _entry(self, name: str) -> dict:
+        return self._stats.setdefault(name, {'seconds': None, 'signal_rate': DEFAULT_SIGNAL_RATE,
+                                             'evaluated': 0, 'skipped': 0})
+
+    def record(self, name: str, seconds: float, score: float):
+        """Regista uma avaliação: tempo gasto e se a estratégia deu sinal (pontuação diferente de 0)."""
+        entry = self._entry(name)
+        a = self.alpha
+        entry['seconds'] = seconds if entry['seconds'] is None else (1 - a) * entry['seconds'] + a * seconds
+        entry['signal_rate'] = (1 - a) * entry['signal_rate'] + a * (score != 0)
+        entry['evaluated'] += 1
+
+    def skip(self, name: str):
+        """Regista uma avaliação poupada (a decisão já estava tomada)."""
+        self._entry(name)['skipped'] += 1
+
+    def cost(self, step: PlanStep) -> float:
+        """
+        Custo esperado em segundos; sem medições, o custo declarado no SPEC convertido
+        pela razão média segundos/custo das estratégias já medidas.
+        """
+        entry = self._stats.get(step.name)
+        if entry and entry['seconds'] is not None:
+            return entry['seconds']
+        ratios = [e['seconds'] / c for n, e in self._stats.items()
+                  if e['seconds'] is not None and (c := self._spec_costs.get(n))]
+        return step.cost * (sum(ratios) / len(ratios) if ratios else 1.0)
+
+    def order(self, steps, logic: str) -> list[PlanStep]:
+        """
+        Ordena as estratégias por custo / probabilidade de decidirem o resultado:
+        em AND, a de não dar sinal (uma basta para "hold"); em OR/WEIGHTED, a de dar sinal.
+        """
+        for step in steps:
+            self._spec_costs[step.name] = step.cost
+
+        def rank(step: PlanStep) -> float:
+            rate = self._stats[step.name]['signal_rate'] if step.name in self._stats else DEFAULT_SIGNAL_RATE
+            decisive = 1 - rate if logic == LOGIC_AND else rate
+            return self.cost(step) / max(decisive, 0.01)
+
+        return sorted(steps, key=rank)
+
+    def snapshot(self) -> dict[str, dict]:
+        return {name: dict(entry) for name, entry in self._stats.items()}
+
+
+# Estatísticas partilhadas por todas as sessões do processo (o custo de uma estratégia não depende da sessão)
+step_stats = StepStats()
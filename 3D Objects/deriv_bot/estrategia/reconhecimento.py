@@ -1,45 +1,35 @@
 # estrategia/reconhecimento.py
+import numpy as np
 import pandas as pd
 
-def analyze(df: pd.DataFrame) -> str | None:
+from estrategia.spec import StrategySpec
+from utils import candle_patterns
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+
+# Padrões de 3 velas: Estrela da Manhã (fundo -> UP) e Estrela da Tarde (topo -> DOWN)
+STAR_PATTERNS = ("morning_star", "evening_star")
+
+SPEC = StrategySpec(name="reconhecimento", warmup=lambda p: 3, cost=0.1)
+
+def analyze(df: pd.DataFrame | CandleSnapshot) -> str | None:
     """
     Analisa padrões de velas de 3 dias: Estrela da Manhã e Estrela da Tarde.
     
-    :param df: DataFrame com 'open' e 'close'.
+    :param df: DataFrame (ou CandleSnapshot) com 'open', 'high', 'low' e 'close'.
     :return: "UP", "DOWN", ou None.
     """
     if len(df) < 3:
         return None
         
     try:
-        c0, c1, c2 = df.iloc[-3], df.iloc[-2], df.iloc[-1]
-        body = lambda c: abs(c['close'] - c['open'])
-        mid_point_c0 = (c0['open'] + c0['close']) / 2
+        return candle_patterns.last_signal(as_snapshot(df), STAR_PATTERNS)
+    except Exception:
+        return None
 
-        # Estrela da Manhã (Sinal de Fundo -> UP)
-        # 1. Vela de baixa forte.
-        # 2. Pequena vela (doji/pião) com gap de baixa.
-        # 3. Vela de alta que fecha acima do ponto médio da primeira vela.
-        is_morning_star = (c0['close'] < c0['open'] and  # 1. Baixa
-                           body(c1) < body(c0) and      # 2. Corpo pequeno
-                           c1['close'] < c0['close'] and    # Gap ou corpo baixo
-                           c2['close'] > c2['open'] and     # 3. Alta
-                           c2['close'] > mid_point_c0)    # Fecha acima do meio
-        if is_morning_star:
-            return "UP"
 
-        # Estrela da Tarde (Sinal de Topo -> DOWN)
-        # 1. Vela de alta forte.
-        # 2. Pequena vela (doji/pião) com gap de alta.
-        # 3. Vela de baixa que fecha abaixo do ponto médio da primeira vela.
-        is_evening_star = (c0['close'] > c0['open'] and  # 1. Alta
-                           body(c1) < body(c0) and      # 2. Corpo pequeno
-                           c1['close'] > c0['close'] and    # Gap ou corpo alto
-                           c2['close'] < c2['open'] and     # 3. Baixa
-                           c2['close'] < mid_point_c0)    # Fecha abaixo do meio
-        if is_evening_star:
-            return "DOWN"
-            
-        return None
-    except Exception:
-        return None
\ No newline at end of file
+def signals(df: pd.DataFrame | CandleSnapshot) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    return candle_patterns.pattern_signals(as_snapshot(df), STAR_PATTERNS)
@@ -0,0 +1,194 @@
+# estrategia/registry.py
+
+import ast
+import importlib
+import importlib.util
+import logging
+import threading
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from pathlib import Path
+
+from estrategia.spec import TRIGGER_CLOSE, TRIGGER_UPDATE
+
+# Registo de estratégias com carregamento preguiçoso.
+# As estratégias são descobertas sem as importar:
+#   - os módulos do pacote `estrategia` que declaram `SPEC = StrategySpec(...)`;
+#   - os módulos publicados por outros pacotes no grupo de entry points ENTRY_POINT_GROUP,
+#     ex: no pyproject.toml de um plugin:
+#         [project.entry-points."kingbot.estrategias"]
+#         minha_estrategia = "meu_pacote.minha_estrategia"
+# Os metadados (parâmetros, custo, gatilho) são lidos do código-fonte do SPEC (AST); o módulo,
+# e com ele pandas/ta, só é importado na primeira vez que get_strategy() o pede
+# (ex: quando um utilizador ativa a estratégia e o plano é compilado).
+
+ENTRY_POINT_GROUP = "kingbot.estrategias"
+
+logger = logging.getLogger(__name__)
+
+# Módulos do pacote que não são estratégias
+_INTERNAL_MODULES = {"__init__", "plan", "registry", "spec"}
+
+
+@dataclass(frozen=True)
+class StrategyInfo:
+    """
+    Metadados de uma estratégia, lidos sem importar o módulo.
+
+    :param name: Nome usado em estrategias_config_json['strategies_enabled'] (SPEC.name).
+    :param module: Caminho de importação do módulo.
+    :param params: (nome, valor padrão) de cada Param; o padrão é None se não for um literal.
+    :param warmup: Código-fonte da função de aquecimento (só informativo).
+    :param cost: Custo relativo declarado no SPEC.
+    :param trigger: TRIGGER_CLOSE ou TRIGGER_UPDATE.
+    :param streaming: Se o SPEC declara uma versão streaming.
+    :param origin: "builtin" (pacote estrategia) ou o nome da distribuição do entry point.
+    """
+    name: str
+    module: str
+    params: tuple[tuple[str, object], ...] = ()
+    warmup: str | None = None
+    cost: float = 1.0
+    trigger: str = TRIGGER_CLOSE
+    streaming: bool = False
+    origin: str = "builtin"
+
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name, 'module': self.module, 'params': dict(self.params), 'warmup': self.warmup,
+            'cost': self.cost, 'trigger': self.trigger, 'streaming': self.streaming, 'origin': self.origin,
+        }
+
+
+def _literal(node: ast.AST, constants: dict):
+    """Valor de um literal (ou de uma constante do módulo), sem executar código; None se não for possível."""
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def _read_spec(source: str, module: str, default_name: str | None = None, origin: str = "builtin") -> StrategyInfo | None:
+    """Extrai os metadados da atribuição `SPEC = StrategySpec(...)` do código-fonte de um módulo."""
+    tree = ast.parse(source)
+    constants = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1 or not isinstance(node.targets[0], ast.Name):
+            continue
+        target = node.targets[0].id
+        if target != "SPEC":
+            if (value := _literal(node.value, constants)) is not None:
+                constants[target] = value
+            continue
+        call = node.value
+        if not isinstance(call, ast.Call):
+            return None
+        kwargs = {kw.arg: kw.value for kw in call.keywords if kw.arg}
+        name = _literal(call.args[0], constants) if call.args else _literal(kwargs.get('name'), constants)
+        params = []
+        params_node = kwargs.get('params')
+        for param in getattr(params_node, 'elts', ()):
+            if isinstance(param, ast.Call) and param.args:
+                default = param.args[1] if len(param.args) > 1 else next(
+                    (kw.value for kw in param.keywords if kw.arg == 'default'), None)
+                params.append((_literal(param.args[0], constants),
+                               _literal(default, constants) if default is not None else None))
+        trigger = kwargs.get('trigger')
+        trigger = {"TRIGGER_UPDATE": TRIGGER_UPDATE, "TRIGGER_CLOSE": TRIGGER_CLOSE}.get(
+            getattr(trigger, 'id', None), _literal(trigger, constants) if trigger is not None else TRIGGER_CLOSE)
+        cost = _literal(kwargs['cost'], constants) if 'cost' in kwargs else 1.0
+        return StrategyInfo(
+            name=name or default_name,
+            module=module,
+            params=tuple(params),
+            warmup=ast.get_source_segment(source, kwargs['warmup']) if 'warmup' in kwargs else None,
+            cost=float(cost) if isinstance(cost, (int, float)) else 1.0,
+            trigger=trigger or TRIGGER_CLOSE,
+            streaming='stream' in kwargs,
+            origin=origin,
+        )
+    return None
+
+
+def _builtin_strategies() -> list[StrategyInfo]:
+    found = []
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        if path.stem in _INTERNAL_MODULES or path.stem.startswith("_"):
+            continue
+        try:
+            info = _read_spec(path.read_text(encoding='utf-8'), f"{__package__}.{path.stem}", path.stem)
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            logger.warning("Não foi possível ler '%s': %s", path.name, e)
+            continue
+        if info is not None:  # Sem SPEC não é uma estratégia (ex: atr.py)
+            found.append(info)
+    return found
+
+
+def _entry_point_strategies() -> list[StrategyInfo]:
+    found = []
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        origin = ep.dist.name if ep.dist else ENTRY_POINT_GROUP
+        info = None
+        try:
+            # find_spec localiza o ficheiro sem executar o módulo (só os pacotes pai são importados)
+            spec = importlib.util.find_spec(ep.module)
+            if spec and spec.origin and spec.origin.endswith(".py"):
+                info = _read_spec(Path(spec.origin).read_text(encoding='utf-8'), ep.module, ep.name, origin)
+        except Exception as e:
+            logger.warning("Entry point '%s' (%s) sem metadados legíveis: %s", ep.name, ep.value, e)
+        # Sem SPEC legível, a estratégia fica registada só com o nome; os metadados vêm ao importar
+        found.append(info or StrategyInfo(name=ep.name, module=ep.module, origin=origin))
+    return found
+
+
+_lock = threading.Lock()
+_available: dict[str, StrategyInfo] | None = None
+_loaded: dict[str, object] = {}
+
+
+def available_strategies(refresh: bool = False) -> dict[str, StrategyInfo]:
+    """Estratégias descobertas (nome -> StrategyInfo), sem importar nenhuma. As do pacote têm prioridade."""
+    global _available
+    with _lock:
+        if _available is None or refresh:
+            available = {}
+            for info in _builtin_strategies() + _entry_point_strategies():
+                if info.name in available:
+                    logger.warning("Estratégia '%s' de %s ignorada: nome já registado por %s.",
+                                   info.name, info.module, available[info.name].module)
+                    continue
+                available[info.name] = info
+            _available = available
+        return _available
+
+
+def get_strategy(name: str):
+    """
+    Retorna o módulo da estratégia `name`, importando-o na primeira chamada,
+    ou None se não estiver registada (ou se o módulo não puder ser importado).
+    """
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    info = available_strategies().get(name)
+    if info is None:
+        return None
+    try:
+        module = importlib.import_module(info.module)
+    except Exception as e:
+        logger.error("Falha ao importar a estratégia '%s' (%s): %s", name, info.module, e)
+        return None
+    spec = getattr(module, 'SPEC', None)
+    if spec is None or not hasattr(module, 'analyze'):
+        logger.error("O módulo %s não define SPEC e analyze(); estratégia '%s' ignorada.", info.module, name)
+        return None
+    _loaded[name] = module
+    return module
+
+
+def loaded_strategies() -> tuple[str, ...]:
+    """Nomes das estratégias cujo módulo já foi importado neste processo."""
+    return tuple(_loaded)
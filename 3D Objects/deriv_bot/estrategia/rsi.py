@@ -1,12 +1,35 @@
 # estrategia/rsi.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, rsi_period: int = 14, rsi_overbought: int = 70, rsi_oversold: int = 30) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import RSI, StreamingSignal
+
+SPEC = StrategySpec(
+    name="rsi",
+    params=(Param("rsi_period", 14), Param("rsi_overbought", 70, float), Param("rsi_oversold", 30, float)),
+    warmup=lambda p: p["rsi_period"] + 1,
+    cost=1.0,
+    stream=lambda p: RSIStream(**p),
+)
+
+def decide(prev_rsi: float, last_rsi: float, rsi_overbought: int = 70, rsi_oversold: int = 30) -> str | None:
+    """Regra de sinal do RSI, partilhada por analyze() e RSIStream."""
+    # Sinal de compra quando o RSI sai da zona de sobrevenda
+    if last_rsi > rsi_oversold and prev_rsi <= rsi_oversold:
+        return "UP"
+    # Sinal de venda quando o RSI sai da zona de sobrecompra
+    elif last_rsi < rsi_overbought and prev_rsi >= rsi_overbought:
+        return "DOWN"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, rsi_period: int = 14, rsi_overbought: int = 70, rsi_oversold: int = 30) -> str | None:
     """
     Analisa o Índice de Força Relativa (RSI) para sinais de reversão.
     
-    :param df: DataFrame do pandas com 'close'.
+    :param df: DataFrame do pandas (ou CandleSnapshot) com 'close'.
     :param rsi_period: Período do RSI.
     :param rsi_overbought: Nível de sobrecompra.
     :param rsi_oversold: Nível de sobrevenda.
@@ -16,21 +39,46 @@ def analyze(df: pd.DataFrame, rsi_period: int = 14, rsi_overbought: int = 70, rs
         return None
         
     try:
-        df['close'] = pd.to_numeric(df['close'], errors='coerce')
-        df = df.dropna(subset=['close'])
-        if df.empty or len(df) < rsi_period + 1: return None
-
-        df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=rsi_period).rsi()
-        last_rsi = df['rsi'].iloc[-1]
-        prev_rsi = df['rsi'].iloc[-2]
-
-        # Sinal de compra quando o RSI sai da zona de sobrevenda
-        if last_rsi > rsi_oversold and prev_rsi <= rsi_oversold:
-            return "UP"
-        # Sinal de venda quando o RSI sai da zona de sobrecompra
-        elif last_rsi < rsi_overbought and prev_rsi >= rsi_overbought:
-            return "DOWN"
-            
+        snapshot = as_snapshot(df)
+        if len(snapshot) < rsi_period + 1: return None
+
+        rsi_values = snapshot.indicator('rsi', window=rsi_period)
+        last_rsi = rsi_values[-1]
+        prev_rsi = rsi_values[-2]
+
+        return decide(prev_rsi, last_rsi, rsi_overbought, rsi_oversold)
+    except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, rsi_period: int = 14, rsi_overbought: int = 70, rsi_oversold: int = 30) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = rsi_period + 1
+    if len(snapshot) < warmup:
+        return no_signals(len(snapshot))
+
+    try:
+        last_rsi = snapshot.indicator('rsi', window=rsi_period)
+        prev_rsi = shift(last_rsi)
+        up = (last_rsi > rsi_oversold) & (prev_rsi <= rsi_oversold)
+        down = (last_rsi < rsi_overbought) & (prev_rsi >= rsi_overbought)
+        return to_signals(up, down, warmup)
     except Exception:
-        return None
\ No newline at end of file
+        return no_signals(len(snapshot))
+
+class RSIStream(StreamingSignal):
+    """Versão streaming de analyze(): atualiza o RSI em O(1) por vela fechada."""
+    def __init__(self, rsi_period: int = 14, rsi_overbought: int = 70, rsi_oversold: int = 30):
+        super().__init__()
+        self.rsi = RSI(rsi_period)
+        self.levels = (rsi_overbought, rsi_oversold)
+
+    def _compute(self, candle: dict, commit: bool):
+        close = float(candle['close'])
+        return self.rsi.update(close) if commit else self.rsi.peek(close)
+
+    def _decide(self, prev, last):
+        return decide(prev, last, *self.levels)
@@ -0,0 +1,69 @@
+# estrategia/spec.py
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Metadados declarados por cada módulo de estratégia (variável SPEC).
+# Este módulo não importa pandas/ta: pode ser lido sem custo no arranque.
+
+# Quando a estratégia deve ser avaliada
+TRIGGER_CLOSE = "close"    # Uma vez por vela, quando a vela fecha
+TRIGGER_UPDATE = "update"  # A cada atualização da vela aberta (ex: toque intra-vela numa banda)
+
+
+@dataclass(frozen=True)
+class Param:
+    """
+    Parâmetro aceite pelo analyze() de uma estratégia.
+
+    :param name: Nome do argumento no analyze().
+    :param default: Valor usado quando a configuração do utilizador não o define.
+    :param type: Conversão aplicada ao valor vindo do estrategias_config_json; se o valor não
+                 puder ser convertido (ex: "abc" num período), usa-se o valor padrão.
+    :param config_keys: Chaves lidas do estrategias_config_json, por ordem de preferência
+                        (por omissão, o próprio nome do argumento).
+    """
+    name: str
+    default: Any
+    type: Callable = int
+    config_keys: tuple[str, ...] = ()
+
+    def resolve(self, config: dict) -> Any:
+        for key in self.config_keys or (self.name,):
+            if config.get(key) is not None:
+                try:
+                    return self.type(config[key])
+                except (TypeError, ValueError, OverflowError):
+                    logger.warning("Valor inválido para '%s' (%r); a usar o padrão %r.", key, config[key], self.default)
+                    return self.default
+        return self.default
+
+
+@dataclass(frozen=True)
+class StrategySpec:
+    """
+    Descrição de uma estratégia para o registo e para o plano de execução.
+
+    :param name: Nome usado em estrategias_config_json['strategies_enabled'].
+    :param params: Parâmetros do analyze(), com valores padrão.
+    :param warmup: Função que, dados os parâmetros resolvidos, retorna o número
+                   mínimo de velas de que a estratégia precisa.
+    :param cost: Custo relativo estimado de uma avaliação (1.0 = um indicador `ta` simples).
+    :param trigger: TRIGGER_CLOSE (avaliada só com velas fechadas, uma vez por vela) ou
+                    TRIGGER_UPDATE (avaliada a cada atualização, incluindo a vela aberta).
+    :param stream: Opcional: dados os parâmetros resolvidos, cria a versão streaming (StreamingSignal)
+                   que a sessão ao vivo atualiza vela a vela em vez de chamar analyze() sobre todo
+                   o histórico (com TRIGGER_UPDATE, a vela aberta é avaliada com peek()).
+    """
+    name: str
+    params: tuple[Param, ...] = ()
+    warmup: Callable[[dict], int] = lambda params: 1
+    cost: float = 1.0
+    trigger: str = TRIGGER_CLOSE
+    stream: Callable[[dict], Any] | None = None
+
+    def resolve_params(self, config: dict) -> dict:
+        return {param.name: param.resolve(config) for param in self.params}
@@ -1,39 +1,68 @@
 # estrategia/volume.py
+import numpy as np
 import pandas as pd
 
-def analyze(df: pd.DataFrame, volume_factor: float = 1.5, volume_history_periods: int = 20) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, to_signals
+
+SPEC = StrategySpec(
+    name="volume",
+    params=(Param("volume_factor", 1.5, float), Param("volume_history_periods", 20)),
+    warmup=lambda p: p["volume_history_periods"],
+    cost=0.5,
+)
+
+def analyze(df: pd.DataFrame | CandleSnapshot, volume_factor: float = 1.5, volume_history_periods: int = 20) -> str | None:
     """
     Analisa picos de volume que podem indicar o início ou clímax de um movimento.
     
-    :param df: DataFrame com 'volume', 'close', 'open'.
+    :param df: DataFrame (ou CandleSnapshot) com 'volume', 'close', 'open'.
     :param volume_factor: Fator de multiplicação para a média de volume.
     :param volume_history_periods: Período para calcular a média de volume.
     :return: "UP", "DOWN", ou None.
     """
-    if 'volume' not in df.columns or len(df) < volume_history_periods:
+    if 'volume' not in df or len(df) < volume_history_periods:
         return None
         
     try:
-        df['volume'] = pd.to_numeric(df['volume'], errors='coerce')
-        df = df.dropna(subset=['volume'])
-        if df.empty or len(df) < volume_history_periods: return None
+        snapshot = as_snapshot(df)
+        if 'volume' not in snapshot or len(snapshot) < volume_history_periods: return None
 
         # Calcula a média móvel do volume
-        df['volume_avg'] = df['volume'].rolling(window=volume_history_periods, min_periods=10).mean()
-        
-        last_candle = df.iloc[-1]
-        
+        volume_avg = snapshot.indicator('sma', window=volume_history_periods, column='volume', min_periods=10)
+
+        last_open, last_close = snapshot['open'][-1], snapshot['close'][-1]
+
         # Verifica se o volume da última vela é significativamente maior que a média
-        is_volume_spike = last_candle['volume'] > (last_candle['volume_avg'] * volume_factor)
+        is_volume_spike = snapshot['volume'][-1] > (volume_avg[-1] * volume_factor)
 
         if is_volume_spike:
             # Se o pico de volume ocorreu numa vela de alta, sinaliza UP
-            if last_candle['close'] > last_candle['open']:
+            if last_close > last_open:
                 return "UP"
             # Se o pico de volume ocorreu numa vela de baixa, sinaliza DOWN
-            elif last_candle['close'] < last_candle['open']:
+            elif last_close < last_open:
                 return "DOWN"
                 
         return None
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+def signals(df: pd.DataFrame | CandleSnapshot, volume_factor: float = 1.5, volume_history_periods: int = 20) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    if 'volume' not in snapshot or len(snapshot) < volume_history_periods:
+        return no_signals(len(snapshot))
+
+    try:
+        volume_avg = snapshot.indicator('sma', window=volume_history_periods, column='volume', min_periods=10)
+        is_volume_spike = snapshot['volume'] > (volume_avg * volume_factor)
+        close, open_ = snapshot['close'], snapshot['open']
+        return to_signals(is_volume_spike & (close > open_), is_volume_spike & (close < open_), volume_history_periods)
+    except Exception:
+        return no_signals(len(snapshot))
@@ -1,50 +1,88 @@
 # estrategia/vwap.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, vwap_window: int = 14) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import VWAP, StreamingSignal
+
+SPEC = StrategySpec(
+    name="vwap",
+    params=(Param("vwap_window", 14),),
+    warmup=lambda p: p["vwap_window"] + 1,
+    cost=1.0,
+    stream=lambda p: VWAPStream(**p),
+)
+
+def decide(prev_close: float, prev_vwap: float, last_close: float, last_vwap: float) -> str | None:
+    """Regra de sinal do VWAP, partilhada por analyze() e VWAPStream."""
+    # Sinal de compra (UP): Preço cruza para cima do VWAP
+    if prev_close <= prev_vwap and last_close > last_vwap:
+        return "buy"
+    # Sinal de venda (DOWN): Preço cruza para baixo do VWAP
+    elif prev_close >= prev_vwap and last_close < last_vwap:
+        return "sell"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, vwap_window: int = 14) -> str | None:
     """
     Analisa o cruzamento do preço com o VWAP (Volume-Weighted Average Price).
     Um sinal de "UP" é gerado quando o preço de fecho cruza para cima do VWAP.
     Um sinal de "DOWN" é gerado quando o preço de fecho cruza para baixo do VWAP.
 
-    :param df: DataFrame com 'high', 'low', 'close', 'volume'.
+    :param df: DataFrame (ou CandleSnapshot) com 'high', 'low', 'close', 'volume'.
     :param vwap_window: A janela de cálculo para o VWAP.
     :return: "UP", "DOWN", ou None.
     """
-    if 'volume' not in df.columns or len(df) < vwap_window + 1:
+    if 'volume' not in df or len(df) < vwap_window + 1:
         return None
 
     try:
-        # Garante que os dados de entrada são numéricos
-        for col in ['high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        df = df.dropna(subset=['high', 'low', 'close', 'volume'])
-        if df.empty or len(df) < vwap_window + 1: return None
+        snapshot = as_snapshot(df)
+        if 'volume' not in snapshot or len(snapshot) < vwap_window + 1: return None
 
         # Calcula o VWAP
-        df['vwap'] = ta.volume.VolumeWeightedAveragePrice(
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
-            volume=df['volume'],
-            window=vwap_window
-        ).volume_weighted_average_price()
+        vwap_values = snapshot.indicator('vwap', window=vwap_window)
+        close = snapshot['close']
 
         # Obtém os dados mais recentes para a decisão
-        last_close = df['close'].iloc[-1]
-        prev_close = df['close'].iloc[-2]
-        last_vwap = df['vwap'].iloc[-1]
-        prev_vwap = df['vwap'].iloc[-2]
-
-        # Sinal de compra (UP): Preço cruza para cima do VWAP
-        if prev_close <= prev_vwap and last_close > last_vwap:
-            return "buy"
-        # Sinal de venda (DOWN): Preço cruza para baixo do VWAP
-        elif prev_close >= prev_vwap and last_close < last_vwap:
-            return "sell"
-        
-        return None
+        return decide(close[-2], vwap_values[-2], close[-1], vwap_values[-1])
 
     except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, vwap_window: int = 14) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = vwap_window + 1
+    if 'volume' not in snapshot or len(snapshot) < warmup:
+        return no_signals(len(snapshot))
+
+    try:
+        last_vwap = snapshot.indicator('vwap', window=vwap_window)
+        last_close = snapshot['close']
+        prev_vwap, prev_close = shift(last_vwap), shift(last_close)
+        up = (prev_close <= prev_vwap) & (last_close > last_vwap)
+        down = (prev_close >= prev_vwap) & (last_close < last_vwap)
+        return to_signals(up, down, warmup)
+    except Exception:
+        return no_signals(len(snapshot))
+
+class VWAPStream(StreamingSignal):
+    """Versão streaming de analyze(): VWAP móvel atualizado em O(1) por vela fechada."""
+    def __init__(self, vwap_window: int = 14):
+        super().__init__()
+        self.vwap = VWAP(vwap_window)
+
+    def _compute(self, candle: dict, commit: bool):
+        close = float(candle['close'])
+        args = (float(candle['high']), float(candle['low']), close, float(candle.get('volume', 0)))
+        vwap = self.vwap.update(*args) if commit else self.vwap.peek(*args)
+        return None if vwap is None else (close, vwap)
+
+    def _decide(self, prev, last):
+        return decide(*prev, *last)
@@ -1,14 +1,42 @@
 # estrategia/williams_r.py
+import numpy as np
 import pandas as pd
-import ta
 
-def analyze(df: pd.DataFrame, williams_period: int = 14, williams_overbought: int = -20, williams_oversold: int = -80) -> str | None:
+from estrategia.spec import Param, StrategySpec
+from utils.indicator_cache import CandleSnapshot, as_snapshot
+from utils.signal_series import no_signals, shift, to_signals
+from utils.streaming_indicators import StreamingSignal, WilliamsR
+
+SPEC = StrategySpec(
+    name="williams_r",
+    params=(
+        Param("williams_period", 14),
+        Param("williams_overbought", -20, float),
+        Param("williams_oversold", -80, float),
+    ),
+    warmup=lambda p: max(p["williams_period"], 2),
+    cost=1.0,
+    stream=lambda p: WilliamsRStream(**p),
+)
+
+def decide(prev_williams_r: float, last_williams_r: float, williams_overbought: int = -20,
+           williams_oversold: int = -80) -> str | None:
+    """Regra de sinal do Williams %R, partilhada por analyze() e WilliamsRStream."""
+    # Sinal de compra (UP): Cruza acima do nível de sobrevenda
+    if prev_williams_r <= williams_oversold and last_williams_r > williams_oversold:
+        return "buy"
+    # Sinal de venda (DOWN): Cruza abaixo do nível de sobrecompra
+    elif prev_williams_r >= williams_overbought and last_williams_r < williams_overbought:
+        return "sell"
+    return None
+
+def analyze(df: pd.DataFrame | CandleSnapshot, williams_period: int = 14, williams_overbought: int = -20, williams_oversold: int = -80) -> str | None:
     """
     Analisa o Williams %R (Percent Range).
     Sinal "UP": Indicador cruza para cima do nível de sobrevenda.
     Sinal "DOWN": Indicador cruza para baixo do nível de sobrecompra.
 
-    :param df: DataFrame com 'high', 'low', 'close'.
+    :param df: DataFrame (ou CandleSnapshot) com 'high', 'low', 'close'.
     :param williams_period: Período de cálculo.
     :param williams_overbought: Nível de sobrecompra (geralmente -20).
     :param williams_oversold: Nível de sobrevenda (geralmente -80).
@@ -18,33 +46,52 @@ def analyze(df: pd.DataFrame, williams_period: int = 14, williams_overbought: in
         return None
 
     try:
-        for col in ['high', 'low', 'close']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        df = df.dropna(subset=['high', 'low', 'close'])
-        if df.empty or len(df) < williams_period: return None
+        snapshot = as_snapshot(df)
+        if len(snapshot) < williams_period: return None
 
         # Calcula o Williams %R
-        df['williams_r'] = ta.momentum.WilliamsRIndicator(
-            high=df['high'],
-            low=df['low'],
-            close=df['close'],
-            lbp=williams_period
-        ).williams_r()
+        williams_values = snapshot.indicator('williams_r', lbp=williams_period)
+        if len(williams_values) < 2: return None
 
         # Obtém os valores mais recentes
-        last_williams_r = df['williams_r'].iloc[-1]
-        prev_williams_r = df['williams_r'].iloc[-2] if len(df) >= 2 else None
-
-        if prev_williams_r is None: return None
-
-        # Sinal de compra (UP): Cruza acima do nível de sobrevenda
-        if prev_williams_r <= williams_oversold and last_williams_r > williams_oversold:
-            return "buy"
-        # Sinal de venda (DOWN): Cruza abaixo do nível de sobrecompra
-        elif prev_williams_r >= williams_overbought and last_williams_r < williams_overbought:
-            return "sell"
-        
-        return None
+        last_williams_r = williams_values[-1]
+        prev_williams_r = williams_values[-2]
+
+        return decide(prev_williams_r, last_williams_r, williams_overbought, williams_oversold)
 
     except Exception:
         return None
+
+def signals(df: pd.DataFrame | CandleSnapshot, williams_period: int = 14, williams_overbought: int = -20, williams_oversold: int = -80) -> np.ndarray:
+    """
+    Versão vetorizada de analyze(): série com o sinal de cada vela (+1 UP, -1 DOWN, 0),
+    como se essa vela fosse a última. Usada pelo backtest.
+    """
+    snapshot = as_snapshot(df)
+    warmup = max(williams_period, 2)
+    if len(snapshot) < warmup:
+        return no_signals(len(snapshot))
+
+    try:
+        last_williams_r = snapshot.indicator('williams_r', lbp=williams_period)
+        prev_williams_r = shift(last_williams_r)
+        up = (prev_williams_r <= williams_oversold) & (last_williams_r > williams_oversold)
+        down = (prev_williams_r >= williams_overbought) & (last_williams_r < williams_overbought)
+        return to_signals(up, down, warmup)
+    except Exception:
+        return no_signals(len(snapshot))
+
+class WilliamsRStream(StreamingSignal):
+    """Versão streaming de analyze(): %R atualizado em O(1) por vela fechada."""
+    def __init__(self, williams_period: int = 14, williams_overbought: int = -20, williams_oversold: int = -80):
+        super().__init__()
+        self.williams_r = WilliamsR(williams_period)
+        self.levels = (williams_overbought, williams_oversold)
+
+    def _compute(self, candle: dict, commit: bool):
+        args = (float(candle['high']), float(candle['low']), float(candle['close']))
+        return self.williams_r.update(*args) if commit else self.williams_r.peek(*args)
+
+    def _decide(self, prev, last):
+        return decide(prev, last, *self.levels)
+
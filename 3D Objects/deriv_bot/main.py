@@ -1,13 +1,11 @@
 # ==================== IMPORTS ====================
 import asyncio
-import json
+import math
 import websockets
 import time
-import traceback
-from datetime import datetime
-from typing import Literal, Dict, Any, Union
-import pandas as pd
-import inspect
+import uuid
+from datetime import datetime, timezone
+from typing import Literal, Dict, Any, List, Union
 
 # Tortoise ORM imports
 from tortoise.contrib.fastapi import register_tortoise
@@ -26,31 +24,30 @@ import socketio
 
 # Módulos de configuração e segurança
 from core.config import settings
+from core.log import get_logger, setup_logging
 from auth.router import router as auth_router
 from models.user import User
 
 # Utilitários e Estratégias
 from utils.candle_builder import CandleBuilder
-from estrategia import (
-    reconhecimento, rsi, bollinger, fibonacci,
-    moving_average, adx, volume, padroes_vela,
-    vwap, macd_histogram, williams_r, atr 
-)
-
-# Mapeia nomes de string para módulos de estratégia
-STRATEGY_MODULES = {
-    "reconhecimento": reconhecimento, 
-    "rsi": rsi, 
-    "bollinger": bollinger,
-    "fibonacci": fibonacci, 
-    "moving_average": moving_average, 
-    "adx": adx,
-    "volume": volume, 
-    "padroes_vela": padroes_vela,
-    "vwap": vwap, 
-    "macd_histogram": macd_histogram, 
-    "williams_r": williams_r,
-}
+from utils.market_data import MarketDataHub, MarketFeed, TimeframeSubscription
+from utils.market_recorder import MarketRecorder
+from utils.deriv_client import DerivAPIError, DerivClient, Subscription
+from utils.log_stream import LEVELS as LOG_LEVELS, LogClients, LogStream, as_json
+from utils.proposal_prefetch import ProposalPrefetcher
+from utils.streaming_indicators import ClosedBarStream
+from utils.scheduler import PRIORITY_HIGH, PRIORITY_LOW, DecisionScheduler
+from utils.strategy_executor import ExecutorBusy, StaleWork, StrategyExecutor, run_steps
+from utils.performance import PerformanceStore
+from utils.trade_journal import TradeJournal
+from utils.signal_series import LOGIC_AND, LOGIC_WEIGHTED, weighted_score
+from estrategia.plan import StrategyPlan, compile_plan, outcome_decided, score_to_decision, step_stats, to_score
+from estrategia.registry import available_strategies, loaded_strategies
+from estrategia.spec import TRIGGER_CLOSE, TRIGGER_UPDATE
+
+# Logs do processo em JSON, escritos por uma thread à parte (o event loop nunca espera pelo stdout)
+setup_logging(settings.LOG_LEVELS, settings.LOG_FILE, settings.LOG_MAX_BYTES, settings.LOG_BACKUP_COUNT)
+logger = get_logger(__name__)
 
 # ==================== AUTENTICAÇÃO E DEPENDÊNCIAS ====================
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -96,7 +93,7 @@ class SettingsUpdate(BaseModel):
     stake: float | None = None
     duration: int | None = None
     candle_granularity: int | None = None
-    logica_estrategia: Literal["OR", "AND"] | None = None
+    logica_estrategia: Literal["OR", "AND", "WEIGHTED"] | None = None
     contract_type_to_trade: Literal["CALLPUT", "ACCUMULATOR", "MULTIPLIER"] | None = None
     
     take_profit: int | None = None 
@@ -112,6 +109,22 @@ class SettingsUpdate(BaseModel):
 
     estrategias_config_json: Dict[str, Any] = Field(default_factory=dict) 
 
+MAX_OPTIMIZER_CANDIDATES = 500  # Combinações (ou amostras) avaliadas no máximo por otimização
+
+class OptimizerRange(BaseModel):
+    """Intervalo de valores de um parâmetro, para amostras aleatórias."""
+    min: Union[int, float]  # Inteiros nos dois extremos geram inteiros
+    max: Union[int, float]
+
+class OptimizeRequest(BaseModel):
+    """Schema para uma otimização de parâmetros das estratégias sobre o histórico recente."""
+    settings: SettingsUpdate
+    # Ex: {"rsi_period": [7, 14, 21], "rsi_oversold": [20, 30]}; com `samples`, também intervalos {"min": 10, "max": 40}
+    grid: Dict[str, Union[List[Any], OptimizerRange]]
+    samples: int | None = Field(None, ge=1, le=MAX_OPTIMIZER_CANDIDATES)  # Amostras aleatórias da grelha em vez de todas as combinações
+    candle_count: int = Field(5000, ge=100, le=5000)
+    top: int = Field(10, ge=1, le=50)
+
 class UserPublic(BaseModel):
     """Schema para dados públicos do usuário (sem informações sensíveis)."""
     id: int
@@ -124,7 +137,7 @@ class UserPublic(BaseModel):
     stake: Union[float, None] = None
     duration: Union[int, None] = None
     candle_granularity: Union[int, None] = None
-    logica_estrategia: Union[Literal["OR", "AND"], None] = None
+    logica_estrategia: Union[Literal["OR", "AND", "WEIGHTED"], None] = None
     contract_type_to_trade: Union[Literal["CALLPUT", "ACCUMULATOR", "MULTIPLIER"], None] = None
 
     take_profit: Union[int, None] = None
@@ -146,6 +159,10 @@ class UserPublic(BaseModel):
 
 # ==================== CONSTANTS ====================
 DERIV_WS_URL = "wss://ws.binaryws.com/websockets/v3?app_id=1089" # Use o seu App ID
+PROPOSAL_TIMEOUT = 5.0   # Segundos à espera da resposta a uma 'proposal'
+BUY_TIMEOUT = 10.0       # Segundos à espera da resposta a um 'buy'
+ORPHAN_BUY_GRACE = 30.0  # Segundos à espera da transação de um 'buy' sem resposta, com o trading parado
+KEEPALIVE_INTERVAL = 30  # Segundos sem tráfego antes de enviar um 'ping' (a Deriv fecha ligações inativas)
 
 # ==================== FASTAPI + SOCKET.IO SETUP ====================
 app = FastAPI(title="KingBot API")
@@ -153,46 +170,193 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], all
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*")
 socket_app = socketio.ASGIApp(sio, app)
 
+# Uma subscrição pública de velas por (símbolo, granularidade), partilhada por todas as sessões
+# No modo "process" as velas ficam em memória partilhada: os workers leem-nas sem serialização
+# Em MARKET_DATA_MODE="ticks", um único stream de ticks por símbolo alimenta todas as granularidades
+# Com MARKET_RECORDER_DIR, os ticks e as velas recebidos ficam gravados em disco (para backtests e replays)
+market_recorder = MarketRecorder(
+    settings.MARKET_RECORDER_DIR,
+    chunk_rows=settings.MARKET_RECORDER_CHUNK_ROWS,
+    max_age=settings.MARKET_RECORDER_MAX_AGE,
+) if settings.MARKET_RECORDER_DIR else None
+market_data_hub = MarketDataHub(
+    DERIV_WS_URL,
+    shared=settings.STRATEGY_EXECUTOR == "process",
+    mode=settings.MARKET_DATA_MODE,
+    tick_granularities=tuple(int(g) for g in settings.TICK_GRANULARITIES.split(',') if g.strip()),
+    recorder=market_recorder,
+)
+
+# Avaliação das estratégias fora do event loop (thread/process/inline, ver core/config.py)
+strategy_executor = StrategyExecutor(settings.STRATEGY_EXECUTOR, settings.STRATEGY_WORKERS, settings.STRATEGY_QUEUE_SIZE)
+
+# Agendador central das decisões: funde pedidos repetidos, limita a concorrência e é justo entre sessões
+decision_scheduler = DecisionScheduler(settings.DECISION_CONCURRENCY)
+
+# Nível mínimo de log escolhido por cada cliente do dashboard (evento 'set_log_level')
+log_clients = LogClients(settings.LOG_LEVEL)
+
+
+# Trades gravados em lote em segundo plano (a sessão nunca espera pela base de dados)
+trade_journal = TradeJournal(batch_size=settings.TRADE_JOURNAL_BATCH, flush_interval=settings.TRADE_JOURNAL_INTERVAL)
+# Win rate, P/L, drawdown e sequências por utilizador/estratégia, atualizados a cada contrato fechado
+performance = PerformanceStore(flush_interval=settings.PERFORMANCE_FLUSH_INTERVAL)
+
+
+@app.on_event("shutdown")
+async def shutdown_market_and_executor():
+    strategy_executor.shutdown()
+    # Fecha os feeds e liberta a memória partilhada das velas
+    await market_data_hub.close()
+    if market_recorder:
+        await market_recorder.close()
+    # Grava os trades pendentes antes de a base de dados fechar (registada depois, em register_tortoise)
+    await trade_journal.close()
+    await performance.close()
+
 # ==================== BOT SESSION ====================
 user_bot_sessions: Dict[int, 'BotSession'] = {}
+user_optimizations: Dict[int, asyncio.Task] = {}
 
 class BotSession:
     def __init__(self, user_id: int, deriv_token: str, initial_settings: SettingsUpdate, sio_server: socketio.AsyncServer):
         self.user_id = user_id
         self.sio = sio_server
-        self.ws: websockets.WebSocketClientProtocol | None = None
+        self.client: DerivClient | None = None
+        self.prefetcher: ProposalPrefetcher | None = None
         self.token = deriv_token
         self.user_settings = initial_settings
         self.running = False
         self.is_trading_enabled = False
         self.active_contract_id: str | None = None
         self.active_contract_buy_price: float = 0.0
+        self.contract_task: asyncio.Task | None = None
+        self.trade_task: asyncio.Task | None = None  # proposal -> buy em curso, fora do decision_scheduler
+        self._orphan_buy = False  # Um 'buy' ficou sem resposta: a transação de compra confirma-o
+        self._orphan_timer: asyncio.TimerHandle | None = None  # Fim da espera por essa transação
         self.run_task: asyncio.Task | None = None
+        self._signal: dict | None = None      # Última decisão de compra/venda (para o diário de trades)
+        self._open_trade: dict | None = None  # Campos do Trade do contrato ativo, gravado quando fecha
+        self.session_id = uuid.uuid4().hex[:12]
+        self.logger = get_logger(f"{__name__}.session", user_id=user_id, session_id=self.session_id)
+        # Logs filtrados por nível, limitados e enviados em lotes aos clientes da sala do utilizador
+        self.logs = LogStream(sio_server.emit, str(user_id), log_clients, logger=self.logger,
+                              console_level=settings.LOG_CONSOLE_LEVEL)
+
+        # Mensagens de fluxo (subscrições) despachadas por msg_type
+        self.stream_handlers = {
+            'transaction': self.on_transaction,
+            'proposal_open_contract': self.on_open_contract,
+        }
 
-        self.candle_builder = CandleBuilder(initial_settings.candle_granularity or 60)
+        # O CandleBuilder pertence ao feed partilhado do market_data_hub (atribuído em connect_and_run)
+        self.market_feed: MarketFeed | TimeframeSubscription | None = None
+        self.candle_builder: CandleBuilder | None = None
+        self._market_event = asyncio.Event()
         self.current_symbol = "R_100"
+        self.plan: StrategyPlan = self.compile_strategy_plan(initial_settings)
+        self.reset_decision_state()
         self.trade_count, self.win_count, self.loss_count, self.total_profit_loss = 0, 0, 0, 0.0
-        print(f"Sessão Bot inicializada para user {self.user_id}")
-        print(f"Configurações iniciais do bot: {initial_settings.dict()}")
-
-
-    async def send_log(self, message: str, level: str = 'info'):
-        print(f"[User {self.user_id}][{level.upper()}] {message}")
-        await self.sio.emit('bot_log', {'message': message, 'level': level}, room=str(self.user_id))
+        self.logger.info("Sessão Bot inicializada.")
+        self.logger.debug("Configurações iniciais do bot: %s", initial_settings.dict())
+
+
+    def compile_strategy_plan(self, session_settings: SettingsUpdate) -> StrategyPlan:
+        """Compila as estratégias configuradas num plano imutável (uma vez por início/alteração)."""
+        plan = compile_plan(
+            session_settings.estrategias_config_json,
+            session_settings.logica_estrategia,
+            session_settings.contract_type_to_trade,
+        )
+        if plan.unknown:
+            self.logger.warning("Estratégias desconhecidas ignoradas: %s", ', '.join(plan.unknown))
+        return plan
+
+    def reset_decision_state(self):
+        """Limpa a marca d'água da última decisão e os sinais memorizados das velas fechadas."""
+        self._evaluated_mark = None      # (closed_count, revision) da última avaliação
+        self._close_signals = {}         # Pontuações das estratégias TRIGGER_CLOSE para a última vela fechada
+        self._close_signals_mark = None  # closed_count a que _close_signals corresponde
+        self._streams: dict[str, ClosedBarStream] = {}  # Estado incremental das estratégias com stream
+        self._last_scores: dict[str, float] = {}  # Pontuações da última avaliação completa
+
+    def decision_mark(self) -> tuple:
+        """
+        Marca d'água dos dados relevantes para o plano: só o número de velas fechadas se todas
+        as estratégias são TRIGGER_CLOSE; também a revisão da vela aberta se alguma é TRIGGER_UPDATE.
+        """
+        builder = self.candle_builder
+        return builder.closed_count, (builder.revision if self.plan.trigger == TRIGGER_UPDATE else None)
+
+    async def send_log(self, message: str, level: str = 'info', *args):
+        """
+        Envia uma mensagem para a consola e para o dashboard (em lotes, ver utils/log_stream.py).
+        Com `args`, a mensagem é formatada (`message % args`) só se algum destino a mostrar.
+        """
+        self.logs.log(message, level, *args)
 
     async def update_status_to_client(self):
         await self.sio.emit('bot_status_update', {'running': self.running}, room=str(self.user_id))
 
     def reset_session_state(self, new_settings: SettingsUpdate):
-        self.running, self.is_trading_enabled, self.ws, self.active_contract_id = False, False, None, None
+        self.running, self.is_trading_enabled, self.client, self.active_contract_id = False, False, None, None
+        self.contract_task = None
+        self.clear_orphan_buy()
         self.trade_count, self.win_count, self.loss_count, self.total_profit_loss = 0, 0, 0, 0.0
         self.active_contract_buy_price = 0.0
         self.run_task = None
 
         if new_settings.deriv_token: self.token = new_settings.deriv_token
         self.user_settings = new_settings
-        self.candle_builder = CandleBuilder(new_settings.candle_granularity or 60)
-        print(f"DEBUG: BotSession resetada para user {self.user_id} com novas configurações: {new_settings.dict()}")
+        self.plan = self.compile_strategy_plan(new_settings)
+        # O feed (e a sua memória partilhada) não é largado aqui: release_market_feed() cancela a subscrição
+        self.reset_decision_state()
+        self.logger.debug("BotSession resetada com novas configurações: %s", new_settings.dict())
+
+    async def release_market_feed(self):
+        """
+        Cancela a subscrição ao feed partilhado. Quando a última sessão sai, o hub fecha o feed
+        e o CandleBuilder liberta o seu segmento de memória partilhada.
+        """
+        feed, self.market_feed, self.candle_builder = self.market_feed, None, None
+        if feed is not None:
+            await market_data_hub.unsubscribe(feed, self.on_market_event)
+
+    def on_market_event(self, event: str, builder: CandleBuilder):
+        """Listener do feed partilhado: apenas acorda o market_loop desta sessão."""
+        self._market_event.set()
+
+    async def market_loop(self):
+        """
+        Pede uma avaliação ao decision_scheduler quando o feed partilhado muda (ou a cada 2s, como antes).
+        Sessões sem contrato aberto têm prioridade; a avaliação em si corre em decision_cycle().
+        """
+        while self.running:
+            try:
+                await asyncio.wait_for(self._market_event.wait(), timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+            self._market_event.clear()
+            if not self.running:
+                break
+            if self.is_trading_enabled:
+                priority = PRIORITY_LOW if self.active_contract_id else PRIORITY_HIGH
+                decision_scheduler.request(self.user_id, self.decision_cycle, priority)
+
+    async def decision_cycle(self) -> str | None:
+        """
+        Uma avaliação agendada pelo decision_scheduler. Só a avaliação ocupa a vaga do agendador:
+        a proposta e a compra correm numa tarefa da sessão (trade_task), que discard() não cancela.
+        """
+        try:
+            decision = await self.make_decision()
+        except Exception as e:
+            await self.send_log(f"Erro no ciclo de decisão: {e}", 'error')
+            self.logger.exception("Erro no ciclo de decisão.")
+            return None
+        if decision is not None:
+            self.trade_task = asyncio.create_task(self.execute_trade(decision))
+        return decision
 
     async def connect_and_run(self):
         if self.running:
@@ -203,282 +367,514 @@ class BotSession:
         await self.update_status_to_client()
         await self.send_log("A iniciar o bot...", 'info')
 
+        market_task = None
         try:
-            async with websockets.connect(DERIV_WS_URL) as ws:
-                self.ws = ws
+            # Agregados de desempenho em memória antes do primeiro contrato fechar
+            await performance.load(self.user_id)
+            granularity = self.user_settings.candle_granularity or 60
+            await self.send_log(f"A subscrever ao histórico de velas ({granularity}s)...", 'info')
+            await self.release_market_feed()  # Nunca mais de uma subscrição por sessão
+            self.market_feed = await market_data_hub.subscribe(self.current_symbol, granularity, self.on_market_event)
+            self.candle_builder = self.market_feed.builder
+            self.reset_decision_state()
+            market_task = asyncio.create_task(self.market_loop())
+
+            # A ligação autenticada do utilizador só transporta o tráfego de trading
+            async with DerivClient(DERIV_WS_URL) as client:
+                self.client = client
+                for msg_type, handler in self.stream_handlers.items():
+                    client.on(msg_type, handler)
                 await self.send_log("Conectado à Deriv. A autenticar...", 'info')
-                await self.ws.send(json.dumps({"authorize": self.token}))
+                try:
+                    await self.on_authorize(await client.send({"authorize": self.token}))
+                except DerivAPIError as e:
+                    await self.send_log(f"Erro da API (authorize): {e.message}", 'error')
+                    await self.send_log("Falha na autenticação. Verifique seu token da Deriv.", 'error')
+                    return
+
+                # As velas chegam pelo market_data_hub; aqui só se subscreve às transações da conta
+                transactions = await client.subscribe({"transaction": 1})
+
+                # Modo opcional: propostas subscritas para os dois lados, prontas a comprar
+                if (self.user_settings.estrategias_config_json or {}).get('prefetch_proposals', False):
+                    self.prefetcher = ProposalPrefetcher(client, self.send_log)
+                    await self.prefetcher.sync(self.proposal_payloads())
+                    await self.send_log("Pré-carregamento de propostas ativo.", 'info')
+                self.is_trading_enabled = True
 
+                last_activity = time.monotonic()
                 while self.running:
                     try:
-                        message = await asyncio.wait_for(self.ws.recv(), timeout=2.0)
+                        data = await transactions.get(timeout=2.0)
                         if not self.running:
                             break
-                        await self.process_message(json.loads(message))
+                        last_activity = time.monotonic()
+                        await self.dispatch(data)
                     except asyncio.TimeoutError:
                         if not self.running:
                             break
-                        if self.is_trading_enabled and not self.active_contract_id:
-                            await self.make_decision_and_trade()
+                        if client.closed.is_set():
+                            await self.send_log("Conexão WebSocket foi fechada.", 'warning')
+                            break
+                        if time.monotonic() - last_activity > KEEPALIVE_INTERVAL:
+                            last_activity = time.monotonic()
+                            asyncio.create_task(self.keepalive())
                         continue
                     except websockets.exceptions.ConnectionClosed:
                         await self.send_log("Conexão WebSocket foi fechada.", 'warning')
                         break
                     except Exception as e:
                         await self.send_log(f"Erro no loop principal: {e}", 'error')
-                        traceback.print_exc()
+                        self.logger.exception("Erro no loop principal.")
                         break
+        except DerivAPIError as e:
+            await self.send_log(f"Erro da API ({e.msg_type}): {e.message}", 'error')
         except Exception as e:
             await self.send_log(f"Falha crítica ao conectar à Deriv: {e}", 'error')
-            traceback.print_exc()
+            self.logger.exception("Falha crítica ao conectar à Deriv.")
         finally:
             self.running = False
             self.is_trading_enabled = False
+            self.clear_orphan_buy()
+            for task in (market_task, self.contract_task):
+                if task and not task.done():
+                    task.cancel()
+            decision_scheduler.discard(self.user_id)
+            if self.prefetcher:
+                await self.prefetcher.close()
+                self.prefetcher = None
+            await self.release_market_feed()
+            if self._open_trade:
+                # A sessão parou com o contrato aberto: fica no diário sem resultado
+                trade_journal.record(**self._open_trade)
+                self._open_trade = None
             await self.update_status_to_client()
             await self.send_log("Bot parado.", 'info')
+            await self.logs.close()
 
-    async def process_message(self, data: dict):
-        msg_type = data.get('msg_type')
+    async def keepalive(self):
+        try:
+            await self.client.send({"ping": 1})
+        except Exception as e:
+            await self.send_log(f"Falha no ping à Deriv: {e}", 'warning')
 
+    async def dispatch(self, data: dict):
+        """Despacha uma mensagem de fluxo pela tabela stream_handlers."""
+        msg_type = data.get('msg_type')
         if 'error' in data:
-            error_message = data['error'].get('message', 'Erro desconhecido.')
-            await self.send_log(f"Erro da API ({msg_type}): {error_message}", 'error')
-            if msg_type == 'authorize':
-                self.running = False
-                await self.send_log("Falha na autenticação. Verifique seu token da Deriv.", 'error')
-            if msg_type in ['buy', 'proposal']:
-                self.is_trading_enabled = True
+            await self.send_log(f"Erro da API ({msg_type}): {data['error'].get('message', 'Erro desconhecido.')}", 'error')
             return
+        if handler := self.stream_handlers.get(msg_type):
+            await handler(data)
+        else:
+            await self.send_log("Mensagem não tratada: %s - %s", "debug", msg_type, as_json(data))
 
-        if msg_type == 'authorize':
-            await self.send_log("Autenticação bem-sucedida.", 'success')
-            await self.sio.emit('account_info', data['authorize'], room=str(self.user_id))
-
-            await self.send_log(f"A subscrever ao histórico de velas ({self.user_settings.candle_granularity}s)...", 'info')
-            await self.ws.send(json.dumps({
-                "ticks_history": self.current_symbol,
-                "style": "candles",
-                "granularity": self.user_settings.candle_granularity,
-                "end": "latest",
-                "count": 750,
-                "subscribe": 1
-            }))
-            await self.ws.send(json.dumps({"transaction": 1, "subscribe": 1}))
-            self.is_trading_enabled = True
-
-        elif msg_type == 'ohlc':
-            if candle_data := data.get('ohlc'):
-                self.candle_builder.add_candle(candle_data)
-                await self.make_decision_and_trade()
-
-        elif msg_type == 'proposal':
-            if not (proposal_id := data.get('proposal', {}).get('id')):
-                await self.send_log("Proposta inválida recebida. A tentar novamente...", 'error')
-                self.is_trading_enabled = True
-                return
-            await self.send_log(f"Proposta recebida (ID: {proposal_id}). A comprar contrato...", 'info')
-            self.active_contract_buy_price = float(data.get('proposal', {}).get('ask_price', self.user_settings.stake))
-            await self.buy_contract(proposal_id)
-
-        elif msg_type == 'buy':
-            contract_details = data['buy']
-            self.active_contract_id = contract_details['contract_id']
-            self.trade_count += 1
-            await self.send_log(f"Contrato comprado! ID: {self.active_contract_id}, Preço: {contract_details.get('buy_price'):.2f} USD", 'success')
-            await self.ws.send(json.dumps({"proposal_open_contract": 1, "contract_id": self.active_contract_id, "subscribe": 1}))
-
-        elif msg_type == 'proposal_open_contract':
-            contract = data.get('proposal_open_contract')
-            if contract and contract.get('contract_id') == self.active_contract_id and contract.get('is_sold'):
-                await self.process_sold_contract(contract)
-
-        elif msg_type == 'transaction' and (tx := data.get('transaction')):
-            if tx.get('action') == 'sell' and tx.get('contract_id') == self.active_contract_id:
-                sell_price = float(tx.get('amount', 0))
-                profit_or_loss = sell_price - self.active_contract_buy_price
-                balance_after = tx.get('balance_after')
-
-                await self.send_log(f"Transação de fecho detectada (ID: {tx['contract_id']}). Lucro/Prejuízo: {profit_or_loss:.2f}", 'info')
+    async def on_authorize(self, data: dict):
+        await self.send_log("Autenticação bem-sucedida.", 'success')
+        await self.sio.emit('account_info', data['authorize'], room=str(self.user_id))
 
-                closed_contract_data = {
-                    'profit': profit_or_loss,
-                    'contract_id': tx['contract_id'],
-                    'is_sold': 1,
-                    'balance_after': balance_after
-                }
-                await self.process_sold_contract(closed_contract_data)
+    async def on_open_contract(self, data: dict):
+        contract = data.get('proposal_open_contract')
+        if contract and contract.get('contract_id') == self.active_contract_id and contract.get('is_sold'):
+            await self.process_sold_contract(contract)
 
-        elif msg_type == 'ping':
-            await self.ws.send(json.dumps({"pong": 1}))
+    async def on_transaction(self, data: dict):
+        if not (tx := data.get('transaction')):
+            return
 
-        elif msg_type != 'tick' and msg_type != 'transaction':
-            await self.send_log(f"Mensagem não tratada: {msg_type} - {json.dumps(data)}", "debug")
+        if tx.get('action') == 'buy' and self._orphan_buy and not self.active_contract_id:
+            # A resposta ao 'buy' perdeu-se, mas a compra foi executada: adota o contrato
+            self.clear_orphan_buy()
+            self.is_trading_enabled = False
+            await self.send_log(f"Compra confirmada pela transação (ID: {tx.get('contract_id')}).", 'warning')
+            await self.track_contract(tx.get('contract_id'), abs(float(tx.get('amount', 0))))
+
+        elif tx.get('action') == 'sell' and tx.get('contract_id') == self.active_contract_id:
+            sell_price = float(tx.get('amount', 0))
+            profit_or_loss = sell_price - self.active_contract_buy_price
+            balance_after = tx.get('balance_after')
+
+            await self.send_log(f"Transação de fecho detectada (ID: {tx['contract_id']}). Lucro/Prejuízo: {profit_or_loss:.2f}", 'info')
+
+            closed_contract_data = {
+                'profit': profit_or_loss,
+                'sell_price': sell_price,
+                'sell_time': tx.get('transaction_time'),
+                'contract_id': tx['contract_id'],
+                'is_sold': 1,
+                'balance_after': balance_after
+            }
+            await self.process_sold_contract(closed_contract_data)
 
+    async def make_decision(self) -> Literal["buy", "sell"] | None:
+        """
+        Avalia as estratégias e, se houver sinal, prepara o trade (desativa o trading e guarda o sinal).
 
-    async def make_decision_and_trade(self):
+        :return: A ação a executar com execute_trade(), ou None.
+        """
         if not self.running or not self.is_trading_enabled or self.active_contract_id:
             return
+        if self.candle_builder is None:
+            return
 
-        df = self.candle_builder.get_dataframe()
-
-        min_period_required = 1
-        active_strategies = self.user_settings.estrategias_config_json.get('strategies_enabled', [])
-
-        for strategy_name in active_strategies:
-            strategy_params_map = {
-                "rsi": ("rsi_period", 14), "bollinger": ("bollinger_period", 20),
-                "moving_average": ("ma_window", 20), "adx": ("adx_period", 14),
-                "volume": ("volume_history_periods", 20), "fibonacci": ("fib_period", 50),
-                "vwap": ("vwap_window", 14), "macd_histogram": ("macd_slow", 26),
-                "williams_r": ("williams_period", 14),
-            }
-            if strategy_name in strategy_params_map:
-                param_key, default_period = strategy_params_map[strategy_name]
-                configured_period = self.user_settings.estrategias_config_json.get(param_key, default_period)
-                min_period_required = max(min_period_required, int(configured_period))
-
-        if self.user_settings.contract_type_to_trade == "ACCUMULATOR" and \
-           self.user_settings.estrategias_config_json.get('use_dynamic_sl', False):
-            atr_window = self.user_settings.estrategias_config_json.get('atr_window', 14)
-            min_period_required = max(min_period_required, int(atr_window) + 1)
-
-        min_period_required += 5
+        # Nada mudou desde a última decisão (mesma vela fechada e, se aplicável, mesma revisão)
+        mark = self.decision_mark()
+        if mark == self._evaluated_mark:
+            return
+        self._evaluated_mark = mark
 
-        if df.empty or len(df) < min_period_required:
-            await self.send_log(f"A aguardar dados suficientes. Necessário {min_period_required} velas, encontrado {len(df)}.", "debug")
+        min_period_required = self.plan.min_candles
+        if self.candle_builder.closed_size < min_period_required:
+            await self.send_log("A aguardar dados suficientes. Necessário %d velas, encontrado %d.", "debug",
+                                min_period_required, self.candle_builder.closed_size)
             return
 
-        decision = await self.apply_strategies(df)
+        decision = await self.apply_strategies()
 
         if decision in ["buy", "sell"]:
             await self.send_log(f"Decisão final: {decision.upper()} para {self.user_settings.contract_type_to_trade}. A enviar proposta...", 'info')
             self.is_trading_enabled = False
-            await self.propose_contract(decision)
-
-    async def apply_strategies(self, df: pd.DataFrame) -> Literal["buy", "sell", "hold"]:
-        strategies_conf = self.user_settings.estrategias_config_json or {}
-        active_strategies = strategies_conf.get('strategies_enabled', [])
-        if not active_strategies: return "hold"
-
-        signals = []
-        for name in active_strategies:
-            if module := STRATEGY_MODULES.get(name):
+            self._signal = {
+                'action': decision,
+                'strategies': {name: round(score, 4) for name, score in self._last_scores.items() if score},
+                'signal_at': datetime.now(timezone.utc),
+                'started': time.perf_counter(),
+            }
+            # Os sinais desta vela fechada foram consumidos; não voltam a disparar até a próxima fechar
+            # (incluindo as estratégias que a avaliação em curto-circuito não chegou a correr)
+            self._close_signals = {step.name: 0.0 for step in self.plan.steps if step.trigger == TRIGGER_CLOSE}
+            return decision
+        return None
+
+    async def apply_strategies(self) -> Literal["buy", "sell", "hold"]:
+        plan = self.plan
+        if not plan: return "hold"
+
+        builder = self.candle_builder
+        closed_mark = builder.closed_count
+        if self._close_signals_mark != closed_mark:
+            self._close_signals, self._close_signals_mark = {}, closed_mark
+
+        # Pontuação de cada estratégia em [-1, 1] (+1/-1 = UP/DOWN, 0 = sem sinal)
+        step_scores: dict[str, float] = {}
+        fresh, pending = [], []
+        for step in plan.steps:
+            if step.trigger == TRIGGER_CLOSE and step.name in self._close_signals:
+                step_scores[step.name] = self._close_signals[step.name]
+            elif step.stream is not None:
+                # Indicadores mantidos vela a vela (StreamingSignal): O(1) por vela, fica no event loop
                 try:
-                    strategy_params = {k: v for k, v in strategies_conf.items()}
-                    analyze_func = getattr(module, 'analyze')
-                    sig_params = inspect.signature(analyze_func).parameters
-                    filtered_params = {}
-                    if name == "rsi": filtered_params = { "rsi_period": strategy_params.get('rsi_period', 14), "rsi_overbought": strategy_params.get('rsi_overbought', 70), "rsi_oversold": strategy_params.get('rsi_oversold', 30), }
-                    elif name == "bollinger": filtered_params = { "bollinger_period": strategy_params.get('bollinger_period', 20), "bollinger_dev": strategy_params.get('bollinger_std_dev', 2.0), }
-                    elif name == "macd_histogram": filtered_params = { "macd_fast": strategy_params.get('macd_fast', 12), "macd_slow": strategy_params.get('macd_slow', 26), "macd_sign": strategy_params.get('macd_sign', 9), }
-                    elif name == "adx": filtered_params = { "adx_period": strategy_params.get('adx_period', 14), "adx_threshold": strategy_params.get('adx_threshold', 25), }
-                    elif name == "moving_average": filtered_params = { "ma_window": strategy_params.get('ma_window', 20), }
-                    elif name == "volume": filtered_params = { "volume_factor": strategy_params.get('volume_factor', 1.5), "volume_history_periods": strategy_params.get('volume_history_periods', 20), }
-                    elif name == "fibonacci": filtered_params = { "fib_period": strategy_params.get('fib_period', 50), }
-                    elif name == "vwap": filtered_params = { "vwap_window": strategy_params.get('vwap_window', 14), }
-                    elif name == "williams_r": filtered_params = { "williams_period": strategy_params.get('williams_period', 14), "williams_overbought": strategy_params.get('williams_overbought', -20), "williams_oversold": strategy_params.get('williams_oversold', -80), }
-
-                    if 'send_log' in sig_params: sig = analyze_func(df.copy(), **filtered_params, send_log=self.send_log)
-                    else: sig = analyze_func(df.copy(), **filtered_params)
-                    if sig == "buy": sig = "UP"
-                    if sig == "sell": sig = "DOWN"
-                    if sig in ["UP", "DOWN"]:
-                        await self.send_log(f"Sinal de '{name}': {sig}", 'debug')
-                        signals.append("buy" if sig == "UP" else "sell")
+                    if step.name not in self._streams:
+                        self._streams[step.name] = ClosedBarStream(step.stream)
+                    stream = self._streams[step.name]
+                    if step.trigger == TRIGGER_CLOSE:
+                        step_scores[step.name] = to_score(stream.update(builder))
+                        self._close_signals[step.name] = step_scores[step.name]
+                    else:
+                        step_scores[step.name] = to_score(stream.peek(builder))
+                    fresh.append(step.name)
                 except Exception as e:
-                    await self.send_log(f"Erro ao executar estratégia '{name}': {e}", 'error')
-                    traceback.print_exc()
-
-        if not signals: return "hold"
-
-        logic = self.user_settings.logica_estrategia
-        final_decision = "hold"
-        if logic == "AND":
-            if len(signals) == len(active_strategies) and all(s == signals[0] for s in signals):
-                final_decision = signals[0]
-                await self.send_log(f"Lógica AND: Todas as {len(active_strategies)} estratégias concordaram em '{final_decision.upper()}'.", "debug")
-        else:
-            buy_count = signals.count("buy")
-            sell_count = signals.count("sell")
-            if buy_count > sell_count: final_decision = "buy"
-            elif sell_count > buy_count: final_decision = "sell"
-            if final_decision != "hold":
-                 await self.send_log(f"Lógica OR: Decisão final é '{final_decision.upper()}' baseada em {signals}.", "debug")
+                    await self.send_log(f"Erro ao executar estratégia '{step.name}': {e}", 'error')
+                    self.logger.exception("Erro ao executar a estratégia '%s'.", step.name)
+            else:
+                pending.append(step)
+
+        # Curto-circuito: as pontuações já conhecidas podem bastar para decidir (ex: AND com uma estratégia sem sinal)
+        pending_names = {step.name for step in pending}
+        known = tuple((step_scores.get(step.name, 0.0), plan.weight(step.name))
+                      for step in plan.steps if step.name not in pending_names)
+        if pending and outcome_decided(plan.logic, [score for score, _ in known],
+                                       [plan.weight(step.name) for step in pending],
+                                       [weight for _, weight in known], plan.threshold):
+            for step in pending:
+                step_stats.skip(step.name)
+            pending = []
+
+        if pending:
+            # As que mais provavelmente decidem o resultado, e mais baratas, primeiro
+            pending = step_stats.order(pending, plan.logic)
+            results = await self.evaluate_steps(pending, known)
+            # Descartado (havia dados mais recentes) ou uma nova vela fechou entretanto: decide-se na próxima
+            if results is None or self.candle_builder is not builder or builder.closed_count != closed_mark:
+                return "hold"
+            for step in pending:
+                if step.name not in results:  # Não foi preciso avaliá-la
+                    step_stats.skip(step.name)
+                    continue
+                score, error, seconds = results[step.name]
+                step_stats.record(step.name, seconds, score)
+                if error:
+                    await self.send_log(f"Erro ao executar estratégia '{step.name}': {error}", 'error')
+                step_scores[step.name] = score
+                if step.trigger == TRIGGER_CLOSE:
+                    self._close_signals[step.name] = score
+                fresh.append(step.name)
+
+        debug = self.logs.enabled('debug')
+        for name in fresh if debug else ():
+            if score := step_scores.get(name):
+                strength = f" ({score:+.2f})" if abs(score) != 1 else ""
+                await self.send_log("Sinal de '%s': %s%s", 'debug', name, 'UP' if score > 0 else 'DOWN', strength)
+        self._last_scores = step_scores
+        if not any(step_scores.values()): return "hold"
+
+        # Uma única redução vetorizada sobre as pontuações (a mesma regra do backtest)
+        final_decision = plan.decide(step_scores)
+        if final_decision != "hold" and debug:
+            if plan.logic == LOGIC_AND:
+                await self.send_log("Lógica AND: Todas as %d estratégias concordaram em '%s'.", "debug", len(plan.steps), final_decision.upper())
+            elif plan.logic == LOGIC_WEIGHTED:
+                total = float(weighted_score([step_scores.get(step.name) or 0.0 for step in plan.steps], plan.weights)[0])
+                await self.send_log("Lógica WEIGHTED: Decisão final é '%s' (pontuação %+.2f, limiar %.2f).", "debug",
+                                    final_decision.upper(), total, plan.threshold)
+            else:
+                signals = [score_to_decision(score) for step in plan.steps if (score := step_scores.get(step.name))]
+                await self.send_log("Lógica OR: Decisão final é '%s' baseada em %s.", "debug", final_decision.upper(), signals)
 
         return final_decision
 
-    async def propose_contract(self, action: Literal["buy", "sell"]):
-        try:
-            payload = {
-                "proposal": 1,
-                "amount": self.user_settings.stake,
-                "basis": "stake",
-                "currency": "USD",
-                "symbol": self.current_symbol
+    async def evaluate_steps(self, steps, known: tuple = ()) -> dict | None:
+        """
+        Executa o analyze() das estratégias no strategy_executor, fora do event loop.
+        A ordem por sessão é garantida pelo executor; se chegarem velas novas antes de a
+        avaliação começar, só o pedido mais recente é avaliado.
+
+        :param known: (pontuação, peso) das restantes estratégias do plano; a avaliação para
+                      quando a decisão já está tomada (ver run_steps).
+        :return: nome -> (pontuação, erro, segundos) das estratégias avaliadas, ou None se o
+                 pedido foi descartado ou recusado.
+        """
+        builder = self.candle_builder
+        if builder.shared is not None:
+            # O worker lê as velas diretamente da memória partilhada do builder
+            arrays = builder.shared
+        else:
+            # Cópias das velas por gatilho: TRIGGER_CLOSE vê só as velas fechadas, TRIGGER_UPDATE inclui a aberta
+            arrays = {
+                trigger: {col: arr.copy() for col, arr in builder.get_arrays(closed_only=trigger == TRIGGER_CLOSE).items()}
+                for trigger in {step.trigger for step in steps}
             }
-            ctype = self.user_settings.contract_type_to_trade
-            s_conf = self.user_settings.estrategias_config_json or {}
-
-            if ctype == "CALLPUT":
-                payload.update({
-                    "contract_type": "CALL" if action == "buy" else "PUT",
-                    "duration": self.user_settings.duration,
-                    "duration_unit": "s"
-                })
-            elif ctype == "ACCUMULATOR":
-                if action == "sell":
-                    await self.send_log("Aviso: ACCUMULATOR não suporta 'SELL'. Operação ignorada.", 'warning')
-                    self.is_trading_enabled = True
+        plan = self.plan
+        tasks = tuple((step.name, step.params, step.trigger, plan.weight(step.name)) for step in steps)
+        mark = self.decision_mark()
+        try:
+            return await strategy_executor.submit(
+                self.user_id, run_steps, tasks, arrays, self.current_symbol, builder.granularity,
+                (plan.logic, plan.threshold), known, builder.history_version,
+                is_current=lambda: self.candle_builder is builder and self.decision_mark() == mark,
+            )
+        except StaleWork:
+            return None
+        except ExecutorBusy as e:
+            await self.send_log(f"{e}. A avaliação fica para o próximo ciclo.", 'warning')
+            self._evaluated_mark = None  # Volta a tentar mesmo sem velas novas
+            return None
+
+    def build_proposal(self, action: Literal["buy", "sell"]) -> tuple[dict | None, str | None]:
+        """
+        Monta o pedido 'proposal' para a ação e o tipo de contrato configurado.
+
+        :return: (payload, aviso). O payload é None se a ação não for suportada pelo contrato.
+        """
+        warning = None
+        payload = {
+            "proposal": 1,
+            "amount": self.user_settings.stake,
+            "basis": "stake",
+            "currency": "USD",
+            "symbol": self.current_symbol
+        }
+        ctype = self.user_settings.contract_type_to_trade
+
+        if ctype == "CALLPUT":
+            payload.update({
+                "contract_type": "CALL" if action == "buy" else "PUT",
+                "duration": self.user_settings.duration,
+                "duration_unit": "s"
+            })
+        elif ctype == "ACCUMULATOR":
+            if action == "sell":
+                return None, "Aviso: ACCUMULATOR não suporta 'SELL'. Operação ignorada."
+
+            payload.update({
+                "contract_type": "ACCU",
+                "growth_rate": self.user_settings.accumulator_growth_rate or 0.02,
+            })
+
+            # A API está a rejeitar take_profit e stop_loss para ACCUMULATOR na proposta.
+            # A lógica foi removida para evitar o erro. O contrato funcionará sem TP/SL definidos.
+            warning = "Aviso: TP/SL não serão definidos para Accumulator para evitar erro da API."
+
+        elif ctype == "MULTIPLIER":
+            payload.update({
+                "contract_type": "MULTUP" if action == "buy" else "MULTDOWN",
+                "multiplier": self.user_settings.multiplier_value or 100,
+            })
+            if tp := self.user_settings.take_profit_multiplier: payload['take_profit'] = tp
+            if sl := self.user_settings.stop_loss_multiplier: payload['stop_loss'] = sl
+
+        # Garantia final de que 'duration' não é enviado para contratos errados
+        if ctype != "CALLPUT":
+            payload.pop('duration', None)
+            payload.pop('duration_unit', None)
+        return payload, warning
+
+    def proposal_payloads(self) -> dict[str, dict]:
+        """Pedidos 'proposal' de cada lado suportado pelo contrato configurado (ex: ACCU só tem "buy")."""
+        payloads = {}
+        for action in ("buy", "sell"):
+            payload, _ = self.build_proposal(action)
+            if payload is not None:
+                payloads[action] = payload
+        return payloads
+
+    async def execute_trade(self, action: Literal["buy", "sell"]):
+        """
+        proposal -> buy -> proposal_open_contract, cada pedido com o seu timeout.
+        Com o pré-carregamento ativo compra logo com a última proposta recebida.
+        Uma resposta de erro ou em falta volta a ativar o trading em vez de deixar a sessão presa.
+        """
+        try:
+            payload, warning = self.build_proposal(action)
+            if warning:
+                await self.send_log(warning, 'warning')
+            if payload is None:
+                self.is_trading_enabled = True
+                return
+
+            if self.prefetcher:
+                # Se os parâmetros mudaram, as subscrições são renovadas e a compra segue o caminho normal
+                await self.prefetcher.sync(self.proposal_payloads())
+                if proposal := self.prefetcher.take(action):
+                    await self.send_log(f"Proposta pré-carregada (ID: {proposal['id']}). A comprar contrato...", 'info')
+                    try:
+                        await self.buy_contract(proposal['id'], float(proposal.get('ask_price', self.user_settings.stake)))
+                    finally:
+                        await self.prefetcher.renew(action)
                     return
 
-                payload.update({
-                    "contract_type": "ACCU",
-                    "growth_rate": self.user_settings.accumulator_growth_rate or 0.02,
-                })
-
-                # A API está a rejeitar take_profit e stop_loss para ACCUMULATOR na proposta.
-                # A lógica foi removida para evitar o erro. O contrato funcionará sem TP/SL definidos.
-                await self.send_log("Aviso: TP/SL não serão definidos para Accumulator para evitar erro da API.", "warning")
-
-            elif ctype == "MULTIPLIER":
-                payload.update({
-                    "contract_type": "MULTUP" if action == "buy" else "MULTDOWN",
-                    "multiplier": self.user_settings.multiplier_value or 100,
-                })
-                if tp := self.user_settings.take_profit_multiplier: payload['take_profit'] = tp
-                if sl := self.user_settings.stop_loss_multiplier: payload['stop_loss'] = sl
-
-            # Garantia final de que 'duration' não é enviado para contratos errados
-            if ctype != "CALLPUT":
-                payload.pop('duration', None)
-                payload.pop('duration_unit', None)
-
-            await self.send_log(f"Enviando proposta com payload: {json.dumps(payload)}", "debug")
-            await self.ws.send(json.dumps(payload))
+            await self.send_log("Enviando proposta com payload: %s", "debug", as_json(payload))
+            proposal = (await self.client.send(payload, timeout=PROPOSAL_TIMEOUT)).get('proposal', {})
+            if not (proposal_id := proposal.get('id')):
+                await self.send_log("Proposta inválida recebida. A tentar novamente...", 'error')
+                self.is_trading_enabled = True
+                return
+            await self.send_log(f"Proposta recebida (ID: {proposal_id}). A comprar contrato...", 'info')
+            await self.buy_contract(proposal_id, float(proposal.get('ask_price', self.user_settings.stake)))
+
+        except DerivAPIError as e:
+            await self.send_log(f"Erro da API ({e.msg_type}): {e.message}", 'error')
+            self.is_trading_enabled = True
+        except asyncio.TimeoutError:
+            await self.send_log("A Deriv não respondeu à proposta a tempo. A tentar novamente...", 'warning')
+            self.is_trading_enabled = True
         except Exception as e:
             await self.send_log(f"Erro ao enviar proposta: {e}", "error")
-            traceback.print_exc()
+            self.logger.exception("Erro ao enviar proposta.")
             self.is_trading_enabled = True
 
-    async def buy_contract(self, proposal_id: str):
+    async def buy_contract(self, proposal_id: str, ask_price: float):
+        payload = {"buy": proposal_id, "price": ask_price}
+        await self.send_log("Enviando ordem de compra: %s", 'debug', as_json(payload))
         try:
-            payload = {"buy": proposal_id, "price": self.active_contract_buy_price}
-            await self.send_log(f"Enviando ordem de compra: {json.dumps(payload)}", 'debug')
-            await self.ws.send(json.dumps(payload))
-        except Exception as e:
-            await self.send_log(f"Erro ao comprar contrato: {e}", "error")
+            contract_details = (await self.client.send(payload, timeout=BUY_TIMEOUT))['buy']
+        except asyncio.TimeoutError:
+            # A compra pode ter sido executada; se for, a transação 'buy' da conta adota o contrato.
+            # Até lá (ou até ORPHAN_BUY_GRACE) o trading fica parado, para não abrir um segundo contrato.
+            await self.send_log("A Deriv não respondeu à compra a tempo. A verificar pelas transações...", 'warning')
+            self.clear_orphan_buy()
+            self._orphan_buy = True
+            self._orphan_timer = asyncio.get_running_loop().call_later(ORPHAN_BUY_GRACE, self.orphan_buy_expired)
+            return
+
+        self.trade_count += 1
+        await self.send_log(f"Contrato comprado! ID: {contract_details['contract_id']}, Preço: {contract_details.get('buy_price'):.2f} USD", 'success')
+        await self.track_contract(contract_details['contract_id'], float(contract_details.get('buy_price', ask_price)))
+
+    def clear_orphan_buy(self):
+        """Deixa de esperar pela transação de um 'buy' sem resposta."""
+        self._orphan_buy = False
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+
+    def orphan_buy_expired(self):
+        """A transação do 'buy' sem resposta não chegou a tempo: a compra não foi executada."""
+        self._orphan_timer = None
+        if not self._orphan_buy:
+            return
+        self._orphan_buy = False  # Um 'buy' posterior na conta já não é adotado
+        self.logs.log("A compra sem resposta não foi confirmada pelas transações. A retomar o trading.", 'warning')
+        if self.running and not self.active_contract_id:
             self.is_trading_enabled = True
 
+    async def track_contract(self, contract_id, buy_price: float):
+        """Regista o contrato ativo e subscreve as suas atualizações num fluxo próprio."""
+        self.active_contract_id = contract_id
+        self.active_contract_buy_price = buy_price
+        self._open_trade = self.new_trade(contract_id, buy_price)
+        stream = await self.client.subscribe({"proposal_open_contract": 1, "contract_id": contract_id})
+        self.contract_task = asyncio.create_task(self.watch_contract(stream, contract_id))
+
+    def new_trade(self, contract_id, buy_price: float) -> dict:
+        """Campos do Trade de um contrato acabado de comprar, com a latência desde o sinal que o originou."""
+        signal, self._signal = self._signal or {}, None
+        started = signal.get('started')
+        return {
+            'contract_id': int(contract_id),
+            'user_id': self.user_id,
+            'session_id': self.session_id,
+            'symbol': self.current_symbol,
+            'contract_type': self.user_settings.contract_type_to_trade or "CALLPUT",
+            'action': signal.get('action', ''),
+            'strategies': signal.get('strategies', {}),
+            'stake': float(self.user_settings.stake or 0.0),
+            'buy_price': buy_price,
+            'signal_at': signal.get('signal_at'),
+            'bought_at': datetime.now(timezone.utc),
+            'signal_to_buy_ms': (time.perf_counter() - started) * 1000 if started else None,
+        }
+
+    def close_trade(self, contract: dict, profit: float):
+        """
+        Completa o Trade do contrato ativo com o fecho, passa-o ao diário (gravado em lote) e junta o
+        resultado aos agregados de desempenho do utilizador e das estratégias que deram o sinal.
+        """
+        trade, self._open_trade = self._open_trade, None
+        if trade is None:
+            performance.record(self.user_id, profit)
+            return
+        sell_time = contract.get('sell_time')
+        trade.update(
+            profit=profit,
+            sell_price=float(contract['sell_price']) if contract.get('sell_price') is not None else None,
+            entry_spot=float(contract['entry_spot']) if contract.get('entry_spot') is not None else None,
+            exit_spot=float(spot) if (spot := contract.get('exit_tick', contract.get('sell_spot'))) is not None else None,
+            closed_at=datetime.fromtimestamp(sell_time, timezone.utc) if sell_time else datetime.now(timezone.utc),
+        )
+        trade_journal.record(**trade)
+        performance.record(self.user_id, profit, trade['strategies'], trade['closed_at'])
+
+    async def watch_contract(self, stream: Subscription, contract_id):
+        try:
+            async for data in stream:
+                await self.dispatch(data)
+                if self.active_contract_id != contract_id:
+                    break
+        finally:
+            await stream.forget()
+
     async def process_sold_contract(self, contract):
         profit = float(contract['profit'])
         contract_id = contract['contract_id']
         balance_after = contract.get('balance_after')
 
         if contract_id != self.active_contract_id:
-            await self.send_log(f"Recebido fecho para contrato antigo ({contract_id}). Ignorando.", "debug")
+            await self.send_log("Recebido fecho para contrato antigo (%s). Ignorando.", "debug", contract_id)
             return
 
         self.total_profit_loss += profit
+        self.close_trade(contract, profit)
 
         if profit >= 0:
             self.win_count += 1
@@ -528,8 +924,8 @@ class BotSession:
             except Exception as e:
                 await self.send_log(f"Erro ao cancelar tarefa do bot: {e}", "error")
 
-        if self.ws and not self.ws.closed:
-            await self.ws.close()
+        if self.client and self.client.connected:
+            await self.client.close()
             await self.send_log("Conexão WebSocket fechada ativamente.", "info")
 
         self.run_task = None
@@ -574,7 +970,8 @@ async def read_current_user_data(current_user: User = Depends(get_current_user))
 @app.post("/api/user/settings", status_code=status.HTTP_200_OK)
 async def update_user_settings(settings_update: SettingsUpdate, current_user: User = Depends(get_current_user)):
     """Atualiza as configurações do usuário na base de dados."""
-    print(f"DEBUG: A salvar configurações para {current_user.username}: {settings_update.dict()}")
+    logger.debug("A salvar configurações para %s: %s", current_user.username, settings_update.dict(),
+                 extra={'user_id': current_user.id})
     update_data = settings_update.dict(exclude_unset=True)
     
     if "deriv_token" in update_data: 
@@ -587,7 +984,7 @@ async def update_user_settings(settings_update: SettingsUpdate, current_user: Us
         if hasattr(current_user, field):
             setattr(current_user, field, value)
         else:
-            print(f"ATENÇÃO: Campo '{field}' não encontrado no modelo User. Não foi salvo.")
+            logger.warning("Campo '%s' não encontrado no modelo User. Não foi salvo.", field, extra={'user_id': current_user.id})
             
     await current_user.save()
     return {"message": "Configurações salvas com sucesso!"}
@@ -657,8 +1054,8 @@ async def stop_bot(user: User = Depends(get_current_user)):
             session.run_task = None # Limpa a referência da tarefa após o término
 
     # Adição crucial: Fecha explicitamente a conexão WebSocket para interromper imediatamente o recv()
-    if session.ws and not session.ws.closed:
-        await session.ws.close()
+    if session.client and session.client.connected:
+        await session.client.close()
         await session.send_log("Conexão WebSocket fechada ativamente.", "info")
 
     # Garante que o status final é 'parado' na UI
@@ -671,6 +1068,101 @@ async def get_bot_status(user: User = Depends(get_current_user)):
     session = user_bot_sessions.get(user.id)
     return {"running": session.running if session else False}
 
+@app.get("/api/bot/scheduler", status_code=status.HTTP_200_OK)
+async def get_scheduler_stats(user: User = Depends(get_current_user)):
+    """Atraso na fila e ocupação do agendador de decisões (partilhado por todas as sessões)."""
+    return decision_scheduler.delay_stats()
+
+@app.get("/api/bot/strategy_stats", status_code=status.HTTP_200_OK)
+async def get_strategy_stats(user: User = Depends(get_current_user)):
+    """Custo medido, taxa de sinal e avaliações poupadas de cada estratégia (usados para ordenar a avaliação)."""
+    return step_stats.snapshot()
+
+@app.get("/api/stats", status_code=status.HTTP_200_OK)
+async def get_performance_stats(days: int = 30, hours: int = 48, user: User = Depends(get_current_user)):
+    """
+    Desempenho do utilizador: totais, por estratégia e por dia/hora (últimos `days` dias e `hours` horas).
+    Lido dos agregados mantidos a cada contrato fechado, sem percorrer a tabela de trades.
+    """
+    await performance.load(user.id)
+    return performance.summary(user.id, days=days, hours=hours)
+
+@app.get("/api/strategies", status_code=status.HTTP_200_OK)
+async def list_strategies(user: User = Depends(get_current_user)):
+    """Estratégias disponíveis (do pacote e de plugins), com parâmetros e valores padrão; não importa nenhuma."""
+    loaded = set(loaded_strategies())
+    return [{**info.as_dict(), 'loaded': name in loaded} for name, info in available_strategies().items()]
+
+# ==================== OTIMIZAÇÃO DE PARÂMETROS ====================
+async def fetch_candle_history(symbol: str, granularity: int, count: int) -> list[dict]:
+    """Descarrega o histórico de velas (dados públicos, sem autenticação)."""
+    async with DerivClient(DERIV_WS_URL) as client:
+        response = await client.send({
+            "ticks_history": symbol,
+            "style": "candles",
+            "granularity": granularity,
+            "end": "latest",
+            "count": count
+        }, timeout=30.0)
+    return response.get('candles') or []
+
+async def run_optimization(user_id: int, request: OptimizeRequest, param_sets: list[dict]):
+    # O otimizador (backtest, pandas) só é carregado quando alguém o usa, não no arranque
+    import pandas as pd
+
+    from backtest.optimizer import optimize_async
+
+    room = str(user_id)
+    try:
+        granularity = request.settings.candle_granularity or 60
+        candles = await fetch_candle_history("R_100", granularity, request.candle_count)
+        await sio.emit('bot_log', {'message': f"Otimização: {len(param_sets)} combinações sobre {len(candles)} velas...", 'level': 'info'}, room=room)
+
+        async def progress(done: int, total: int, result: dict):
+            await sio.emit('optimizer_progress', {
+                'done': done,
+                'total': total,
+                'params': result['params'],
+                'total_profit_loss': round(result['total_profit_loss'], 2),
+                'win_rate': round(result['win_rate'], 4),
+            }, room=room)
+
+        ranked = await optimize_async(pd.DataFrame(candles), request.settings.dict(), param_sets,
+                                      top=request.top, progress=progress)
+        await sio.emit('optimizer_result', {'results': ranked}, room=room)
+    except Exception as e:
+        await sio.emit('bot_log', {'message': f"Erro na otimização: {e}", 'level': 'error'}, room=room)
+        logger.exception("Erro na otimização.", extra={'user_id': user_id})
+    finally:
+        user_optimizations.pop(user_id, None)
+
+@app.post("/api/backtest/optimize", status_code=status.HTTP_202_ACCEPTED)
+async def start_optimization(request: OptimizeRequest, user: User = Depends(get_current_user)):
+    """
+    Inicia uma otimização de parâmetros em segundo plano.
+    O progresso é enviado por Socket.IO ('optimizer_progress') e o ranking final em 'optimizer_result'.
+    """
+    from backtest.optimizer import is_range, param_grid, random_samples
+
+    if (task := user_optimizations.get(user.id)) and not task.done():
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Já existe uma otimização em curso.")
+
+    grid = {key: options.dict() if isinstance(options, OptimizerRange) else options for key, options in request.grid.items()}
+    if any(is_range(options) and options['min'] > options['max'] for options in grid.values()):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Intervalo inválido: 'min' maior do que 'max'.")
+    if not request.samples and any(is_range(options) for options in grid.values()):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Intervalos {\"min\", \"max\"} só podem ser usados com 'samples'.")
+    # O tamanho é verificado antes de gerar as combinações: uma grelha grande não chega a ser construída
+    combinations = math.prod(1 if is_range(options) else len(options) for options in grid.values())
+    if not request.grid or not combinations:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "A grelha de parâmetros está vazia.")
+    if not request.samples and combinations > MAX_OPTIMIZER_CANDIDATES:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Demasiadas combinações ({combinations}). Máximo: {MAX_OPTIMIZER_CANDIDATES}.")
+    param_sets = random_samples(grid, request.samples) if request.samples else param_grid(grid)
+
+    user_optimizations[user.id] = asyncio.create_task(run_optimization(user.id, request, param_sets))
+    return {"message": f"Otimização iniciada com {len(param_sets)} combinações."}
+
 # ==================== ROTAS PÚBLICAS E ARQUIVOS ESTÁTICOS ====================
 app.mount("/static", StaticFiles(directory="static"), name="static")
 @app.get("/", include_in_schema=False)
@@ -679,12 +1171,21 @@ async def read_lading_page(): return FileResponse('static/lading.html')
 # ==================== EVENTOS SOCKET.IO ====================
 @sio.on('connect')
 async def handle_connect(sid, environ):
-    print(f"Cliente conectado: {sid}")
+    logger.info("Cliente conectado.", extra={'sid': sid})
     # A autenticação será tratada pelo evento 'join_user_room' enviado pelo cliente
     pass
 
 @sio.on('disconnect')
-def handle_disconnect(sid): print(f"Cliente desconectado: {sid}")
+def handle_disconnect(sid):
+    log_clients.leave(sid)
+    logger.info("Cliente desconectado.", extra={'sid': sid})
+
+@sio.on('set_log_level')
+async def handle_set_log_level(sid, data):
+    """Nível mínimo das mensagens que este cliente quer receber ('debug', 'info', 'warning', 'error')."""
+    level = (data or {}).get('level')
+    if level in LOG_LEVELS and log_clients.set_level(sid, level):
+        logger.info("Cliente passou a receber logs a partir de '%s'.", level, extra={'sid': sid})
 
 @sio.on('join_user_room')
 async def handle_join_user_room(sid, data):
@@ -694,20 +1195,22 @@ async def handle_join_user_room(sid, data):
             user = await get_current_user(token)
             user_id = user.id
             sio.enter_room(sid, str(user_id))
-            print(f"Cliente {sid} autenticado e entrou na sala {user_id}")
+            level = data.get('log_level')
+            log_clients.join(sid, str(user_id), level if level in LOG_LEVELS else None)
+            logger.info("Cliente autenticado e entrou na sala do utilizador.", extra={'sid': sid, 'user_id': user_id})
             await sio.emit('bot_log', {'message': f"Conectado à sua sessão: {user.id}", 'level': 'info'}, room=str(user_id))
             if user_id in user_bot_sessions and user_bot_sessions[user_id].running:
                 await sio.emit('bot_log', {'message': 'Seu bot já está ativo. Sincronizando estado.', 'level': 'info'}, room=str(user_id))
                 await user_bot_sessions[user_id].update_status_to_client()
         except HTTPException:
              await sio.emit('auth_error', {'message': 'Token inválido.'}, room=sid)
-             print(f"Falha na autenticação do Socket.IO para o cliente {sid}")
+             logger.warning("Falha na autenticação do Socket.IO.", extra={'sid': sid})
 
 
 # ==================== INICIALIZAÇÃO DA BASE DE DADOS ====================
 register_tortoise(
     app, db_url=settings.DATABASE_URL,
-    modules={"models": ["models.user", "aerich.models"]},
+    modules={"models": ["models.user", "models.trade", "models.performance", "aerich.models"]},
     generate_schemas=True,
     add_exception_handlers=True,
 )
@@ -0,0 +1,32 @@
+# models/performance.py
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class PerformanceStats(Model):
+    """
+    Agregado de desempenho materializado: uma linha por (utilizador, estratégia, período, balde).
+    Atualizado incrementalmente a cada contrato fechado (utils/performance.py), nunca recalculado
+    a partir da tabela de trades.
+    """
+    id = fields.BigIntField(pk=True)
+    user = fields.ForeignKeyField("models.User", related_name="performance_stats", on_delete=fields.CASCADE)
+    strategy = fields.CharField(max_length=50) # Nome da estratégia, ou "*" para todos os trades do utilizador
+    period = fields.CharField(max_length=4)    # "all", "day" ou "hour"
+    bucket = fields.BigIntField()              # Início do balde (epoch UTC); 0 para "all"
+
+    trades = fields.IntField(default=0)
+    wins = fields.IntField(default=0)
+    losses = fields.IntField(default=0)
+    profit = fields.FloatField(default=0.0)
+    peak = fields.FloatField(default=0.0)          # Máximo do P/L acumulado no balde
+    max_drawdown = fields.FloatField(default=0.0)  # Maior queda do P/L acumulado desde o seu máximo
+    streak = fields.IntField(default=0)            # Sequência atual: +N vitórias ou -N derrotas
+    max_win_streak = fields.IntField(default=0)
+    max_loss_streak = fields.IntField(default=0)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "performance_stats"
+        unique_together = (("user", "strategy", "period", "bucket"),)
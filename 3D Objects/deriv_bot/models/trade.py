@@ -0,0 +1,40 @@
+# models/trade.py
+
+from tortoise import fields
+from tortoise.models import Model
+
+
+class Trade(Model):
+    """
+    Um contrato comprado pelo bot, registado quando fecha (ou quando a sessão para com ele aberto).
+    Escrito em lote pelo TradeJournal (utils/trade_journal.py), nunca no caminho do trading.
+    """
+    id = fields.BigIntField(pk=True)
+    contract_id = fields.BigIntField(index=True) # ID do contrato na Deriv
+    user = fields.ForeignKeyField("models.User", related_name="trades", on_delete=fields.CASCADE)
+    session_id = fields.CharField(max_length=16, null=True) # BotSession que abriu o contrato
+
+    symbol = fields.CharField(max_length=20)
+    contract_type = fields.CharField(max_length=20) # CALLPUT, ACCUMULATOR, MULTIPLIER
+    action = fields.CharField(max_length=4)         # "buy" ou "sell" (a decisão das estratégias)
+    strategies = fields.JSONField(default=dict)     # Estratégias que deram sinal: nome -> pontuação
+
+    stake = fields.FloatField()
+    buy_price = fields.FloatField()
+    sell_price = fields.FloatField(null=True)
+    profit = fields.FloatField(null=True)           # None se a sessão parou com o contrato aberto
+    entry_spot = fields.FloatField(null=True)
+    exit_spot = fields.FloatField(null=True)
+
+    signal_at = fields.DatetimeField(null=True)     # Decisão das estratégias
+    bought_at = fields.DatetimeField()              # Confirmação do 'buy'
+    closed_at = fields.DatetimeField(null=True)
+    signal_to_buy_ms = fields.FloatField(null=True) # Latência entre o sinal e a confirmação da compra
+
+    class Meta:
+        table = "trades"
+        # Consultas por utilizador e intervalo de tempo (histórico, estatísticas)
+        indexes = (("user_id", "bought_at"), ("bought_at",))
+
+    def __str__(self):
+        return f"Trade {self.contract_id} ({self.action}, {self.profit})"
@@ -1,5 +1,7 @@
 # models/user.py
 
+import logging
+
 from tortoise.models import Model
 from tortoise import fields
 from passlib.context import CryptContext
@@ -7,6 +9,8 @@ from cryptography.fernet import Fernet
 from core.config import settings # Garante que settings.ENCRYPTION_KEY é acessível
 from datetime import datetime, timezone, timedelta
 
+logger = logging.getLogger(__name__)
+
 # Contexto para hashing de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -17,8 +21,8 @@ try:
     # Garante que a chave Fernet é um bytes-like object
     cipher_suite = Fernet(settings.ENCRYPTION_KEY.encode('utf-8'))
 except Exception as e:
-    print(f"Erro ao inicializar Fernet no models/user.py: {e}")
-    print("Certifique-se de que ENCRYPTION_KEY é uma chave Fernet válida e codificada em UTF-8.")
+    logger.error("Erro ao inicializar Fernet no models/user.py: %s. "
+                 "Certifique-se de que ENCRYPTION_KEY é uma chave Fernet válida e codificada em UTF-8.", e)
     cipher_suite = Fernet(Fernet.generate_key()) # fallback inseguro para dev
 
 class User(Model):
@@ -72,7 +76,7 @@ class User(Model):
             try:
                 self.deriv_token_encrypted = cipher_suite.encrypt(token.encode()).decode()
             except Exception as e:
-                print(f"Erro ao encriptar token: {e}")
+                logger.error("Erro ao encriptar token: %s", e)
                 self.deriv_token_encrypted = None 
         else:
             self.deriv_token_encrypted = None 
@@ -84,7 +88,7 @@ class User(Model):
         try:
             return cipher_suite.decrypt(self.deriv_token_encrypted.encode()).decode()
         except Exception as e:
-            print(f"Erro ao desencriptar token: {e}")
+            logger.error("Erro ao desencriptar token: %s", e)
             return None 
 
     # Métodos de autenticação e plano
@@ -0,0 +1,101 @@
+# tests/test_indicators.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils import kernels
+from utils.indicator_cache import CandleSnapshot
+from utils.indicators import NUMPY_INDICATORS, check_against_ta
+
+
+def random_walk(n: int, seed: int) -> CandleSnapshot:
+    """Velas de um passeio aleatório (as mesmas que o benchmark de utils/indicators.py)."""
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 1, n))
+    spread = np.abs(rng.normal(0, 0.5, (2, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    return CandleSnapshot.from_dataframe(pd.DataFrame({
+        'epoch': np.arange(n) * 60,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread[0],
+        'low': np.minimum(open_, close) - spread[1],
+        'close': close,
+        'volume': rng.integers(1, 100, n).astype(np.float64),
+    }))
+
+
+@pytest.mark.parametrize("n, seed", [(60, 1), (750, 7), (5000, 11)])
+def test_kernels_match_ta(n, seed):
+    report = check_against_ta(random_walk(n, seed))
+    assert set(report) == set(NUMPY_INDICATORS)
+
+
+def test_kernels_match_ta_with_params():
+    params = {
+        "rsi": {"window": 7},
+        "sma": {"window": 5, "min_periods": 1},
+        "bollinger": {"window": 10, "window_dev": 1.5},
+        "macd_diff": {"window_fast": 5, "window_slow": 35, "window_sign": 5},
+        "adx": {"window": 10},
+        "atr": {"window": 21},
+        "williams_r": {"lbp": 30},
+        "vwap": {"window": 3},
+    }
+    check_against_ta(random_walk(750, 3), params)
+
+
+def exact_windows(x: np.ndarray, window: int, reduce) -> np.ndarray:
+    """Referência direta: reduz cada janela completa (NaN nas primeiras e nas janelas com NaN)."""
+    out = np.full(len(x), np.nan)
+    out[window - 1:] = reduce(sliding_window_view(x, window), axis=1)
+    return out
+
+
+@pytest.mark.parametrize("window", [1, 2, 20, 200])
+def test_rolling_kernels_are_exact(window):
+    rng = np.random.default_rng(5)
+    walk = 1000 + np.cumsum(rng.normal(0, 1, 3000))
+    # Preços quantizados (com janelas constantes), NaN no início e NaN no meio
+    ticks = np.round(1000 + np.cumsum(rng.normal(0, 0.02, 3000)), 1)
+    gaps = walk.copy()
+    gaps[:37] = np.nan
+    gaps[500:520] = np.nan
+    for x in (walk, ticks, gaps):
+        for kernel, reduce in ((kernels.rolling_sum, np.sum), (kernels.sma, np.mean), (kernels.rolling_std, np.std),
+                               (kernels.rolling_max, np.max), (kernels.rolling_min, np.min)):
+            np.testing.assert_allclose(kernel(x, window), exact_windows(x, window, reduce), rtol=1e-9, atol=1e-9)
+    # Janelas constantes têm desvio 0 exato
+    assert (kernels.rolling_std(np.full(100, 996.0), window)[window - 1:] == 0).all()
+
+
+def test_rolling_kernels_with_several_windows():
+    x = 1000 + np.cumsum(np.random.default_rng(2).normal(0, 1, 500))
+    batch = kernels.sma(np.vstack([x, x, x]), [5, 20, 5])
+    np.testing.assert_array_equal(batch[0], kernels.sma(x, 5))
+    np.testing.assert_array_equal(batch[1], kernels.sma(x, 20))
+    np.testing.assert_array_equal(batch[2], batch[0])
+
+
+def test_linear_scan_matches_recurrence():
+    rng = np.random.default_rng(4)
+    b = rng.normal(size=(2, 1001))
+    decay, initial, scale = np.array([0.9, 0.5]), np.array([1.0, -2.0]), 0.5
+    expected = np.empty_like(b)
+    y = initial
+    for t in range(b.shape[1]):
+        y = decay * y + scale * b[:, t]
+        expected[:, t] = y
+    out = np.zeros((2, 1500))
+    kernels.linear_scan(b, decay, initial, scale, out=out[:, 10:1011])
+    np.testing.assert_allclose(out[:, 10:1011], expected, rtol=1e-12, atol=1e-12)
+    assert not out[:, :10].any() and not out[:, 1011:].any()
+
+
+def test_ewm_matches_pandas_with_leading_nan():
+    x = 1000 + np.cumsum(np.random.default_rng(6).normal(0, 1, 800))
+    x[:30] = np.nan
+    for alpha, min_periods in ((0.1, 1), (0.3, 0), (1 / 14, 14)):
+        expected = pd.Series(x).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+        np.testing.assert_allclose(kernels.ewm(x, alpha, min_periods), expected, rtol=1e-9)
@@ -1,78 +1,492 @@
 # utils/candle_builder.py
 
-import pandas as pd
-from datetime import datetime
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd  # Só importado por get_dataframe(): o buffer em si não precisa de pandas
+
+logger = logging.getLogger(__name__)
+
+# Número máximo de velas mantidas em memória por sessão (igual ao 'count' do ticks_history)
+MAX_CANDLES = 750
+
+# Ordem das linhas na matriz de valores (epoch é guardado à parte como int64)
+VALUE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Eventos emitidos por add_candle/add_candles
+BAR_UPDATED = 'bar_updated'  # A vela ainda aberta mudou (atualização intra-vela)
+BAR_CLOSED = 'bar_closed'    # Uma vela fechou (abriu uma nova) ou o histórico fechado mudou
+
+# Cabeçalho do segmento partilhado (int64): sequência do seqlock, início da janela, número de velas
+# e history_version
+HEADER_FIELDS = ('seq', 'start', 'size', 'history')
+
+# Fonte de history_version: único entre todos os builders do processo, para poder entrar em chaves
+# de cache partilhadas (duas versões iguais são sempre o mesmo histórico do mesmo builder)
+_history_versions = itertools.count(1)
+
+
+def aggregate_ticks(epochs: np.ndarray, quotes: np.ndarray, granularity: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Agrega ticks (ordenados por epoch) em velas de `granularity` segundos, de forma vetorizada.
+    O volume de cada vela é o número de ticks.
+
+    :return: (epochs de abertura int64, valores float64 com uma linha por VALUE_COLUMNS).
+    """
+    epochs = np.asarray(epochs, dtype=np.int64)
+    quotes = np.asarray(quotes, dtype=np.float64)
+    if len(epochs) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((len(VALUE_COLUMNS), 0))
+    buckets = epochs - epochs % granularity
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(quotes)]
+    values = np.vstack([
+        quotes[starts],
+        np.maximum.reduceat(quotes, starts),
+        np.minimum.reduceat(quotes, starts),
+        quotes[ends - 1],
+        (ends - starts).astype(np.float64),
+    ])
+    return buckets[starts], values
+
+
+@dataclass(frozen=True)
+class SharedCandleBuffer:
+    """
+    Descrição (serializável) do segmento de memória partilhada de um CandleBuilder:
+    cabeçalho int64, epochs int64 (2 * capacity) e valores float64 (VALUE_COLUMNS x 2 * capacity).
+    É o que se envia aos processos de estratégias em vez das velas.
+    """
+    name: str
+    capacity: int
+    granularity: int
+
+    @property
+    def nbytes(self) -> int:
+        return 8 * (len(HEADER_FIELDS) + 2 * self.capacity * (1 + len(VALUE_COLUMNS)))
+
+    def views(self, shm: shared_memory.SharedMemory) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        offset = 8 * len(HEADER_FIELDS)
+        header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=shm.buf)
+        epochs = np.ndarray((2 * self.capacity,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        values = np.ndarray((len(VALUE_COLUMNS), 2 * self.capacity), dtype=np.float64, buffer=shm.buf,
+                            offset=offset + 16 * self.capacity)
+        return header, epochs, values
+
+
+class SharedCandleReader:
+    """
+    Leitura, noutro processo, das velas de um CandleBuilder partilhado.
+    O escritor torna a sequência ímpar durante cada alteração e par no fim (seqlock); o leitor
+    copia a janela e repete se a sequência mudou entretanto, sem locks nem serialização.
+    """
+    def __init__(self, buffer: SharedCandleBuffer):
+        self.buffer = buffer
+        # O resource_tracker é partilhado com o processo principal, que é quem faz o unlink()
+        self._shm = shared_memory.SharedMemory(name=buffer.name)
+        self._header, self._epochs, self._values = buffer.views(self._shm)
+        self.history_version: int | None = None  # history_version do builder na última leitura
+
+    def read(self, max_attempts: int = 10000) -> dict[str, np.ndarray]:
+        """Cópia consistente de todas as velas (a última é a vela aberta), como get_arrays()."""
+        for _ in range(max_attempts):
+            seq = int(self._header[0])
+            if seq % 2 == 0:
+                start, size, version = int(self._header[1]), int(self._header[2]), int(self._header[3])
+                arrays = {'epoch': self._epochs[start:start + size].copy()}
+                for i, col in enumerate(VALUE_COLUMNS):
+                    arrays[col] = self._values[i, start:start + size].copy()
+                if int(self._header[0]) == seq:
+                    self.history_version = version
+                    return arrays
+            time.sleep(0)  # Escrita em curso: cede o CPU e tenta de novo
+        raise RuntimeError(f"Não foi possível ler as velas de {self.buffer.name}: escrita contínua")
+
+    def close(self):
+        self._header = self._epochs = self._values = None
+        self._shm.close()
+
 
 class CandleBuilder:
     """
-    Constrói e gerencia um DataFrame de velas (candles) a partir de dados da API.
+    Constrói e gerencia um buffer circular de velas (candles) a partir de dados da API.
     Pode ser alimentado tanto por ticks individuais quanto por velas completas (OHLC).
+
+    As velas são guardadas em arrays NumPy pré-alocados (um por coluna). Cada valor é
+    escrito duas vezes (posição p e p + capacity), o que permite expor a janela atual
+    como uma fatia contígua — ou seja, como views NumPy sem cópia — e atualizar ou
+    acrescentar uma vela em O(1), sem reconstruir DataFrames a cada mensagem 'ohlc'.
+
+    Em modo ticks (ver TickFeed), add_tick() agrega cada tick na vela aberta (volume = número
+    de ticks) e load_history() reconstrói o buffer a partir das velas da Deriv e dos ticks recentes.
+
+    A última vela do buffer é sempre a vela aberta; todas as anteriores estão fechadas.
+    Cada alteração incrementa `revision` e cada fecho incrementa `closed_count`, que
+    servem de marca d'água para saber se algo mudou desde a última decisão.
+    `history_version` muda quando velas já fechadas são reescritas (histórico recarregado
+    ou vela fora de ordem), o que obriga os consumidores incrementais a recomeçar; entra
+    também na chave da cache de indicadores (CandleSnapshot.key).
+
+    Com shared=True os arrays vivem num segmento multiprocessing.shared_memory (ver
+    SharedCandleBuffer), que os processos de estratégias leem com SharedCandleReader.
+    O segmento é libertado por close().
     """
-    def __init__(self, granularity: int):
+    def __init__(self, granularity: int, capacity: int = MAX_CANDLES, shared: bool = False):
         """
         Inicializa o construtor de velas.
         :param granularity: A granularidade da vela em segundos (ex: 60 para 1 minuto).
+        :param capacity: Número máximo de velas mantidas no buffer.
+        :param shared: Se True, guarda as velas em memória partilhada entre processos.
         """
         self.granularity = granularity
+        self.capacity = capacity
         self.columns = ['epoch', 'open', 'high', 'low', 'close', 'volume']
-        self.candles_df = pd.DataFrame(columns=self.columns)
-        self.current_tick_candle = {} # Dicionário para construir uma vela a partir de ticks
-        print(f"CandleBuilder inicializado com granularidade de {self.granularity}s.")
+        self.shared: SharedCandleBuffer | None = None
+        self._shm: shared_memory.SharedMemory | None = None
+        self._header: np.ndarray | None = None
+        if shared:
+            probe = SharedCandleBuffer("", capacity, granularity)
+            self._shm = shared_memory.SharedMemory(create=True, size=probe.nbytes)
+            self.shared = SharedCandleBuffer(self._shm.name, capacity, granularity)
+            self._header, self._epochs, self._values = self.shared.views(self._shm)
+            self._header[:] = 0
+        else:
+            self._epochs = np.zeros(2 * capacity, dtype=np.int64)
+            self._values = np.zeros((len(VALUE_COLUMNS), 2 * capacity), dtype=np.float64)
+        self._start = 0  # Posição física da vela mais antiga, em [0, capacity)
+        self._size = 0
+        self.revision = 0      # Incrementado a cada alteração do buffer
+        self.closed_count = 0  # Incrementado a cada vela fechada
+        self.history_version = next(_history_versions)  # Muda quando velas fechadas são reescritas
+        self._listeners = []
+        logger.debug("CandleBuilder inicializado com granularidade de %ss.", self.granularity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def closed_size(self) -> int:
+        """Número de velas fechadas no buffer (todas menos a vela aberta)."""
+        return max(self._size - 1, 0)
+
+    def add_listener(self, callback):
+        """Regista `callback(event, builder)`, chamado a cada BAR_UPDATED/BAR_CLOSED."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event: str) -> str:
+        self.revision += 1
+        if event == BAR_CLOSED:
+            self.closed_count += 1
+        for callback in list(self._listeners):
+            callback(event, self)
+        return event
+
+    def _begin_write(self):
+        if self._header is not None:
+            self._header[0] += 1  # Sequência ímpar: os leitores esperam
+
+    def _end_write(self):
+        if self._header is not None:
+            self._header[1] = self._start
+            self._header[2] = self._size
+            self._header[3] = self.history_version
+            self._header[0] += 1
+
+    def close(self):
+        """
+        Liberta o segmento de memória partilhada (unlink). As velas passam para arrays
+        privados, por isso o builder continua utilizável por quem ainda o tenha.
+        """
+        if self._shm is None:
+            return
+        self._epochs, self._values = self._epochs.copy(), self._values.copy()
+        self._header, self.shared = None, None
+        shm, self._shm = self._shm, None
+        try:
+            shm.close()
+        except BufferError:
+            pass  # Ainda há views exportadas (ex: get_arrays); o mapeamento sai com elas
+        shm.unlink()
+
+    @property
+    def last_epoch(self) -> int | None:
+        """Epoch de abertura da vela mais recente, ou None se o buffer estiver vazio."""
+        if self._size == 0:
+            return None
+        return int(self._epochs[self._start + self._size - 1])
+
+    def _write(self, pos: int, epoch: int, values: tuple):
+        """Escreve uma vela na posição física `pos` e no seu espelho `pos + capacity`."""
+        mirror = pos + self.capacity
+        self._epochs[pos] = self._epochs[mirror] = epoch
+        self._values[:, pos] = values
+        self._values[:, mirror] = values
+
+    def _append(self, epoch: int, values: tuple):
+        """Acrescenta uma vela no fim do buffer, descartando a mais antiga se estiver cheio."""
+        if self._size < self.capacity:
+            self._write((self._start + self._size) % self.capacity, epoch, values)
+            self._size += 1
+        else:
+            self._write(self._start, epoch, values)
+            self._start = (self._start + 1) % self.capacity
+
+    def _insert_out_of_order(self, epoch: int, values: tuple):
+        """
+        Caminho lento (raro): vela mais antiga que a última recebida.
+        Substitui a vela se o epoch já existir; caso contrário insere-a na ordem correta.
+        """
+        epochs = self._epochs[self._start:self._start + self._size]
+        idx = int(np.searchsorted(epochs, epoch))
+        if idx < self._size and epochs[idx] == epoch:
+            self._write((self._start + idx) % self.capacity, epoch, values)
+            self.history_version = next(_history_versions)
+            return
+        if idx == 0 and self._size == self.capacity:
+            return  # Mais antiga do que toda a janela mantida
+
+        new_epochs = np.insert(epochs, idx, epoch)
+        new_values = np.insert(self._values[:, self._start:self._start + self._size], idx, values, axis=1)
+        self._reload(new_epochs, new_values)
 
-    # utils/candle_builder.py
+    def _reload(self, epochs: np.ndarray, values: np.ndarray):
+        """Recarrega o buffer a partir de arrays já ordenados, mantendo apenas as últimas `capacity` velas."""
+        epochs, values = epochs[-self.capacity:], values[:, -self.capacity:]
+        n = len(epochs)
+        self.history_version = next(_history_versions)
+        self._start, self._size = 0, n
+        self._epochs[:n] = self._epochs[self.capacity:self.capacity + n] = epochs
+        self._values[:, :n] = values
+        self._values[:, self.capacity:self.capacity + n] = values
+
+    @staticmethod
+    def _parse(ohlc_data: dict) -> tuple[int, tuple] | None:
+        """
+        Converte uma vela da API em (epoch, (open, high, low, close, volume)).
+        As mensagens 'ohlc' trazem 'open_time' (início da vela) e 'epoch' (hora do tick);
+        o histórico ('candles') traz apenas 'epoch', que já é o início da vela.
+        """
+        epoch = int(ohlc_data.get('open_time', ohlc_data['epoch']))
+        values = (
+            float(ohlc_data['open']),
+            float(ohlc_data['high']),
+            float(ohlc_data['low']),
+            float(ohlc_data['close']),
+            float(ohlc_data.get('volume', 0)),
+        )
+        if not all(math.isfinite(v) for v in values[:4]):
+            return None
+        return epoch, values
 
-    def add_candle(self, ohlc_data: dict):
+    def add_candle(self, ohlc_data: dict) -> str | None:
         """
         Adiciona uma vela completa (OHLC) recebida da API.
+        Atualiza a última vela se tiver o mesmo epoch, ou acrescenta uma nova — ambos em O(1).
+
+        :return: BAR_CLOSED se a vela anterior fechou (ou o histórico fechado mudou),
+                 BAR_UPDATED se apenas a vela aberta mudou, ou None se os dados forem inválidos.
+        """
+        try:
+            parsed = self._parse(ohlc_data)
+            if parsed is None:
+                return None
+            epoch, values = parsed
+
+            last_epoch = self.last_epoch
+            self._begin_write()
+            try:
+                if last_epoch is None or epoch > last_epoch:
+                    event = BAR_CLOSED if self._size else BAR_UPDATED
+                    self._append(epoch, values)
+                elif epoch == last_epoch:
+                    event = BAR_UPDATED
+                    self._write((self._start + self._size - 1) % self.capacity, epoch, values)
+                else:
+                    event = BAR_CLOSED
+                    self._insert_out_of_order(epoch, values)
+            finally:
+                self._end_write()
+            return self._emit(event)
+
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Erro ao processar a vela: %s. Dados recebidos: %s", e, ohlc_data)
+            return None
+
+    def add_candles(self, candles: list[dict]) -> str | None:
+        """
+        Adiciona um lote de velas (ex: a resposta 'candles' do ticks_history) de uma só vez.
+        Emite um único BAR_CLOSED para o lote.
+        """
+        parsed = []
+        for candle in candles:
+            try:
+                if (item := self._parse(candle)) is not None:
+                    parsed.append(item)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Erro ao processar a vela: %s. Dados recebidos: %s", e, candle)
+        if not parsed:
+            return None
+
+        epochs = np.fromiter((p[0] for p in parsed), dtype=np.int64, count=len(parsed))
+        values = np.array([p[1] for p in parsed], dtype=np.float64).T
+        if self._size:
+            epochs = np.concatenate([self._epochs[self._start:self._start + self._size], epochs])
+            values = np.concatenate([self._values[:, self._start:self._start + self._size], values], axis=1)
+
+        # Ordena e remove epochs duplicados mantendo a última ocorrência
+        order = np.argsort(epochs, kind='stable')
+        epochs, values = epochs[order], values[:, order]
+        keep = np.append(epochs[1:] != epochs[:-1], True)
+        self._begin_write()
+        try:
+            self._reload(epochs[keep], values[:, keep])
+        finally:
+            self._end_write()
+        return self._emit(BAR_CLOSED)
+
+    def add_tick(self, epoch: int, quote: float) -> str | None:
+        """
+        Agrega um tick na vela do seu intervalo, em O(1): atualiza a vela aberta ou abre uma nova.
+        Ticks anteriores à vela aberta (atrasados) são ignorados.
+
+        :return: BAR_CLOSED se o tick abriu uma nova vela, BAR_UPDATED se atualizou a vela aberta,
+                 ou None se foi ignorado.
         """
         try:
-            candle = {
-                'epoch': int(ohlc_data['epoch']),
-                'open': float(ohlc_data['open']),
-                'high': float(ohlc_data['high']),
-                'low': float(ohlc_data['low']),
-                'close': float(ohlc_data['close']),
-                'volume': float(ohlc_data.get('volume', 0))
-            }
-            
-            new_candle_df = pd.DataFrame([candle])
-
-            # =================== CORREÇÃO DO FUTUREWARNING ===================
-            # Se o DataFrame principal estiver vazio, apenas o substitua
-            if self.candles_df.empty:
-                self.candles_df = new_candle_df
+            epoch, quote = int(epoch), float(quote)
+        except (ValueError, TypeError) as e:
+            logger.warning("Erro ao processar o tick: %s. Dados recebidos: %s, %s", e, epoch, quote)
+            return None
+        if not math.isfinite(quote):
+            return None
+        bucket = epoch - epoch % self.granularity
+        last_epoch = self.last_epoch
+        if last_epoch is not None and bucket < last_epoch:
+            return None
+
+        self._begin_write()
+        try:
+            if last_epoch is None or bucket > last_epoch:
+                event = BAR_CLOSED if self._size else BAR_UPDATED
+                self._append(bucket, (quote, quote, quote, quote, 1.0))
             else:
-                # Caso contrário, execute a lógica de concatenação
-                self.candles_df = self.candles_df[self.candles_df['epoch'] != candle['epoch']]
-                self.candles_df = pd.concat([self.candles_df, new_candle_df], ignore_index=True)
-            # ================================================================
-            
-            self.candles_df.drop_duplicates(subset=['epoch'], keep='last', inplace=True)
-            self.candles_df.sort_values(by='epoch', inplace=True)
-            
-            if len(self.candles_df) > 750:
-                self.candles_df = self.candles_df.iloc[-750:]
+                event = BAR_UPDATED
+                pos = (self._start + self._size - 1) % self.capacity
+                o, h, l, _, volume = self._values[:, pos]
+                self._write(pos, bucket, (o, max(h, quote), min(l, quote), quote, volume + 1))
+        finally:
+            self._end_write()
+        return self._emit(event)
+
+    def load_history(self, candles: list[dict] | None, tick_epochs: np.ndarray, tick_quotes: np.ndarray) -> str | None:
+        """
+        Reconstrói o buffer a partir das velas da Deriv (opcional) e dos ticks recentes, de uma só vez.
+
+        As velas da Deriv dão o histórico longo (sem volume, exceto nas que os ticks cobrem); os ticks
+        a partir da última dessas velas completam-na (máxima/mínima/fecho e número de ticks) e formam as seguintes.
+        Sem velas da Deriv (ex: granularidades que a Deriv não serve, como 15s), o histórico vem
+        só dos ticks; a primeira vela, provavelmente incompleta, não substitui uma que já exista.
+        As velas mais antigas que já estejam no buffer são mantidas. Emite um único BAR_CLOSED.
+        """
+        parsed = []
+        for candle in candles or ():
+            try:
+                if (item := self._parse(candle)) is not None:
+                    parsed.append(item)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Erro ao processar a vela: %s. Dados recebidos: %s", e, candle)
+        epochs = np.fromiter((p[0] for p in parsed), dtype=np.int64, count=len(parsed))
+        values = np.array([p[1] for p in parsed], dtype=np.float64).T.reshape(len(VALUE_COLUMNS), -1)
+        order = np.argsort(epochs, kind='stable')
+        epochs, values = epochs[order], values[:, order]
+
+        tick_epochs = np.asarray(tick_epochs, dtype=np.int64)
+        tick_quotes = np.asarray(tick_quotes, dtype=np.float64)
+        if len(epochs) and len(tick_epochs):
+            # Volume (número de ticks) das velas da Deriv inteiramente cobertas pelos ticks
+            all_epochs, all_values = aggregate_ticks(tick_epochs, tick_quotes, self.granularity)
+            covered = all_epochs >= tick_epochs[0]
+            idx = np.searchsorted(epochs, all_epochs[covered])
+            found = idx < len(epochs)
+            found[found] = epochs[idx[found]] == all_epochs[covered][found]
+            values[4, idx[found]] = all_values[4, covered][found]
+            keep = tick_epochs >= epochs[-1]
+            tick_epochs, tick_quotes = tick_epochs[keep], tick_quotes[keep]
+        bar_epochs, bar_values = aggregate_ticks(tick_epochs, tick_quotes, self.granularity)
+
+        if len(bar_epochs) and len(epochs) and bar_epochs[0] == epochs[-1]:
+            # A última vela da Deriv (a aberta no pedido) continua com os ticks seguintes
+            last = values[:, -1].copy()
+            values[:, -1] = (last[0], max(last[1], bar_values[1, 0]), min(last[2], bar_values[2, 0]),
+                             bar_values[3, 0], bar_values[4, 0])
+            bar_epochs, bar_values = bar_epochs[1:], bar_values[:, 1:]
+        elif len(bar_epochs) and not len(epochs) and tick_epochs[0] > bar_epochs[0] and self._size:
+            current = self._epochs[self._start:self._start + self._size]
+            if bar_epochs[0] in current:
+                bar_epochs, bar_values = bar_epochs[1:], bar_values[:, 1:]
+
+        epochs = np.concatenate([epochs, bar_epochs])
+        values = np.concatenate([values, bar_values], axis=1)
+        if not len(epochs):
+            return None
+        if self._size:
+            epochs = np.concatenate([self._epochs[self._start:self._start + self._size], epochs])
+            values = np.concatenate([self._values[:, self._start:self._start + self._size], values], axis=1)
+
+        # Ordena e remove epochs duplicados mantendo a última ocorrência (os dados novos)
+        order = np.argsort(epochs, kind='stable')
+        epochs, values = epochs[order], values[:, order]
+        keep = np.append(epochs[1:] != epochs[:-1], True)
+        self._begin_write()
+        try:
+            self._reload(epochs[keep], values[:, keep])
+        finally:
+            self._end_write()
+        return self._emit(BAR_CLOSED)
 
-        except (ValueError, KeyError) as e:
-            print(f"Erro ao processar a vela: {e}. Dados recebidos: {ohlc_data}")
+    def get_arrays(self, closed_only: bool = False) -> dict[str, np.ndarray]:
+        """
+        Retorna views NumPy (sem cópia, apenas leitura) das colunas, em ordem cronológica.
+        As views refletem o estado atual do buffer e podem mudar na próxima vela recebida;
+        use `.copy()` se precisar de guardar os valores.
 
-    def get_dataframe(self) -> pd.DataFrame:
+        :param closed_only: Se True, exclui a vela ainda aberta (a última).
         """
-        Retorna o DataFrame de velas atual, garantindo que os tipos de dados estejam corretos.
+        start = self._start
+        end = start + (self.closed_size if closed_only else self._size)
+        arrays = {'epoch': self._epochs[start:end]}
+        for i, col in enumerate(VALUE_COLUMNS):
+            arrays[col] = self._values[i, start:end]
+        for view in arrays.values():
+            view.flags.writeable = False
+        return arrays
+
+    def get_dataframe(self) -> 'pd.DataFrame':
         """
-        if self.candles_df.empty:
+        Retorna um DataFrame (cópia) com as velas atuais.
+        Só deve ser usado quando o consumidor precisa mesmo de pandas; os dados já são
+        validados e tipados na entrada, por isso não há coerção nem dropna aqui.
+        """
+        import pandas as pd
+
+        if self._size == 0:
             return pd.DataFrame(columns=self.columns) # Retorna um DF vazio com colunas
 
-        df = self.candles_df.copy()
-        
-        # Garante que as colunas numéricas tenham o tipo correto
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Opcional: remover linhas com NaNs resultantes da coerção
-        df = df.dropna(subset=['open', 'high', 'low', 'close']) 
-        
-        return df
+        return pd.DataFrame({col: arr.copy() for col, arr in self.get_arrays().items()})
 
+    @property
+    def candles_df(self) -> 'pd.DataFrame':
+        """Compatibilidade com o antigo atributo DataFrame."""
+        return self.get_dataframe()
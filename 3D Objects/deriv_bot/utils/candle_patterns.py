@@ -0,0 +1,210 @@
+# utils/candle_patterns.py
+
+from dataclasses import dataclass
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from utils.signal_series import SIGNAL_BUY, SIGNAL_NONE, SIGNAL_SELL, to_signals
+
+# Padrões de velas como expressões booleanas sobre arrays OHLC.
+# Cada padrão recebe as suas velas já alinhadas (c0 = a mais antiga, ..., a última = a vela
+# onde o padrão termina) e retorna um array booleano. A mesma expressão serve:
+#   - o bot ao vivo: scan_last() avalia só as últimas velas (arrays de 1 elemento);
+#   - o backtest: scan() avalia o histórico todo de uma só vez.
+
+# Corpo máximo de um doji, em fração da amplitude (máxima - mínima) da vela
+DOJI_BODY_RATIO = 0.1
+# Sombra mínima de um martelo/estrela cadente, em múltiplos do corpo
+SHADOW_BODY_RATIO = 2.0
+
+
+class Bars(NamedTuple):
+    """Colunas OHLC de uma posição do padrão (arrays alinhados com as restantes posições)."""
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    @property
+    def body(self) -> np.ndarray:
+        return np.abs(self.close - self.open)
+
+    @property
+    def range(self) -> np.ndarray:
+        return self.high - self.low
+
+    @property
+    def upper_shadow(self) -> np.ndarray:
+        return self.high - np.maximum(self.open, self.close)
+
+    @property
+    def lower_shadow(self) -> np.ndarray:
+        return np.minimum(self.open, self.close) - self.low
+
+    @property
+    def bullish(self) -> np.ndarray:
+        return self.close > self.open
+
+    @property
+    def bearish(self) -> np.ndarray:
+        return self.close < self.open
+
+
+@dataclass(frozen=True)
+class CandlePattern:
+    """
+    :param name: Nome do padrão (chave de PATTERNS).
+    :param bars: Número de velas que o padrão ocupa.
+    :param direction: SIGNAL_BUY, SIGNAL_SELL ou SIGNAL_NONE (indecisão, ex: doji).
+    :param detect: detect(c0, ..., cN) -> array booleano, com uma Bars por vela do padrão.
+    """
+    name: str
+    bars: int
+    direction: int
+    detect: Callable[..., np.ndarray]
+
+
+def _bullish_engulfing(prev: Bars, last: Bars) -> np.ndarray:
+    # A vela anterior é de baixa, a atual é de alta e "engole" a anterior.
+    return prev.bearish & last.bullish & (last.close > prev.open) & (last.open < prev.close)
+
+
+def _bearish_engulfing(prev: Bars, last: Bars) -> np.ndarray:
+    # A vela anterior é de alta, a atual é de baixa e "engole" a anterior.
+    return prev.bullish & last.bearish & (last.close < prev.open) & (last.open > prev.close)
+
+
+def _morning_star(c0: Bars, c1: Bars, c2: Bars) -> np.ndarray:
+    # Baixa forte, vela pequena abaixo do fecho da primeira, alta que fecha acima do meio da primeira.
+    return (c0.bearish & (c1.body < c0.body) & (c1.close < c0.close) &
+            c2.bullish & (c2.close > (c0.open + c0.close) / 2))
+
+
+def _evening_star(c0: Bars, c1: Bars, c2: Bars) -> np.ndarray:
+    # Alta forte, vela pequena acima do fecho da primeira, baixa que fecha abaixo do meio da primeira.
+    return (c0.bullish & (c1.body < c0.body) & (c1.close > c0.close) &
+            c2.bearish & (c2.close < (c0.open + c0.close) / 2))
+
+
+def _hammer(prev: Bars, last: Bars) -> np.ndarray:
+    # Depois de uma vela de baixa: sombra inferior longa e sombra superior curta.
+    return (prev.bearish & (last.range > 0) &
+            (last.lower_shadow >= SHADOW_BODY_RATIO * last.body) & (last.upper_shadow <= last.body))
+
+
+def _shooting_star(prev: Bars, last: Bars) -> np.ndarray:
+    # Depois de uma vela de alta: sombra superior longa e sombra inferior curta.
+    return (prev.bullish & (last.range > 0) &
+            (last.upper_shadow >= SHADOW_BODY_RATIO * last.body) & (last.lower_shadow <= last.body))
+
+
+def _doji(last: Bars) -> np.ndarray:
+    return (last.range > 0) & (last.body <= DOJI_BODY_RATIO * last.range)
+
+
+def _three_white_soldiers(c0: Bars, c1: Bars, c2: Bars) -> np.ndarray:
+    # Três altas seguidas, cada uma a abrir dentro do corpo da anterior e a fechar mais acima.
+    return (c0.bullish & c1.bullish & c2.bullish &
+            (c1.open > c0.open) & (c1.open < c0.close) & (c1.close > c0.close) &
+            (c2.open > c1.open) & (c2.open < c1.close) & (c2.close > c1.close))
+
+
+def _three_black_crows(c0: Bars, c1: Bars, c2: Bars) -> np.ndarray:
+    # Três baixas seguidas, cada uma a abrir dentro do corpo da anterior e a fechar mais abaixo.
+    return (c0.bearish & c1.bearish & c2.bearish &
+            (c1.open < c0.open) & (c1.open > c0.close) & (c1.close < c0.close) &
+            (c2.open < c1.open) & (c2.open > c1.close) & (c2.close < c1.close))
+
+
+PATTERNS = {
+    pattern.name: pattern
+    for pattern in (
+        CandlePattern("bullish_engulfing", 2, SIGNAL_BUY, _bullish_engulfing),
+        CandlePattern("bearish_engulfing", 2, SIGNAL_SELL, _bearish_engulfing),
+        CandlePattern("morning_star", 3, SIGNAL_BUY, _morning_star),
+        CandlePattern("evening_star", 3, SIGNAL_SELL, _evening_star),
+        CandlePattern("hammer", 2, SIGNAL_BUY, _hammer),
+        CandlePattern("shooting_star", 2, SIGNAL_SELL, _shooting_star),
+        CandlePattern("doji", 1, SIGNAL_NONE, _doji),
+        CandlePattern("three_white_soldiers", 3, SIGNAL_BUY, _three_white_soldiers),
+        CandlePattern("three_black_crows", 3, SIGNAL_SELL, _three_black_crows),
+    )
+}
+
+
+def parse_patterns(value) -> tuple[str, ...]:
+    """
+    Converte uma lista de nomes (ou uma string separada por vírgulas) num tuplo de padrões.
+    Nomes desconhecidos são ignorados, para que um erro na configuração não impeça o plano de compilar.
+    """
+    names = value.split(',') if isinstance(value, str) else value
+    return tuple(dict.fromkeys(name for name in (str(n).strip() for n in names) if name in PATTERNS))
+
+
+def max_bars(names) -> int:
+    """Número de velas de que os padrões `names` precisam."""
+    return max((PATTERNS[name].bars for name in names), default=1)
+
+
+def _detect(pattern: CandlePattern, ohlc: tuple[np.ndarray, ...]) -> np.ndarray:
+    """Avalia o padrão em todas as posições; as primeiras `bars - 1` velas ficam False."""
+    n = len(ohlc[0])
+    out = np.zeros(n, dtype=bool)
+    if n < pattern.bars:
+        return out
+    lag = pattern.bars - 1
+    bars = [Bars(*(col[i:n - lag + i] for col in ohlc)) for i in range(pattern.bars)]
+    out[lag:] = pattern.detect(*bars)
+    return out
+
+
+def _columns(snapshot, tail: int | None = None) -> tuple[np.ndarray, ...]:
+    columns = tuple(snapshot[col] for col in ('open', 'high', 'low', 'close'))
+    return tuple(col[-tail:] for col in columns) if tail else columns
+
+
+def scan(snapshot, names=None) -> dict[str, np.ndarray]:
+    """
+    Série booleana de cada padrão sobre o histórico completo (posição i = o padrão termina na vela i).
+
+    :param snapshot: CandleSnapshot (ou outro objeto indexável por coluna) com open/high/low/close.
+    :param names: Padrões a avaliar (por omissão, todos).
+    """
+    ohlc = _columns(snapshot)
+    return {name: _detect(PATTERNS[name], ohlc) for name in (names or PATTERNS)}
+
+
+def scan_last(snapshot, names=None) -> list[str]:
+    """Padrões que terminam na última vela, avaliando apenas as velas necessárias."""
+    names = names or tuple(PATTERNS)
+    ohlc = _columns(snapshot, max_bars(names))
+    return [name for name in names if _detect(PATTERNS[name], ohlc)[-1]]
+
+
+def pattern_signals(snapshot, names) -> np.ndarray:
+    """
+    Série de sinais (+1/-1/0) dos padrões `names`; um padrão de compra tem prioridade
+    quando padrões de ambos os lados terminam na mesma vela (como em analyze()).
+    """
+    n = len(snapshot)
+    up, down = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+    for name, found in scan(snapshot, names).items():
+        direction = PATTERNS[name].direction
+        if direction == SIGNAL_BUY:
+            up |= found
+        elif direction == SIGNAL_SELL:
+            down |= found
+    return to_signals(up, down, max_bars(names))
+
+
+def last_signal(snapshot, names) -> str | None:
+    """Sinal ("UP", "DOWN" ou None) dos padrões `names` na última vela, para o analyze() das estratégias."""
+    if len(snapshot) < max_bars(names):
+        return None
+    found = [PATTERNS[name].direction for name in scan_last(snapshot, names)]
+    if SIGNAL_BUY in found:
+        return "UP"
+    if SIGNAL_SELL in found:
+        return "DOWN"
+    return None
@@ -0,0 +1,230 @@
+# utils/deriv_client.py
+
+import asyncio
+import itertools
+import json
+import logging
+
+import websockets
+from websockets.exceptions import ConnectionClosed, ConnectionClosedError, ConnectionClosedOK
+
+logger = logging.getLogger(__name__)
+
+# Tempo máximo (segundos) à espera da resposta de um pedido, se a chamada não indicar outro
+DEFAULT_TIMEOUT = 10.0
+
+# Marcador posto na fila de cada Subscription quando a ligação termina
+_CLOSED = object()
+
+
+class DerivAPIError(Exception):
+    """Erro devolvido pela API da Deriv (campo 'error' da resposta)."""
+    def __init__(self, msg_type: str | None, code: str | None, message: str):
+        super().__init__(message)
+        self.msg_type = msg_type
+        self.code = code
+        self.message = message
+
+    @classmethod
+    def from_response(cls, data: dict) -> 'DerivAPIError':
+        error = data.get('error') or {}
+        return cls(data.get('msg_type'), error.get('code'), error.get('message', 'Erro desconhecido.'))
+
+
+class Subscription:
+    """
+    Fluxo de uma subscrição (ex: transaction, proposal_open_contract).
+    Todas as mensagens do fluxo, incluindo a primeira resposta, vão para uma fila própria.
+    Quando a ligação termina, get() levanta ConnectionClosed e a iteração (`async for`) acaba.
+    """
+    def __init__(self, client: 'DerivClient', req_id: int):
+        self.client = client
+        self.req_id = req_id
+        self.id: str | None = None  # subscription.id atribuído pela Deriv
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.first: dict | None = None
+        self.error: ConnectionClosed | None = None  # Definido quando a ligação termina
+
+    async def get(self, timeout: float | None = None) -> dict:
+        """
+        Próxima mensagem do fluxo.
+
+        :raises asyncio.TimeoutError: Se não chegar nenhuma mensagem a tempo.
+        :raises ConnectionClosed: Se a ligação terminou (e a fila está vazia).
+        """
+        if timeout is None:
+            data = await self.queue.get()
+        else:
+            data = await asyncio.wait_for(self.queue.get(), timeout)
+        if data is _CLOSED:
+            self.queue.put_nowait(_CLOSED)  # As leituras seguintes também terminam
+            raise self.error
+        return data
+
+    def _close(self, exc: ConnectionClosed):
+        """Marca o fim do fluxo; as mensagens já na fila continuam a ser entregues antes."""
+        if self.error is None:
+            self.error = exc
+            self.queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        try:
+            return await self.get()
+        except ConnectionClosed:
+            raise StopAsyncIteration from None
+
+    async def forget(self):
+        """Cancela a subscrição na Deriv e deixa de encaminhar mensagens para a fila."""
+        self.client._streams.pop(self.req_id, None)
+        if self.id and self.client.connected:
+            try:
+                await self.client.send({"forget": self.id})
+            except (DerivAPIError, asyncio.TimeoutError, ConnectionClosed):
+                pass
+
+
+class DerivClient:
+    """
+    Cliente assíncrono sobre o WebSocket da Deriv.
+
+    Cada pedido recebe um `req_id`; `send()` devolve a resposta correspondente (com timeout
+    por chamada), pelo que vários pedidos podem estar em curso ao mesmo tempo. As mensagens
+    de subscrições vão para a fila do respetivo Subscription, e as restantes mensagens
+    são despachadas pela tabela `handlers` (msg_type -> corrotina).
+    """
+    def __init__(self, url: str, default_timeout: float = DEFAULT_TIMEOUT):
+        self.url = url
+        self.default_timeout = default_timeout
+        self.ws: websockets.WebSocketClientProtocol | None = None
+        self.handlers: dict[str, callable] = {}
+        self._req_ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._streams: dict[int, Subscription] = {}
+        self._reader: asyncio.Task | None = None
+        self.closed = asyncio.Event()
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None and not self.ws.closed
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url)
+        self.closed.clear()
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self.ws and not self.ws.closed:
+            await self.ws.close()
+        if self._reader and not self._reader.done():
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+        self._fail_pending(ConnectionClosedOK(None, None))
+
+    async def __aenter__(self) -> 'DerivClient':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def on(self, msg_type: str, handler):
+        """Regista a corrotina `handler(data)` para mensagens `msg_type` sem pedido associado."""
+        self.handlers[msg_type] = handler
+
+    async def send(self, request: dict, timeout: float | None = None) -> dict:
+        """
+        Envia um pedido e espera pela resposta com o mesmo req_id.
+
+        :raises DerivAPIError: Se a resposta trouxer 'error'.
+        :raises asyncio.TimeoutError: Se a resposta não chegar dentro de `timeout` segundos.
+        """
+        req_id = next(self._req_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            await self.ws.send(json.dumps({**request, "req_id": req_id}))
+            return await asyncio.wait_for(future, timeout or self.default_timeout)
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def subscribe(self, request: dict, timeout: float | None = None) -> Subscription:
+        """
+        Envia um pedido com subscribe=1 e devolve o Subscription depois da primeira resposta.
+        A primeira resposta fica em `subscription.first` e também é colocada na fila.
+        """
+        req_id = next(self._req_ids)
+        stream = self._streams[req_id] = Subscription(self, req_id)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            await self.ws.send(json.dumps({**request, "subscribe": 1, "req_id": req_id}))
+            stream.first = await asyncio.wait_for(future, timeout or self.default_timeout)
+        except BaseException:
+            self._streams.pop(req_id, None)
+            raise
+        finally:
+            self._pending.pop(req_id, None)
+        stream.id = (stream.first.get('subscription') or {}).get('id')
+        return stream
+
+    def _fail_pending(self, exc: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self._pending.clear()
+
+    def _close_streams(self, exc: ConnectionClosed):
+        """Termina todos os fluxos abertos, para que quem espera por eles não fique bloqueado."""
+        for stream in self._streams.values():
+            stream._close(exc)
+        self._streams.clear()
+
+    async def _read_loop(self):
+        closed_by: ConnectionClosed | None = None
+        try:
+            async for message in self.ws:
+                await self._dispatch(json.loads(message))
+        except ConnectionClosed as e:
+            closed_by = e
+            self._fail_pending(e)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Erro no leitor do DerivClient: %s", e)
+            closed_by = ConnectionClosedError(None, None)
+            self._fail_pending(e)
+        finally:
+            self._close_streams(closed_by or ConnectionClosedOK(None, None))
+            self.closed.set()
+
+    async def _dispatch(self, data: dict):
+        req_id = data.get('req_id')
+        stream = self._streams.get(req_id)
+        future = self._pending.get(req_id)
+
+        # Um erro na primeira resposta vai para quem subscreveu; erros posteriores seguem no fluxo
+        if stream is not None and not (future is not None and 'error' in data):
+            stream.queue.put_nowait(data)
+
+        if future is not None:
+            if not future.done():
+                if 'error' in data:
+                    future.set_exception(DerivAPIError.from_response(data))
+                else:
+                    future.set_result(data)
+            return
+
+        if stream is not None:
+            return
+
+        if handler := self.handlers.get(data.get('msg_type')):
+            await handler(data)
+        elif 'error' in data:
+            logger.error("Erro da API sem pedido associado (%s): %s", data.get('msg_type'), data['error'].get('message'),
+                         extra={'msg_type': data.get('msg_type')})
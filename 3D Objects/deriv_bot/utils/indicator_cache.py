@@ -0,0 +1,178 @@
+# utils/indicator_cache.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from utils.indicators import INDICATORS
+
+OHLC_COLUMNS = ('open', 'high', 'low', 'close')
+SNAPSHOT_COLUMNS = ('epoch',) + OHLC_COLUMNS + ('volume',)
+
+if TYPE_CHECKING:
+    import pandas as pd  # Importado só quando uma snapshot é convertida de/para pandas
+
+
+class IndicatorCache:
+    """
+    Cache LRU de resultados de indicadores, partilhada entre estratégias e sessões.
+    A chave inclui a impressão digital da snapshot (símbolo, granularidade, tamanho,
+    primeiro/último epoch, OHLCV da última vela e versão do histórico), o nome do indicador e os parâmetros;
+    assim o RSI(14) de um mesmo conjunto de velas é calculado uma única vez.
+    """
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+# Cache global do processo, reutilizada por todas as sessões que olham para as mesmas velas
+shared_indicator_cache = IndicatorCache()
+
+
+def _freeze(value):
+    """Marca os arrays de um resultado como apenas leitura, pois são partilhados."""
+    if isinstance(value, tuple):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    return value
+
+
+class CandleSnapshot:
+    """
+    Fotografia imutável e tipada das velas, criada uma vez por ciclo de decisão.
+    Todas as estratégias do ciclo recebem a mesma snapshot: não há cópias do DataFrame
+    nem coerções repetidas, e os indicadores são pedidos via `indicator()`, que os memoriza.
+
+    `version` identifica o histórico fechado de onde as velas vieram (CandleBuilder.history_version):
+    muda quando uma vela fechada dentro da janela é reescrita, o que a última vela não mostra.
+    Sem versão (ex: DataFrame avulso), a chave usa um resumo (hash) do conteúdo.
+    """
+    def __init__(self, arrays: dict[str, np.ndarray], symbol: str | None = None,
+                 granularity: int | None = None, cache: IndicatorCache | None = None,
+                 version: int | None = None):
+        self.arrays = arrays
+        for arr in arrays.values():
+            arr.flags.writeable = False
+        self.symbol = symbol
+        self.granularity = granularity
+        self.version = version
+        # Snapshots sem símbolo (ex: criadas a partir de um DataFrame avulso) usam uma cache própria
+        self.cache = cache if cache is not None else IndicatorCache(maxsize=64)
+        self._series: dict[str, 'pd.Series'] = {}
+        self._key = None
+
+    @classmethod
+    def from_builder(cls, builder, symbol: str, cache: IndicatorCache | None = None,
+                     closed_only: bool = False) -> 'CandleSnapshot':
+        """
+        Cria a snapshot a partir de um CandleBuilder (os dados já foram validados na entrada).
+        Com closed_only=True a vela ainda aberta é excluída.
+        """
+        arrays = {col: arr.copy() for col, arr in builder.get_arrays(closed_only).items()}
+        return cls(arrays, symbol, builder.granularity, cache if cache is not None else shared_indicator_cache,
+                   builder.history_version)
+
+    @classmethod
+    def from_dataframe(cls, df: 'pd.DataFrame') -> 'CandleSnapshot':
+        """Converte um DataFrame avulso, fazendo a coerção numérica e o dropna uma única vez."""
+        import pandas as pd
+
+        valid = pd.Series(True, index=df.index)
+        columns = {}
+        for col in SNAPSHOT_COLUMNS:
+            if col in df.columns:
+                columns[col] = pd.to_numeric(df[col], errors='coerce')
+                if col in OHLC_COLUMNS:
+                    valid &= columns[col].notna()
+        arrays = {col: series[valid].to_numpy(dtype=np.float64) for col, series in columns.items()}
+        if 'epoch' in arrays:
+            arrays['epoch'] = arrays['epoch'].astype(np.int64)
+        return cls(arrays)
+
+    def __len__(self) -> int:
+        return len(self.arrays['close']) if 'close' in self.arrays else 0
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.arrays
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.arrays[column]
+
+    @property
+    def key(self) -> tuple:
+        """Impressão digital das velas; duas snapshots com a mesma chave têm os mesmos dados."""
+        if self._key is None:
+            n = len(self)
+            epochs = self.arrays.get('epoch')
+            last = tuple(float(self.arrays[col][-1]) for col in OHLC_COLUMNS + ('volume',)
+                         if col in self.arrays and n)
+            self._key = (
+                self.symbol, self.granularity, n,
+                int(epochs[0]) if epochs is not None and n else None,
+                int(epochs[-1]) if epochs is not None and n else None,
+                last,
+                self.version if self.version is not None else self._digest(),
+            )
+        return self._key
+
+    def _digest(self) -> str:
+        """Resumo do conteúdo de todas as colunas (alguns µs para as 750 velas do bot)."""
+        h = hashlib.blake2b(digest_size=16)
+        for col in sorted(self.arrays):
+            h.update(col.encode())
+            h.update(np.ascontiguousarray(self.arrays[col]).tobytes())
+        return h.hexdigest()
+
+    def series(self, column: str) -> 'pd.Series':
+        """Retorna (e guarda) a coluna como pd.Series, para os cálculos que usam pandas/ta."""
+        if column not in self._series:
+            import pandas as pd
+            self._series[column] = pd.Series(self.arrays[column], copy=False)
+        return self._series[column]
+
+    def indicator(self, name: str, **params):
+        """Calcula (ou obtém da cache) o indicador `name` com os parâmetros dados."""
+        func = INDICATORS[name]
+        cache_key = (self.key, name, tuple(sorted(params.items())))
+        return self.cache.get_or_compute(cache_key, lambda: _freeze(func(self, **params)))
+
+    def dataframe(self) -> 'pd.DataFrame':
+        """DataFrame com as velas da snapshot, para consumidores que precisam mesmo de pandas."""
+        import pandas as pd
+
+        return pd.DataFrame({col: arr.copy() for col, arr in self.arrays.items()})
+
+
+def as_snapshot(data) -> CandleSnapshot:
+    """Aceita uma CandleSnapshot (usada tal como está) ou um DataFrame (convertido)."""
+    if isinstance(data, CandleSnapshot):
+        return data
+    return CandleSnapshot.from_dataframe(data)
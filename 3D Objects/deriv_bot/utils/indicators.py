@@ -0,0 +1,209 @@
+# utils/indicators.py
+
+import numpy as np
+
+from core.config import settings
+from utils import kernels
+
+# Cálculo dos indicadores usados pelas estratégias, sobre uma CandleSnapshot.
+# Cada função recebe a snapshot e os parâmetros do indicador e retorna um array NumPy
+# (ou um tuplo de arrays) com o mesmo comprimento da snapshot. Os resultados são
+# memorizados por IndicatorCache, por isso estas funções nunca devem alterar a snapshot.
+#
+# O cálculo é feito pelos kernels NumPy de utils/kernels.py. As versões com a biblioteca `ta`
+# (sufixo _ta) ficam como referência: check_against_ta() compara as duas (tests/test_indicators.py;
+# `python -m utils.indicators` mostra também os tempos de cada uma) e INDICATOR_BACKEND="ta" volta a
+# usá-las nas estratégias. A `ta` (e o pandas) só são importados quando uma versão _ta é chamada.
+
+
+def rsi(snapshot, window: int = 14) -> np.ndarray:
+    return kernels.rsi(snapshot['close'], window)
+
+
+def sma(snapshot, window: int = 20, column: str = 'close', min_periods: int | None = None) -> np.ndarray:
+    return kernels.sma(snapshot[column], window, min_periods or window)
+
+
+def bollinger(snapshot, window: int = 20, window_dev: float = 2.0) -> tuple[np.ndarray, np.ndarray]:
+    """Retorna (banda superior, banda inferior)."""
+    _, upper, lower = kernels.bollinger(snapshot['close'], window, window_dev)
+    return upper, lower
+
+
+def macd_diff(snapshot, window_fast: int = 12, window_slow: int = 26, window_sign: int = 9) -> np.ndarray:
+    return kernels.macd(snapshot['close'], window_fast, window_slow, window_sign)[2]
+
+
+def adx(snapshot, window: int = 14) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Retorna (adx, +DI, -DI)."""
+    return kernels.adx(snapshot['high'], snapshot['low'], snapshot['close'], window)
+
+
+def atr(snapshot, window: int = 14) -> np.ndarray:
+    return kernels.atr(snapshot['high'], snapshot['low'], snapshot['close'], window)
+
+
+def williams_r(snapshot, lbp: int = 14) -> np.ndarray:
+    return kernels.williams_r(snapshot['high'], snapshot['low'], snapshot['close'], lbp)
+
+
+def vwap(snapshot, window: int = 14) -> np.ndarray:
+    return kernels.vwap(snapshot['high'], snapshot['low'], snapshot['close'], snapshot['volume'], window)
+
+
+# --- Implementações de referência com a biblioteca ta ---
+
+def rsi_ta(snapshot, window: int = 14) -> np.ndarray:
+    import ta
+
+    return ta.momentum.RSIIndicator(close=snapshot.series('close'), window=window).rsi().to_numpy()
+
+
+def sma_ta(snapshot, window: int = 20, column: str = 'close', min_periods: int | None = None) -> np.ndarray:
+    series = snapshot.series(column)
+    return series.rolling(window=window, min_periods=min_periods or window).mean().to_numpy()
+
+
+def bollinger_ta(snapshot, window: int = 20, window_dev: float = 2.0) -> tuple[np.ndarray, np.ndarray]:
+    import ta
+
+    bands = ta.volatility.BollingerBands(close=snapshot.series('close'), window=window, window_dev=window_dev)
+    return bands.bollinger_hband().to_numpy(), bands.bollinger_lband().to_numpy()
+
+
+def macd_diff_ta(snapshot, window_fast: int = 12, window_slow: int = 26, window_sign: int = 9) -> np.ndarray:
+    import ta
+
+    return ta.trend.MACD(
+        close=snapshot.series('close'),
+        window_slow=window_slow,
+        window_fast=window_fast,
+        window_sign=window_sign
+    ).macd_diff().to_numpy()
+
+
+def adx_ta(snapshot, window: int = 14) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    import ta
+
+    indicator = ta.trend.ADXIndicator(
+        high=snapshot.series('high'), low=snapshot.series('low'), close=snapshot.series('close'), window=window
+    )
+    return indicator.adx().to_numpy(), indicator.adx_pos().to_numpy(), indicator.adx_neg().to_numpy()
+
+
+def atr_ta(snapshot, window: int = 14) -> np.ndarray:
+    import ta
+
+    return ta.volatility.AverageTrueRange(
+        high=snapshot.series('high'), low=snapshot.series('low'), close=snapshot.series('close'), window=window
+    ).average_true_range().to_numpy()
+
+
+def williams_r_ta(snapshot, lbp: int = 14) -> np.ndarray:
+    import ta
+
+    return ta.momentum.WilliamsRIndicator(
+        high=snapshot.series('high'), low=snapshot.series('low'), close=snapshot.series('close'), lbp=lbp
+    ).williams_r().to_numpy()
+
+
+def vwap_ta(snapshot, window: int = 14) -> np.ndarray:
+    import ta
+
+    return ta.volume.VolumeWeightedAveragePrice(
+        high=snapshot.series('high'),
+        low=snapshot.series('low'),
+        close=snapshot.series('close'),
+        volume=snapshot.series('volume'),
+        window=window
+    ).volume_weighted_average_price().to_numpy()
+
+
+NUMPY_INDICATORS = {
+    "rsi": rsi,
+    "sma": sma,
+    "bollinger": bollinger,
+    "macd_diff": macd_diff,
+    "adx": adx,
+    "atr": atr,
+    "williams_r": williams_r,
+    "vwap": vwap,
+}
+
+TA_INDICATORS = {
+    "rsi": rsi_ta,
+    "sma": sma_ta,
+    "bollinger": bollinger_ta,
+    "macd_diff": macd_diff_ta,
+    "adx": adx_ta,
+    "atr": atr_ta,
+    "williams_r": williams_r_ta,
+    "vwap": vwap_ta,
+}
+
+# Nome do indicador -> função de cálculo (usado por CandleSnapshot.indicator)
+INDICATORS = TA_INDICATORS if settings.INDICATOR_BACKEND == "ta" else NUMPY_INDICATORS
+
+
+def check_against_ta(snapshot, params: dict[str, dict] | None = None, rtol: float = 1e-9) -> dict[str, float]:
+    """
+    Compara os kernels NumPy com a biblioteca ta sobre a mesma snapshot.
+
+    :param params: Parâmetros por indicador, ex: {"rsi": {"window": 7}} (por omissão, os de cada função).
+    :return: Maior diferença relativa de cada indicador; lança AssertionError se os valores
+             indefinidos (NaN) não coincidirem ou se alguma diferença passar `rtol`.
+    """
+    params = params or {}
+    report = {}
+    for name, reference in TA_INDICATORS.items():
+        if name == "vwap" and 'volume' not in snapshot:
+            continue
+        expected = reference(snapshot, **params.get(name, {}))
+        actual = NUMPY_INDICATORS[name](snapshot, **params.get(name, {}))
+        if not isinstance(expected, tuple):
+            expected, actual = (expected,), (actual,)
+        worst = 0.0
+        for exp, act in zip(expected, actual):
+            exp, act = np.asarray(exp, dtype=np.float64), np.asarray(act, dtype=np.float64)
+            assert np.array_equal(np.isnan(exp), np.isnan(act)), f"{name}: NaN em posições diferentes"
+            finite = np.isfinite(exp)
+            assert np.array_equal(exp[~finite], act[~finite], equal_nan=True), f"{name}: valores infinitos diferentes"
+            if finite.any():
+                error = np.abs(act[finite] - exp[finite]) / np.maximum(np.abs(exp[finite]), 1.0)
+                worst = max(worst, float(error.max()))
+        assert worst <= rtol, f"{name}: diferença relativa {worst:.3e} acima de {rtol:.0e}"
+        report[name] = worst
+    return report
+
+
+if __name__ == "__main__":
+    import timeit
+
+    import pandas as pd
+
+    from utils.indicator_cache import CandleSnapshot
+
+    def random_walk(n: int, seed: int = 7) -> CandleSnapshot:
+        rng = np.random.default_rng(seed)
+        close = 1000 + np.cumsum(rng.normal(0, 1, n))
+        spread = np.abs(rng.normal(0, 0.5, (2, n)))
+        open_ = np.r_[close[0], close[:-1]]
+        return CandleSnapshot.from_dataframe(pd.DataFrame({
+            'epoch': np.arange(n) * 60,
+            'open': open_,
+            'high': np.maximum(open_, close) + spread[0],
+            'low': np.minimum(open_, close) - spread[1],
+            'close': close,
+            'volume': rng.integers(1, 100, n).astype(np.float64),
+        }))
+
+    # Verificação numérica dos kernels contra a ta sobre um passeio aleatório, e tempos com as
+    # 750 velas do bot e com uma série longa (backtests)
+    for n in (750, 20000):
+        snapshot = random_walk(n)
+        print(f"--- {n} velas")
+        for name, error in check_against_ta(snapshot).items():
+            # Melhor de várias execuções, para o resultado não depender de uma só medição
+            numpy_time = min(timeit.repeat(lambda: NUMPY_INDICATORS[name](snapshot), number=1, repeat=20))
+            ta_time = min(timeit.repeat(lambda: TA_INDICATORS[name](snapshot), number=1, repeat=5))
+            print(f"{name:<11} erro relativo {error:.1e} | numpy {numpy_time * 1000:7.2f} ms | ta {ta_time * 1000:7.2f} ms")
@@ -0,0 +1,498 @@
+# utils/kernels.py
+
+import math
+
+import numpy as np
+
+# Kernels NumPy dos indicadores, sem pandas nem `ta`, que reproduzem as fórmulas da `ta`
+# (mesmas sementes, mesmos períodos mínimos e as mesmas particularidades do ADX).
+#
+# Todos aceitam entradas 2-D: várias séries (uma por linha) e/ou vários períodos de uma vez.
+#   - x com forma (n,) e período escalar      -> resultado (n,)
+#   - x com forma (n,) e períodos [w1, ..., wk] -> resultado (k, n), uma linha por período
+#   - x com forma (k, n) e período escalar ou k períodos -> resultado (k, n)
+# Valores indefinidos (aquecimento) são NaN, exceto onde a `ta` devolve 0 (ATR e ADX).
+# Todos os kernels são O(n) por série, independentemente do período.
+
+# Fator máximo de crescimento de d**-j dentro de um bloco da recorrência linear
+_SCAN_GROWTH = 1e9
+
+# Peso abaixo do qual o valor de blocos anteriores deixa de contar na recorrência linear
+_SCAN_NEGLIGIBLE = 1e-30
+
+# Comprimento aproximado dos blocos em que as somas móveis recomeçam a acumular
+_SUM_BLOCK = 1024
+
+# As variâncias móveis abaixo deste múltiplo do erro de arredondamento das somas são recalculadas
+# diretamente (janelas quase constantes, onde E[x²] - E[x]² perde os dígitos todos). Com preços
+# quantizados só as janelas constantes ficam abaixo, e essas são tratadas à parte, em O(n).
+_VAR_RECHECK = 1e8
+
+# Número aproximado de valores por lote no recálculo direto
+_RECHECK_BATCH = 1 << 16
+
+
+def _prepare(x, *params) -> tuple[np.ndarray, list[np.ndarray], bool]:
+    """Converte x para (k, n) e os parâmetros para arrays (k,), com broadcast entre si."""
+    x = np.asarray(x, dtype=np.float64)
+    squeeze = x.ndim == 1 and all(np.ndim(p) == 0 for p in params)
+    x2 = np.atleast_2d(x)
+    arrays = [np.atleast_1d(np.asarray(p)) for p in params]
+    k = max([x2.shape[0]] + [len(a) for a in arrays])
+    if x2.shape[0] != k:
+        x2 = np.broadcast_to(x2, (k, x2.shape[1]))
+    return x2, [a if len(a) == k else np.broadcast_to(a, (k,)) for a in arrays], squeeze
+
+
+def _finish(result: np.ndarray, squeeze: bool) -> np.ndarray:
+    return result[0] if squeeze else result
+
+
+def _groups(*params: np.ndarray):
+    """Agrupa as linhas com os mesmos parâmetros, para calcular cada grupo de uma só vez."""
+    keys = list(zip(*(p.tolist() for p in params)))
+    groups: dict[tuple, list[int]] = {}
+    for row, key in enumerate(keys):
+        groups.setdefault(key, []).append(row)
+    return [(key, np.asarray(rows)) for key, rows in groups.items()]
+
+
+def linear_scan(b: np.ndarray, decay: np.ndarray, initial: np.ndarray | None = None, scale=1.0,
+                out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Recorrência linear y[t] = decay * y[t-1] + scale * b[t], linha a linha, com y[-1] = initial (0 por omissão).
+    Com `out` (k, n), o resultado é escrito diretamente nesse array (pode ser uma fatia de outro maior).
+
+    Resolvida por blocos: dentro de cada bloco y = d**k * (c * d + cumsum(b * d**-j)), com o
+    tamanho do bloco escolhido para que d**-j não perca precisão. Os blocos são calculados todos de
+    uma vez e o valor c que entra em cada um vem de uma varredura em log2(blocos) passos, que para
+    quando o peso dos blocos mais antigos, d**(bloco * passo), já não altera o resultado.
+    É a base das médias exponenciais (EMA, RSI) e das suavizações de Wilder (ATR, ADX).
+    """
+    b = np.atleast_2d(np.asarray(b, dtype=np.float64))
+    k, n = b.shape
+    # Parâmetros em coluna, (k, 1) ou (1, 1): o broadcast trata do resto
+    decay = np.asarray(decay, dtype=np.float64).reshape(-1, 1)
+    scale = np.asarray(scale, dtype=np.float64).reshape(-1, 1)
+    carry = np.zeros((k, 1)) if initial is None else np.broadcast_to(
+        np.asarray(initial, dtype=np.float64).reshape(-1, 1), (k, 1))
+    if out is None:
+        out = np.empty((k, n))
+    if n == 0:
+        return out
+
+    smallest, largest = float(decay.min()), float(decay.max())
+    if smallest <= 0:
+        block = 1
+    elif smallest >= 1:
+        block = n
+    else:
+        block = max(1, min(n, int(math.log(_SCAN_GROWTH) / -math.log(smallest))))
+
+    # Todos os blocos de uma vez, cada um a partir de 0; depois propaga o último valor de cada
+    # bloco aos seguintes (recorrência entre blocos, com decaimento d**block)
+    blocks = -(-n // block)
+    steps = np.arange(block)
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        grow = decay ** steps          # d**k
+        shrink = decay ** -steps.astype(np.float64)  # d**-j
+        shrink[~np.isfinite(shrink)] = 0.0
+    shrink = shrink * scale  # O fator scale vai nos pesos de cada bloco, sem uma passagem extra por b
+    local = np.empty((k, blocks, block))
+    full = n // block
+    np.multiply(b[:, :full * block].reshape(k, full, block), shrink[:, None, :], out=local[:, :full])
+    if full < blocks:
+        rest = n - full * block
+        np.multiply(b[:, full * block:], shrink[:, :rest], out=local[:, full, :rest])
+        local[:, full, rest:] = 0.0
+    np.cumsum(local, axis=2, out=local)   # local = cumsum(b * d**-j), sem o fator d**k
+
+    # Valor final de cada bloco: ends[i] = local[i, -1] + d**block * ends[i-1], com ends[-1] = initial
+    jump = decay[:, 0] ** block
+    ends = local[:, :, -1] * grow[:, -1:]
+    ends[:, 0] += carry[:, 0] * jump
+    span = 1
+    while span < blocks and abs(largest) ** (block * span) > _SCAN_NEGLIGIBLE:
+        ends[:, span:] = ends[:, span:] + (jump ** span)[:, None] * ends[:, :-span]
+        span *= 2
+    previous = np.concatenate([carry, ends[:, :-1]], axis=1)  # Valor antes de cada bloco
+    local += (previous * decay)[:, :, None]
+    # y = d**k * (...): escrito já no destino, os blocos completos e depois o último, incompleto
+    np.multiply(local[:, :full], grow[:, None, :], out=out[:, :full * block].reshape(k, full, block))
+    if full < blocks:
+        np.multiply(local[:, full, :rest], grow[:, :rest], out=out[:, full * block:])
+    return out
+
+
+def ewm(x, alpha, min_periods=1) -> np.ndarray:
+    """
+    Média exponencial com adjust=False (como pandas .ewm(adjust=False).mean()).
+    A média começa no primeiro valor não-NaN de cada linha; antes disso, e até haver
+    `min_periods` observações, o resultado é NaN.
+    """
+    x2, (alpha, min_periods), squeeze = _prepare(x, alpha, min_periods)
+    k, n = x2.shape
+    if n == 0:
+        return _finish(np.empty((k, 0)), squeeze)
+    valid = ~np.isnan(x2)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), n)
+
+    alpha = alpha.astype(np.float64)
+    if valid.all():
+        # Semente x[0]: com y[-1] = x[0], y[0] = (1 - alpha) * x[0] + alpha * x[0] = x[0]
+        out = linear_scan(x2, 1.0 - alpha, x2[:, 0], alpha)
+    elif np.array_equal(valid.sum(axis=1), n - first):
+        # Só NaN no início (ex: o sinal do MACD): a mesma recorrência a partir do primeiro valor
+        out = np.empty((k, n))
+        groups = _groups(first)
+        for (start,), rows in groups:
+            out[rows, :start] = np.nan
+            if start < n:
+                if len(groups) == 1:
+                    linear_scan(x2[:, start:], 1.0 - alpha, x2[:, start], alpha, out=out[:, start:])
+                else:
+                    tail = x2[rows, start:]
+                    out[rows, start:] = linear_scan(tail, 1.0 - alpha[rows], tail[:, 0], alpha[rows])
+    else:
+        cols = np.arange(n)
+        seed = cols == first[:, None]
+        b = np.where(cols > first[:, None], alpha[:, None] * x2, np.where(seed, x2, 0.0))
+        out = linear_scan(np.nan_to_num(b), 1.0 - alpha)
+    ready = first + min_periods - 1
+    for row, start in enumerate(ready):
+        out[row, :max(start, 0)] = np.nan
+    return _finish(out, squeeze)
+
+
+def ema(x, window) -> np.ndarray:
+    """EMA de span=window, adjust=False, min_periods=window (igual a ta.trend._ema)."""
+    window = np.asarray(window)
+    return ewm(x, 2.0 / (window + 1.0), window)
+
+
+def _window_diff(total: np.ndarray, window: int) -> np.ndarray:
+    """Diferenças total[i] - total[i - window] de uma soma acumulada, no próprio array (a soma nas primeiras posições)."""
+    total[:, window:] -= total[:, :-window]   # O NumPy copia o lado direito, que se sobrepõe
+    return total
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Soma de cada janela de `window` posições que termina em i (a soma parcial nas primeiras), por
+    diferenças de somas acumuladas. As somas recomeçam em cada bloco de ~_SUM_BLOCK posições (múltiplo
+    do período), para o erro de arredondamento depender do bloco e não do comprimento da série; as
+    janelas que atravessam o início de um bloco somam o total do bloco anterior.
+    """
+    k, n = values.shape
+    block = window * max(1, _SUM_BLOCK // window)
+    blocks, full = -(-n // block), n // block
+    local = np.empty((k, blocks, block))
+    np.cumsum(values[:, :full * block].reshape(k, full, block), axis=2, out=local[:, :full])
+    if full < blocks:
+        rest = n - full * block
+        np.cumsum(values[:, full * block:], axis=1, out=local[:, full, :rest])
+        local[:, full, rest:] = local[:, full, rest - 1:rest]
+    previous = local[:, :-1, -1].copy()   # Total de cada bloco, para as janelas do bloco seguinte
+    _window_diff(local.reshape(k, -1), window)
+    local[:, 1:, :window] += previous[:, :, None]
+    return local.reshape(k, -1)[:, :n]
+
+
+def _window_counts(valid: np.ndarray | None, window: int, shape: tuple[int, int]) -> np.ndarray:
+    """Número de valores válidos em cada janela de `window` posições que termina em i (`valid` None = todos)."""
+    if valid is None:
+        return np.broadcast_to(np.minimum(np.arange(1, shape[1] + 1), window), shape)
+    return _window_diff(np.cumsum(valid, axis=1, dtype=np.int64), window)
+
+
+def _invalid(x2: np.ndarray) -> np.ndarray | None:
+    """Máscara dos valores válidos (não-NaN), ou None se todos o forem (caminho rápido)."""
+    valid = ~np.isnan(x2)
+    return None if valid.all() else valid
+
+
+def _rolling_sums(x2: np.ndarray, window: int, squares: bool = False):
+    """
+    Somas dos valores não-NaN de cada janela de `window` posições que termina em i (janelas parciais
+    no início), com _window_sums: O(n) qualquer que seja o período.
+    A série é centrada na sua média antes de acumular, para as somas não perderem precisão.
+
+    :return: (soma, número de valores, centro) e, com `squares`, também a soma dos quadrados
+             (dos valores já centrados).
+    """
+    valid = _invalid(x2)
+    if valid is None:
+        center = x2.mean(axis=1, keepdims=True)
+        centered = x2 - center
+    else:
+        clean = np.where(valid, x2, 0.0)
+        center = clean.sum(axis=1, keepdims=True) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+        centered = np.where(valid, clean - center, 0.0)
+    counts = _window_counts(valid, window, x2.shape)
+    total = _window_sums(centered, window)
+    if not squares:
+        return total, counts, center
+    return total, counts, center, _window_sums(np.square(centered, out=centered), window)
+
+
+def _ready(out: np.ndarray, counts: np.ndarray, min_periods: int) -> np.ndarray:
+    """Põe NaN nas janelas com menos de `min_periods` valores válidos."""
+    out[counts < min_periods] = np.nan
+    return out
+
+
+def _grouped(x, window, compute) -> np.ndarray:
+    """Aplica compute(linhas, período) a cada grupo de linhas com o mesmo período."""
+    x2, (window,), squeeze = _prepare(x, window)
+    groups = _groups(window)
+    if x2.shape[1] == 0:
+        return _finish(np.empty(x2.shape), squeeze)
+    if len(groups) == 1 and groups[0][0][0] > 0:
+        return _finish(compute(x2, int(groups[0][0][0])), squeeze)
+    out = np.empty(x2.shape)
+    for (w,), rows in groups:
+        w = int(w)
+        out[rows] = np.nan if w <= 0 else compute(x2[rows], w)
+    return _finish(out, squeeze)
+
+
+def rolling_sum(x, window, min_periods=None) -> np.ndarray:
+    """Soma móvel (rolling(window, min_periods).sum(); os NaN são ignorados)."""
+    def compute(rows: np.ndarray, w: int) -> np.ndarray:
+        total, counts, center = _rolling_sums(rows, w)
+        total += counts * center
+        return _ready(total, counts, w if min_periods is None else min_periods)
+    return _grouped(x, window, compute)
+
+
+def sma(x, window, min_periods=None) -> np.ndarray:
+    """Média móvel simples (rolling(window, min_periods).mean())."""
+    def compute(rows: np.ndarray, w: int) -> np.ndarray:
+        if min_periods is not None and min_periods > w:
+            raise ValueError(f"min_periods {min_periods} must be <= window {w}")
+        total, counts, center = _rolling_sums(rows, w)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total /= counts
+        total += center
+        return _ready(total, counts, max(w if min_periods is None else min_periods, 1))
+    return _grouped(x, window, compute)
+
+
+def _mean_std(rows: np.ndarray, w: int) -> tuple[np.ndarray, np.ndarray]:
+    """Média e desvio padrão (ddof=0) de cada janela de w posições, das mesmas somas de x e x²."""
+    total, counts, center, squares = _rolling_sums(rows, w, squares=True)
+    # Erro de arredondamento das somas de x², acumuladas em blocos de `block` posições (block / w janelas)
+    block = w * max(1, _SUM_BLOCK // w)
+    error = squares.max(axis=1, keepdims=True, initial=0.0) * (4 * np.finfo(np.float64).eps * block / (w * w))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total /= counts
+        squares /= counts
+    squares -= total * total
+    var = np.maximum(squares, 0.0, out=squares)
+    recheck = var <= _VAR_RECHECK * error
+    recheck[:, :w - 1] = False
+    if recheck.any():
+        # Janelas com todos os valores iguais: variância 0 exata (como o pandas), em O(n)
+        if w == 1:
+            constant = np.ones(rows.shape, dtype=bool)
+        else:
+            same = np.zeros(rows.shape, dtype=np.int64)
+            same[:, 1:] = rows[:, 1:] == rows[:, :-1]
+            constant = _window_diff(np.cumsum(same, axis=1, out=same), w - 1) >= w - 1
+        var[constant] = 0.0
+        recheck &= ~constant
+        if recheck.any():
+            _exact_var(rows, w, var, recheck)
+    total += center
+    return _ready(total, counts, w), _ready(np.sqrt(var, out=var), counts, w)
+
+
+def _exact_var(rows: np.ndarray, w: int, var: np.ndarray, recheck: np.ndarray) -> None:
+    """Recalcula em `var`, diretamente sobre os w valores, as variâncias das janelas marcadas em `recheck`."""
+    row, end = np.nonzero(recheck)
+    offsets = np.arange(1 - w, 1)
+    step = max(1, _RECHECK_BATCH // w)
+    for start in range(0, len(end), step):
+        r, i = row[start:start + step], end[start:start + step]
+        var[r, i] = rows[r[:, None], i[:, None] + offsets].var(axis=1)
+
+
+def rolling_std(x, window) -> np.ndarray:
+    """Desvio padrão móvel com ddof=0 (como na `ta`), a partir das somas de x e x² por janela."""
+    return _grouped(x, window, lambda rows, w: _mean_std(rows, w)[1])
+
+
+def _window_reduce(x2: np.ndarray, window: int, op: np.ufunc, identity: float) -> np.ndarray:
+    """
+    Reduz com `op` (np.maximum, np.minimum) cada janela de `window` posições que termina em i, em O(n)
+    qualquer que seja o período (van Herk / Gil-Werman): em blocos de `window` posições, cada janela é
+    o sufixo de um bloco mais o prefixo do seguinte. As janelas parciais do início são o prefixo do
+    primeiro bloco.
+    """
+    k, n = x2.shape
+    blocks = -(-n // window)
+    padded = np.full((k, blocks, window), identity)
+    padded.reshape(k, -1)[:, :n] = x2
+    prefix = op.accumulate(padded, axis=2).reshape(k, -1)
+    suffix = op.accumulate(padded[:, :, ::-1], axis=2)[:, :, ::-1].reshape(k, -1)
+    out = prefix[:, :n].copy()
+    if n > window:
+        # Uma janela que começa no início de um bloco é o sufixo inteiro desse bloco
+        tail = prefix[:, window:n]
+        tail[:, window - 1::window] = identity
+        op(suffix[:, 1:n - window + 1], tail, out=out[:, window:])
+    return out
+
+
+def _rolling_extreme(x, window, op: np.ufunc, identity: float) -> np.ndarray:
+    def compute(rows: np.ndarray, w: int) -> np.ndarray:
+        valid = _invalid(rows)
+        if valid is None:
+            out = _window_reduce(rows, w, op, identity)
+            out[:, :w - 1] = np.nan
+            return out
+        out = _window_reduce(np.where(valid, rows, identity), w, op, identity)
+        return _ready(out, _window_counts(valid, w, rows.shape), w)
+    return _grouped(x, window, compute)
+
+
+def rolling_max(x, window) -> np.ndarray:
+    return _rolling_extreme(x, window, np.maximum, -np.inf)
+
+
+def rolling_min(x, window) -> np.ndarray:
+    return _rolling_extreme(x, window, np.minimum, np.inf)
+
+
+def rsi(close, window=14) -> np.ndarray:
+    """RSI de Wilder (alpha=1/window), igual a ta.momentum.RSIIndicator."""
+    x2, (window,), squeeze = _prepare(close, window)
+    diff = np.diff(x2, axis=1, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    alpha = 1.0 / window
+    ema_up, ema_down = ewm(up, alpha, window), ewm(down, alpha, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+    return _finish(out, squeeze)
+
+
+def macd(close, window_fast=12, window_slow=26, window_sign=9) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Retorna (macd, sinal, histograma), igual a ta.trend.MACD."""
+    x2, (fast, slow, sign), squeeze = _prepare(close, window_fast, window_slow, window_sign)
+    k = x2.shape[0]
+    # As duas EMA numa só chamada: linhas 0..k-1 com o período rápido, k..2k-1 com o lento
+    both = ema(np.concatenate([x2, x2]), np.concatenate([fast, slow]))
+    line = both[:k] - both[k:]
+    signal = ema(line, sign)
+    return tuple(_finish(arr, squeeze) for arr in (line, signal, line - signal))
+
+
+def bollinger(close, window=20, window_dev=2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Retorna (média, banda superior, banda inferior), igual a ta.volatility.BollingerBands."""
+    x2, (window, window_dev), squeeze = _prepare(close, window, window_dev)
+    mavg, mstd = np.full(x2.shape, np.nan), np.full(x2.shape, np.nan)
+    for (w,), rows in _groups(window):
+        if w > 0:
+            mavg[rows], mstd[rows] = _mean_std(x2[rows], int(w))
+    dev = window_dev.astype(np.float64)[:, None]
+    return tuple(_finish(arr, squeeze) for arr in (mavg, mavg + dev * mstd, mavg - dev * mstd))
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True Range; na primeira vela (sem fecho anterior) é high - low."""
+    high, low, close = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (high, low, close))
+    prev_close = np.concatenate([np.full((close.shape[0], 1), np.nan), close[:, :-1]], axis=1)
+    with np.errstate(invalid='ignore'):
+        tr = np.fmax(high, prev_close) - np.fmin(low, prev_close)
+    return tr
+
+
+def atr(high, low, close, window=14) -> np.ndarray:
+    """ATR de Wilder, igual a ta.volatility.AverageTrueRange (0 antes de `window` velas)."""
+    squeeze = np.ndim(close) == 1 and np.ndim(window) == 0
+    tr = true_range(high, low, close)
+    tr, (window,), _ = _prepare(tr, window)
+    k, n = tr.shape
+    out = np.zeros((k, n))
+    for (w,), rows in _groups(window):
+        w = int(w)
+        if n < w:
+            continue
+        seed = tr[rows, :w].mean(axis=1)
+        out[rows, w - 1] = seed
+        if n > w:
+            out[rows, w:] = linear_scan(tr[rows, w:], (w - 1) / w, seed, 1.0 / w)
+    return _finish(out, squeeze)
+
+
+def adx(high, low, close, window=14) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Retorna (adx, +DI, -DI), igual a ta.trend.ADXIndicator, incluindo as suas particularidades:
+    as somas de Wilder começam com as primeiras `window` variações, o ADX é 0 até à vela
+    2*window-1 e o +DI/-DI só são publicados a partir da vela window+1.
+    """
+    squeeze = np.ndim(close) == 1 and np.ndim(window) == 0
+    high, low, close = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (high, low, close))
+    tr = true_range(high, low, close)
+    diff_up = np.diff(high, axis=1, prepend=np.nan)
+    diff_down = -np.diff(low, axis=1, prepend=np.nan)
+    with np.errstate(invalid='ignore'):
+        pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+        neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    tr, (window,), _ = _prepare(tr, window)
+    pos, neg = (np.broadcast_to(a, tr.shape) for a in (pos, neg))
+    k, n = tr.shape
+    adx_out, pdi_out, ndi_out = np.zeros((k, n)), np.zeros((k, n)), np.zeros((k, n))
+
+    for (w,), rows in _groups(window):
+        w = int(w)
+        if n <= w:
+            continue
+        decay = 1.0 - 1.0 / w
+        # Somas suavizadas alinhadas com as velas w..n-1 (semente: variações 1..w)
+        smoothed = []
+        for series in (tr[rows], pos[rows], neg[rows]):
+            seed = series[:, 1:w + 1].sum(axis=1)
+            tail = linear_scan(series[:, w + 1:], decay, seed) if n > w + 1 else np.zeros((len(rows), 0))
+            smoothed.append(np.concatenate([seed[:, None], tail], axis=1))
+        trs, dip, din = smoothed
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_di = np.where(trs != 0, 100 * dip / trs, 0.0)
+            minus_di = np.where(trs != 0, 100 * din / trs, 0.0)
+            di_sum = plus_di + minus_di
+            dx = np.where(di_sum != 0, 100 * np.abs(plus_di - minus_di) / di_sum, 0.0)
+
+        pdi_out[rows, w + 1:] = plus_di[:, 1:]
+        ndi_out[rows, w + 1:] = minus_di[:, 1:]
+        if n >= 2 * w:
+            seed = dx[:, :w].mean(axis=1)
+            adx_out[rows, 2 * w - 1] = seed
+            if n > 2 * w:
+                adx_out[rows, 2 * w:] = linear_scan(dx[:, w:], (w - 1) / w, seed, 1.0 / w)
+    return tuple(_finish(arr, squeeze) for arr in (adx_out, pdi_out, ndi_out))
+
+
+def williams_r(high, low, close, lbp=14) -> np.ndarray:
+    """Williams %R, igual a ta.momentum.WilliamsRIndicator."""
+    squeeze = np.ndim(close) == 1 and np.ndim(lbp) == 0
+    close2, (lbp,), _ = _prepare(close, lbp)
+    high2, low2 = (np.broadcast_to(np.atleast_2d(np.asarray(a, dtype=np.float64)), close2.shape) for a in (high, low))
+    highest, lowest = rolling_max(high2, lbp), rolling_min(low2, lbp)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = -100 * (highest - close2) / (highest - lowest)
+    return _finish(out, squeeze)
+
+
+def vwap(high, low, close, volume, window=14) -> np.ndarray:
+    """VWAP móvel, igual a ta.volume.VolumeWeightedAveragePrice."""
+    squeeze = np.ndim(close) == 1 and np.ndim(window) == 0
+    high, low, close, volume = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (high, low, close, volume))
+    typical_volume = (high + low + close) / 3.0 * volume
+    total_pv = rolling_sum(typical_volume, window)
+    total_volume = rolling_sum(np.broadcast_to(volume, total_pv.shape), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = total_pv / total_volume
+    return _finish(np.atleast_2d(out), squeeze)
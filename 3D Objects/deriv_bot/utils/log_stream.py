@@ -0,0 +1,246 @@
+# utils/log_stream.py
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+# Níveis das mensagens do bot (os mesmos nomes usados no dashboard e os números do módulo logging)
+LEVELS = {'debug': 10, 'info': 20, 'success': 25, 'warning': 30, 'error': 40}
+DEFAULT_LEVEL = 'info'
+
+# Um frame 'bot_log' é enviado a cada FLUSH_INTERVAL segundos ou quando há MAX_BATCH mensagens
+FLUSH_INTERVAL = 0.25
+MAX_BATCH = 50
+# Mensagens com o mesmo modelo: no máximo RATE_BURST por janela de RATE_WINDOW segundos;
+# as restantes são contadas e resumidas numa só linha no fim da janela
+RATE_WINDOW = 5.0
+RATE_BURST = 3
+
+
+def level_no(level: str | int) -> int:
+    """Número do nível (nomes desconhecidos valem 'info')."""
+    if isinstance(level, int):
+        return level
+    return LEVELS.get(str(level).lower(), LEVELS[DEFAULT_LEVEL])
+
+
+class as_json:
+    """Argumento de send_log() serializado em JSON só se a mensagem for mesmo formatada."""
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self) -> str:
+        return json.dumps(self.data, default=str)
+
+
+class LogClients:
+    """
+    Nível mínimo de log de cada cliente Socket.IO, agrupado pela sala do utilizador.
+    Cada separador do dashboard escolhe o seu nível (evento 'set_log_level').
+    """
+    def __init__(self, default_level: str = DEFAULT_LEVEL):
+        self.default = level_no(default_level)
+        self._rooms: dict[str, dict[str, int]] = {}
+        self._sid_room: dict[str, str] = {}
+
+    def join(self, sid: str, room: str, level: str | None = None):
+        self.leave(sid)
+        self._sid_room[sid] = room
+        self._rooms.setdefault(room, {})[sid] = level_no(level) if level else self.default
+
+    def set_level(self, sid: str, level: str) -> bool:
+        """:return: False se o cliente ainda não entrou numa sala."""
+        room = self._sid_room.get(sid)
+        if room is None:
+            return False
+        self._rooms[room][sid] = level_no(level)
+        return True
+
+    def leave(self, sid: str):
+        room = self._sid_room.pop(sid, None)
+        if room is not None:
+            clients = self._rooms.get(room, {})
+            clients.pop(sid, None)
+            if not clients:
+                self._rooms.pop(room, None)
+
+    def levels(self, room: str) -> dict[str, int]:
+        """sid -> nível mínimo dos clientes ligados à sala."""
+        return self._rooms.get(room, {})
+
+    def min_level(self, room: str) -> int | None:
+        """Nível mais baixo pedido na sala, ou None se não há ninguém a ver."""
+        clients = self._rooms.get(room)
+        return min(clients.values()) if clients else None
+
+
+@dataclass
+class _Rate:
+    level: str
+    start: float
+    count: int = 0
+    suppressed: int = 0
+    args: tuple = ()
+
+
+class LogStream:
+    """
+    Canal de logs de uma sessão para o log do processo e para os clientes da sala `room`:
+      - filtro por nível antes de formatar: `message % args` só é construída se o log do processo
+        ou algum cliente a vão mostrar (ex: send_log("... %s", "debug", as_json(data)));
+      - limite por modelo de mensagem: repetições acima de RATE_BURST por janela são
+        descartadas sem formatar e resumidas numa linha "(repetida mais N vezes)";
+      - envio em lotes: um único frame 'bot_log' {'batch': [...]} por intervalo, filtrado
+        pelo nível de cada cliente, com no máximo `max_batch` mensagens.
+
+    :param emit: sio.emit (ou outra corrotina emit(event, data, to=sid)).
+    :param logger: Logger do processo (ex: core.log.get_logger(..., user_id=...)).
+    :param console_level: Nível mínimo das mensagens passadas a `logger`.
+    """
+    def __init__(self, emit: Callable[..., Awaitable], room: str, clients: LogClients,
+                 logger: logging.Logger | logging.LoggerAdapter | None = None,
+                 console_level: str = DEFAULT_LEVEL, flush_interval: float = FLUSH_INTERVAL,
+                 max_batch: int = MAX_BATCH, rate_window: float = RATE_WINDOW, rate_burst: int = RATE_BURST):
+        self.emit = emit
+        self.room = room
+        self.clients = clients
+        self.logger = logger or logging.getLogger(__name__)
+        self.console_level = level_no(console_level)
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self.rate_window = rate_window
+        self.rate_burst = max(1, rate_burst)
+        self._pending: list[tuple[int, dict]] = []
+        self._rates: dict[tuple[str, str], _Rate] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushing: asyncio.Task | None = None
+        self.stats = {'sent': 0, 'frames': 0, 'filtered': 0, 'suppressed': 0}
+
+    def enabled(self, level: str | int) -> bool:
+        """Se uma mensagem deste nível seria mostrada (para evitar calcular mensagens de debug)."""
+        n = level_no(level)
+        if n >= self.console_level:
+            return True
+        lowest = self.clients.min_level(self.room)
+        return lowest is not None and n >= lowest
+
+    def log(self, message: str, level: str = 'info', *args) -> bool:
+        """
+        Regista uma mensagem; não bloqueia nem espera pelo envio.
+
+        :param args: Argumentos de formatação (`message % args`), aplicados só se a mensagem passar os filtros.
+        :return: False se foi filtrada pelo nível ou pelo limite de repetições.
+        """
+        n = level_no(level)
+        if not self.enabled(n):
+            self.stats['filtered'] += 1
+            return False
+        if not self._allow(message, level, args):
+            self.stats['suppressed'] += 1
+            return False
+        self._write(n, level, self._format(message, args))
+        return True
+
+    @staticmethod
+    def _format(message: str, args: tuple) -> str:
+        if not args:
+            return message
+        try:
+            return message % args
+        except (TypeError, ValueError):
+            return f"{message} {args}"
+
+    def _allow(self, message: str, level: str, args: tuple) -> bool:
+        key = (level, message)
+        now = time.monotonic()
+        rate = self._rates.get(key)
+        if rate is None or now - rate.start >= self.rate_window:
+            if rate is not None:
+                self._summarize(key, rate)
+            rate = self._rates[key] = _Rate(level, now)
+        rate.count += 1
+        if rate.count <= self.rate_burst:
+            return True
+        rate.suppressed += 1
+        rate.args = args  # Só as últimas; a mensagem é formatada uma vez, no resumo
+        if rate.suppressed == 1:
+            self._loop().call_later(rate.start + self.rate_window - now, self._expire, key, rate)
+        return False
+
+    def _summarize(self, key: tuple[str, str], rate: _Rate):
+        if rate.suppressed:
+            text = f"{self._format(key[1], rate.args)} (repetida mais {rate.suppressed} vezes em {self.rate_window:g}s)"
+            self._write(level_no(rate.level), rate.level, text)
+            rate.suppressed = 0
+
+    def _expire(self, key: tuple[str, str], rate: _Rate):
+        # Fim da janela sem novas mensagens do mesmo modelo: o resumo sai na mesma
+        if self._rates.get(key) is rate:
+            del self._rates[key]
+            self._summarize(key, rate)
+
+    def _write(self, n: int, level: str, text: str):
+        if n >= self.console_level:
+            self.logger.log(n, text)
+        lowest = self.clients.min_level(self.room)
+        if lowest is None or n < lowest:
+            return  # Ninguém na sala quer esta mensagem
+        self._pending.append((n, {'message': text, 'level': level, 'time': time.time()}))
+        if len(self._pending) >= self.max_batch:
+            self._schedule(0)
+        elif self._timer is None:
+            self._schedule(self.flush_interval)
+
+    @staticmethod
+    def _loop() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    def _schedule(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop().call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        self._timer = None
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self.flush())
+        else:
+            self._schedule(self.flush_interval)  # Ainda a enviar o lote anterior
+
+    async def flush(self):
+        """Envia já as mensagens pendentes, num frame por cliente (filtrado pelo nível de cada um)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        for key, rate in list(self._rates.items()):
+            if now - rate.start >= self.rate_window:  # Janelas terminadas (o dicionário não cresce sem limite)
+                del self._rates[key]
+                self._summarize(key, rate)
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        frames: dict[int, list[dict]] = {}
+        for sid, lowest in list(self.clients.levels(self.room).items()):
+            if lowest not in frames:
+                frames[lowest] = [entry for n, entry in batch if n >= lowest]
+            entries = frames[lowest]
+            try:
+                for i in range(0, len(entries), self.max_batch):
+                    await self.emit('bot_log', {'batch': entries[i:i + self.max_batch]}, to=sid)
+                    self.stats['frames'] += 1
+                self.stats['sent'] += len(entries)
+            except Exception as e:
+                self.logger.error("Falha ao enviar logs para %s: %s", sid, e, extra={'sid': sid})
+
+    async def close(self):
+        """Resume as repetições pendentes e envia o que falta."""
+        for key, rate in list(self._rates.items()):
+            self._summarize(key, rate)
+        self._rates.clear()
+        await self.flush()
@@ -0,0 +1,409 @@
+# utils/market_data.py
+
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import websockets
+
+from core.log import get_logger
+from utils.candle_builder import CandleBuilder, MAX_CANDLES
+from utils.market_recorder import MarketRecorder
+
+# Espera máxima (segundos) entre tentativas de reconexão do feed público
+RECONNECT_MAX_DELAY = 30
+
+# Origem das velas: "candles" (uma subscrição 'ohlc' da Deriv por granularidade) ou
+# "ticks" (uma subscrição de ticks por símbolo, agregada localmente em todas as granularidades)
+MODE_CANDLES = "candles"
+MODE_TICKS = "ticks"
+
+# Granularidades para as quais a Deriv serve histórico de velas (as restantes vêm só dos ticks)
+DERIV_GRANULARITIES = frozenset({60, 120, 180, 300, 600, 900, 1800, 3600, 7200, 14400, 28800, 86400})
+# Ticks recentes mantidos por símbolo (o máximo do 'count' do ticks_history)
+TICK_HISTORY = 5000
+
+
+class MarketFeed:
+    """
+    Uma única subscrição pública de velas da Deriv para um par (símbolo, granularidade).
+
+    O feed abre a sua própria ligação WebSocket (sem autenticação: dados de mercado são
+    públicos), descarrega o histórico uma vez e mantém o CandleBuilder partilhado por todas
+    as sessões subscritas. A distribuição para as sessões usa os listeners do CandleBuilder:
+    cada sessão regista `callback(event, builder)`, chamado a cada BAR_UPDATED/BAR_CLOSED.
+    Os callbacks correm no loop do feed e devem ser rápidos (ex: apenas sinalizar um asyncio.Event).
+    Com um `recorder` (MarketRecorder), as velas fechadas também são gravadas em disco.
+    """
+    def __init__(self, symbol: str, granularity: int, url: str, history_count: int = MAX_CANDLES,
+                 shared: bool = False, recorder: MarketRecorder | None = None):
+        self.symbol = symbol
+        self.granularity = granularity
+        self.url = url
+        self.history_count = history_count
+        self.builder = CandleBuilder(granularity, capacity=history_count, shared=shared)
+        if recorder is not None:
+            self.builder.add_listener(recorder.candle_listener(symbol))
+        self.logger = get_logger(__name__, symbol=symbol, granularity=granularity)
+        self.history_loaded = asyncio.Event()
+        self._subscribers = []
+        self._task: asyncio.Task | None = None
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return self.symbol, self.granularity
+
+    def __len__(self) -> int:
+        """Número de sessões subscritas."""
+        return len(self._subscribers)
+
+    def _request(self) -> dict:
+        return {
+            "ticks_history": self.symbol,
+            "style": "candles",
+            "granularity": self.granularity,
+            "end": "latest",
+            "count": self.history_count,
+            "subscribe": 1
+        }
+
+    def add_subscriber(self, callback):
+        self._subscribers.append(callback)
+        self.builder.add_listener(callback)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def remove_subscriber(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+        self.builder.remove_listener(callback)
+
+    async def close(self):
+        """Cancela a ligação do feed e liberta a memória partilhada das velas (chamado quando a última sessão sai)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.builder.close()
+
+    def process_message(self, data: dict):
+        """Aplica ao CandleBuilder uma mensagem do feed ('candles' do histórico ou 'ohlc')."""
+        msg_type = data.get('msg_type')
+
+        if 'error' in data:
+            self.logger.error("Erro da API (%s): %s", msg_type, data['error'].get('message', 'Erro desconhecido.'),
+                              extra={'msg_type': msg_type})
+            return
+
+        if msg_type == 'candles':
+            # O histórico chega de uma só vez: carregado em lote, com um único BAR_CLOSED
+            self.builder.add_candles(data.get('candles') or [])
+            self.history_loaded.set()
+            self.logger.info("Histórico carregado: %d velas.", len(self.builder))
+
+        elif msg_type == 'ohlc':
+            if candle_data := data.get('ohlc'):
+                self.builder.add_candle(candle_data)
+
+    async def _run(self):
+        delay = 1
+        while self._subscribers:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self.logger.info("Conectado. A subscrever ao histórico de velas...")
+                    await ws.send(json.dumps(self._request()))
+                    delay = 1
+                    async for message in ws:
+                        self.process_message(json.loads(message))
+                        if not self._subscribers:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except websockets.exceptions.ConnectionClosed:
+                self.logger.warning("Conexão WebSocket foi fechada.")
+            except Exception as e:
+                self.logger.exception("Erro no feed: %s", e)
+
+            if self._subscribers:
+                # Reconecta com espera exponencial; o novo histórico é fundido no buffer existente
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+@dataclass(frozen=True)
+class TimeframeSubscription:
+    """Subscrição de uma sessão a uma granularidade de um TickFeed (tem o mesmo `builder` de um MarketFeed)."""
+    feed: 'TickFeed'
+    granularity: int
+
+    @property
+    def builder(self) -> CandleBuilder:
+        return self.feed.builders[self.granularity]
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.feed.key
+
+
+class TickFeed:
+    """
+    Uma única subscrição pública de ticks da Deriv por símbolo, agregada localmente em
+    várias granularidades ao mesmo tempo (ex: 15s, 60s e 300s), com o número de ticks como volume.
+
+    Cada granularidade tem o seu CandleBuilder. O histórico vem das velas da Deriv, quando a
+    granularidade existe na Deriv (DERIV_GRANULARITIES), completado pelos ticks recentes; as
+    restantes (ex: velas de segundos) são construídas só a partir dos ticks. Os últimos
+    `tick_history` ticks ficam guardados para preencher de imediato uma granularidade nova.
+    Com um `recorder` (MarketRecorder), os ticks e as velas fechadas também são gravados em disco.
+    """
+    def __init__(self, symbol: str, url: str, tick_history: int = TICK_HISTORY,
+                 candle_history: int = MAX_CANDLES, shared: bool = False, recorder: MarketRecorder | None = None):
+        self.symbol = symbol
+        self.url = url
+        self.tick_history = tick_history
+        self.candle_history = candle_history
+        self.shared = shared
+        self.recorder = recorder
+        self.builders: dict[int, CandleBuilder] = {}
+        self.history_loaded = asyncio.Event()
+        self._subscribers: dict[int, list] = {}
+        self._pinned: set[int] = set()  # Granularidades agregadas mesmo sem sessões (ex: TICK_GRANULARITIES)
+        self._ticks: deque[tuple[int, float]] = deque(maxlen=tick_history)
+        self._ws = None
+        self._task: asyncio.Task | None = None
+        self.logger = get_logger(__name__, symbol=symbol)
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.symbol, MODE_TICKS
+
+    def __len__(self) -> int:
+        """Número de sessões subscritas (em todas as granularidades)."""
+        return sum(len(callbacks) for callbacks in self._subscribers.values())
+
+    def _tick_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        epochs = np.fromiter((t[0] for t in self._ticks), dtype=np.int64, count=len(self._ticks))
+        quotes = np.fromiter((t[1] for t in self._ticks), dtype=np.float64, count=len(self._ticks))
+        return epochs, quotes
+
+    def add_granularity(self, granularity: int, pinned: bool = False) -> CandleBuilder:
+        """Garante um CandleBuilder para `granularity`, preenchido com os ticks já recebidos."""
+        if pinned:
+            self._pinned.add(granularity)
+        builder = self.builders.get(granularity)
+        if builder is None:
+            builder = self.builders[granularity] = CandleBuilder(granularity, capacity=self.candle_history, shared=self.shared)
+            if self.recorder is not None:
+                builder.add_listener(self.recorder.candle_listener(self.symbol))
+            if self._ticks:
+                builder.load_history(None, *self._tick_arrays())
+            if self._ws is not None:
+                asyncio.create_task(self._request_candles(self._ws, granularity))
+        return builder
+
+    def add_subscriber(self, granularity: int, callback) -> TimeframeSubscription:
+        builder = self.add_granularity(granularity)
+        self._subscribers.setdefault(granularity, []).append(callback)
+        builder.add_listener(callback)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return TimeframeSubscription(self, granularity)
+
+    def remove_subscriber(self, granularity: int, callback):
+        callbacks = self._subscribers.get(granularity, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        builder = self.builders.get(granularity)
+        if builder is None:
+            return
+        builder.remove_listener(callback)
+        if not callbacks and granularity not in self._pinned:
+            # Ninguém usa esta granularidade: deixa de ser agregada e liberta a memória partilhada
+            self._subscribers.pop(granularity, None)
+            del self.builders[granularity]
+            builder.close()
+
+    async def close(self):
+        """Cancela a ligação do feed e liberta a memória partilhada de todas as granularidades."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for builder in self.builders.values():
+            builder.close()
+
+    async def _request_candles(self, ws, granularity: int):
+        if granularity not in DERIV_GRANULARITIES:
+            return
+        try:
+            await ws.send(json.dumps({
+                "ticks_history": self.symbol,
+                "style": "candles",
+                "granularity": granularity,
+                "end": "latest",
+                "count": self.candle_history,
+            }))
+        except Exception as e:
+            self.logger.warning("Falha ao pedir o histórico de velas (%ss): %s", granularity, e)
+
+    def process_message(self, data: dict):
+        """Aplica uma mensagem do feed: 'tick', 'history' (ticks recentes) ou 'candles' (histórico de uma granularidade)."""
+        msg_type = data.get('msg_type')
+
+        if 'error' in data:
+            self.logger.error("Erro da API (%s): %s", msg_type, data['error'].get('message', 'Erro desconhecido.'),
+                              extra={'msg_type': msg_type})
+            return
+
+        if msg_type == 'tick':
+            if tick := data.get('tick'):
+                epoch, quote = int(tick['epoch']), float(tick['quote'])
+                if self._ticks and epoch <= self._ticks[-1][0]:
+                    return  # Repetido ou atrasado
+                self._ticks.append((epoch, quote))
+                if self.recorder is not None:
+                    self.recorder.add_tick(self.symbol, epoch, quote)
+                for builder in list(self.builders.values()):
+                    builder.add_tick(epoch, quote)
+
+        elif msg_type == 'history':
+            # Ticks recentes (à ligação e a cada reconexão): só os posteriores ao último já recebido
+            history = data.get('history') or {}
+            last = self._ticks[-1][0] if self._ticks else None
+            new = [(int(epoch), float(quote)) for epoch, quote in zip(history.get('times') or [], history.get('prices') or [])
+                   if last is None or int(epoch) > last]
+            self._ticks.extend(new)
+            if self.recorder is not None and new:
+                self.recorder.add_ticks(self.symbol, *zip(*new))
+            epochs, quotes = self._tick_arrays()
+            for builder in list(self.builders.values()):
+                # Os ticks substituem as velas já carregadas que cobrem por completo (volume incluído);
+                # as mais antigas ficam como vieram da Deriv
+                builder.load_history(None, epochs, quotes)
+            self.history_loaded.set()
+            self.logger.info("Histórico de ticks carregado: %d ticks.", len(self._ticks))
+
+        elif msg_type == 'candles':
+            granularity = int((data.get('echo_req') or {}).get('granularity') or 0)
+            if (builder := self.builders.get(granularity)) is not None:
+                builder.load_history(data.get('candles') or [], *self._tick_arrays())
+                self.logger.info("Histórico de velas carregado: %d velas.", len(builder), extra={'granularity': granularity})
+
+    async def _run(self):
+        delay = 1
+        while len(self):
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self.logger.info("Conectado. A subscrever aos ticks...")
+                    for granularity in list(self.builders):
+                        await self._request_candles(ws, granularity)
+                    await ws.send(json.dumps({
+                        "ticks_history": self.symbol,
+                        "style": "ticks",
+                        "end": "latest",
+                        "count": self.tick_history,
+                        "subscribe": 1,
+                    }))
+                    self._ws = ws
+                    delay = 1
+                    async for message in ws:
+                        self.process_message(json.loads(message))
+                        if not len(self):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except websockets.exceptions.ConnectionClosed:
+                self.logger.warning("Conexão WebSocket foi fechada.")
+            except Exception as e:
+                self.logger.exception("Erro no feed: %s", e)
+            finally:
+                self._ws = None
+
+            if len(self):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+class MarketDataHub:
+    """
+    Registo de feeds de mercado do processo: uma subscrição por (símbolo, granularidade),
+    independentemente do número de sessões. As ligações autenticadas de cada utilizador
+    ficam apenas com o tráfego de trading (proposal/buy/transaction).
+
+    Com shared=True as velas de cada feed ficam em memória partilhada, para os processos de estratégias.
+    Com mode=MODE_TICKS há um único TickFeed por símbolo e cada granularidade pedida pelas sessões
+    (mais as `tick_granularities`, sempre agregadas) é construída localmente a partir dos ticks.
+    Em modo "candles", as granularidades que a Deriv não serve (ex: 15s) também usam o TickFeed.
+    Com um `recorder` (MarketRecorder), todos os feeds gravam os dados recebidos em disco.
+    """
+    def __init__(self, url: str, shared: bool = False, mode: str = MODE_CANDLES,
+                 tick_granularities: tuple[int, ...] = (), recorder: MarketRecorder | None = None):
+        self.url = url
+        self.shared = shared
+        self.recorder = recorder
+        self.mode = mode if mode == MODE_TICKS else MODE_CANDLES
+        self.tick_granularities = tuple(tick_granularities)
+        self._feeds: dict[tuple, MarketFeed | TickFeed] = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def uses_ticks(self, granularity: int) -> bool:
+        return self.mode == MODE_TICKS or granularity not in DERIV_GRANULARITIES
+
+    def get_feed(self, symbol: str, granularity: int) -> MarketFeed | TickFeed | None:
+        if self.uses_ticks(granularity):
+            return self._feeds.get((symbol, MODE_TICKS))
+        return self._feeds.get((symbol, granularity))
+
+    async def subscribe(self, symbol: str, granularity: int, callback) -> MarketFeed | TimeframeSubscription:
+        """
+        Subscreve `callback(event, builder)` às velas de (symbol, granularity),
+        criando o feed se for a primeira sessão.
+
+        :return: O MarketFeed (ou, em modo ticks, um TimeframeSubscription); `.builder` é o
+                 CandleBuilder partilhado (apenas leitura).
+        """
+        async with self._lock:
+            if self.uses_ticks(granularity):
+                feed = self._feeds.get((symbol, MODE_TICKS))
+                if feed is None:
+                    feed = TickFeed(symbol, self.url, shared=self.shared, recorder=self.recorder)
+                    self._feeds[(symbol, MODE_TICKS)] = feed
+                    for extra in self.tick_granularities:
+                        feed.add_granularity(extra, pinned=True)
+                return feed.add_subscriber(granularity, callback)
+
+            feed = self._feeds.get((symbol, granularity))
+            if feed is None:
+                feed = MarketFeed(symbol, granularity, self.url, shared=self.shared, recorder=self.recorder)
+                self._feeds[(symbol, granularity)] = feed
+            feed.add_subscriber(callback)
+            return feed
+
+    async def unsubscribe(self, feed: MarketFeed | TimeframeSubscription, callback):
+        """Remove a subscrição; o feed é fechado quando deixa de ter sessões."""
+        async with self._lock:
+            if isinstance(feed, TimeframeSubscription):
+                feed.feed.remove_subscriber(feed.granularity, callback)
+                feed = feed.feed
+            else:
+                feed.remove_subscriber(callback)
+            if len(feed) == 0 and self._feeds.get(feed.key) is feed:
+                del self._feeds[feed.key]
+                await feed.close()
+
+    async def close(self):
+        async with self._lock:
+            for feed in self._feeds.values():
+                await feed.close()
+            self._feeds.clear()
@@ -0,0 +1,334 @@
+# utils/market_recorder.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.candle_builder import BAR_CLOSED, VALUE_COLUMNS, aggregate_ticks
+
+logger = logging.getLogger(__name__)
+
+# Gravação dos dados de mercado recebidos da Deriv (ticks e velas fechadas) em ficheiros colunares.
+#
+# Formato: um diretório por fluxo, <root>/<símbolo>/<fluxo>, com fluxo "ticks" ou "candles_<granularidade>".
+# Cada pedaço (chunk) é um .npz comprimido com uma coluna por array (epoch int64 e os valores float64),
+# escrito de uma só vez e nunca alterado (só se acrescentam pedaços). O nome do ficheiro,
+# "<primeiro epoch>-<último epoch>-<sequência>-<id>.npz", permite escolher os pedaços de um intervalo
+# sem os abrir; a sequência (ns, crescente) dá a ordem de escrita, que decide entre linhas repetidas.
+
+TICKS = "ticks"
+TICK_COLUMNS = ('quote',)
+
+# Um fluxo é escrito quando acumula CHUNK_ROWS linhas ou quando a linha mais antiga tem MAX_AGE segundos
+CHUNK_ROWS = 10000
+MAX_AGE = 300.0
+# Intervalo entre verificações da idade dos fluxos
+CHECK_INTERVAL = 5.0
+
+
+def candle_stream(granularity: int) -> str:
+    return f"candles_{int(granularity)}"
+
+
+def _columns(stream: str) -> tuple[str, ...]:
+    return TICK_COLUMNS if stream == TICKS else VALUE_COLUMNS
+
+
+def _empty(stream: str) -> dict[str, np.ndarray]:
+    arrays = {'epoch': np.zeros(0, dtype=np.int64)}
+    for col in _columns(stream):
+        arrays[col] = np.zeros(0, dtype=np.float64)
+    return arrays
+
+
+_seq_lock = threading.Lock()
+_last_seq = 0
+
+
+def _next_seq() -> int:
+    """Sequência de escrita: o relógio em ns, estritamente crescente dentro do processo."""
+    global _last_seq
+    with _seq_lock:
+        _last_seq = max(time.time_ns(), _last_seq + 1)
+        return _last_seq
+
+
+def _chunk_info(name: str) -> tuple[int, int, int] | None:
+    """(primeiro epoch, último epoch, sequência de escrita) de um pedaço, a partir do nome."""
+    parts = name[:-len('.npz')].split('-')
+    try:
+        first, last = int(parts[0]), int(parts[1])
+    except (IndexError, ValueError):
+        return None
+    try:
+        seq = int(parts[2])
+    except (IndexError, ValueError):
+        seq = 0  # Pedaço sem sequência: conta como o mais antigo
+    return first, last, seq
+
+
+def write_chunk(directory: str, arrays: dict[str, np.ndarray]) -> str:
+    """
+    Escreve um pedaço (comprimido) em `directory`. O ficheiro só aparece com o nome final
+    depois de escrito por completo, por isso os leitores nunca veem um pedaço incompleto.
+    """
+    os.makedirs(directory, exist_ok=True)
+    epochs = arrays['epoch']
+    name = f"{int(epochs[0]):010d}-{int(epochs[-1]):010d}-{_next_seq():019d}-{uuid.uuid4().hex[:8]}.npz"
+    path = os.path.join(directory, name)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def read_directory(directory: str, start: int | None = None, end: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Lê um fluxo gravado: arrays NumPy por coluna, ordenados por epoch e sem repetidos
+    (para o mesmo epoch fica a linha gravada por último, ex: uma vela corrigida ou o
+    histórico gravado de novo depois de um reinício).
+
+    :param start: Primeiro epoch incluído (opcional).
+    :param end: Último epoch incluído (opcional).
+    """
+    stream = os.path.basename(os.path.normpath(directory))
+    selected = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        info = _chunk_info(name) if name.endswith('.npz') else None
+        if info is None or (start is not None and info[1] < start) or (end is not None and info[0] > end):
+            continue
+        selected.append((info[2], name))
+    chunks = []
+    # Por ordem de escrita: no dedup abaixo, a linha de um pedaço mais recente vence
+    for _, name in sorted(selected):
+        with np.load(os.path.join(directory, name)) as data:
+            chunks.append({key: data[key] for key in data.files})
+    if not chunks:
+        return _empty(stream)
+
+    arrays = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+    epochs = arrays['epoch']
+    # Ordena de forma estável e fica com a última ocorrência de cada epoch
+    order = np.argsort(epochs, kind='stable')
+    epochs = epochs[order]
+    mask = np.r_[epochs[1:] != epochs[:-1], True]
+    if start is not None:
+        mask = mask & (epochs >= start)
+    if end is not None:
+        mask = mask & (epochs <= end)
+    return {key: arr[order][mask] for key, arr in arrays.items()}
+
+
+def list_streams(root: str) -> list[tuple[str, str]]:
+    """Fluxos gravados em `root`, como pares (símbolo, fluxo)."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        (symbol, stream)
+        for symbol in os.listdir(root) if os.path.isdir(os.path.join(root, symbol))
+        for stream in os.listdir(os.path.join(root, symbol)) if os.path.isdir(os.path.join(root, symbol, stream))
+    )
+
+
+def read_ticks(root: str, symbol: str, start: int | None = None, end: int | None = None) -> dict[str, np.ndarray]:
+    """Ticks gravados de `symbol`: {'epoch', 'quote'}."""
+    return read_directory(os.path.join(root, symbol, TICKS), start, end)
+
+
+def read_candles(root: str, symbol: str, granularity: int, start: int | None = None,
+                 end: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Velas gravadas de (symbol, granularity): {'epoch', 'open', 'high', 'low', 'close', 'volume'}.
+    Se essa granularidade não foi gravada, as velas são agregadas a partir dos ticks gravados.
+    """
+    directory = os.path.join(root, symbol, candle_stream(granularity))
+    if os.path.isdir(directory):
+        return read_directory(directory, start, end)
+    return ticks_to_candles(read_ticks(root, symbol, start, end), granularity)
+
+
+def ticks_to_candles(ticks: dict[str, np.ndarray], granularity: int) -> dict[str, np.ndarray]:
+    epochs, values = aggregate_ticks(ticks['epoch'], ticks['quote'], granularity)
+    return {'epoch': epochs, **{col: values[i] for i, col in enumerate(VALUE_COLUMNS)}}
+
+
+def compact_directory(directory: str) -> int:
+    """
+    Junta todos os pedaços de um fluxo num só (ordenado e sem repetidos) e apaga os antigos.
+    Não deve correr enquanto o fluxo está a ser gravado. :return: Número de pedaços substituídos.
+    """
+    names = [name for name in os.listdir(directory) if name.endswith('.npz')]
+    if len(names) < 2:
+        return 0
+    arrays = read_directory(directory)
+    write_chunk(directory, arrays)
+    for name in names:
+        os.remove(os.path.join(directory, name))
+    return len(names)
+
+
+class _Stream:
+    """Linhas de um fluxo à espera de serem escritas."""
+    def __init__(self, directory: str, columns: tuple[str, ...]):
+        self.directory = directory
+        self.columns = columns
+        self.parts: list[dict[str, np.ndarray]] = []  # Blocos de velas (arrays)
+        self.epochs: list[int] = []                   # Ticks (listas, para um append barato por tick)
+        self.values: list[float] = []
+        self.rows = 0
+        self.since: float | None = None  # Momento (monotónico) da linha pendente mais antiga
+
+    def take(self) -> dict[str, np.ndarray] | None:
+        if not self.rows:
+            return None
+        parts = self.parts
+        if self.epochs:
+            parts = parts + [{'epoch': np.array(self.epochs, dtype=np.int64),
+                              self.columns[0]: np.array(self.values, dtype=np.float64)}]
+        arrays = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        self.parts, self.epochs, self.values, self.rows, self.since = [], [], [], 0, None
+        return arrays
+
+
+class MarketRecorder:
+    """
+    Grava os ticks e as velas fechadas de cada (símbolo, granularidade) em pedaços colunares comprimidos.
+
+    Os feeds (utils/market_data.py) só juntam as linhas em memória, no loop; a compressão e a
+    escrita correm numa thread própria, em lotes de `chunk_rows` linhas (ou quando a linha mais
+    antiga de um fluxo tem `max_age` segundos). As velas são gravadas quando fecham (a versão
+    final de cada uma) e o histórico recebido à ligação é gravado uma vez; quando o histórico
+    fechado do builder é reescrito (reconexão, vela corrigida), a janela é gravada de novo e,
+    na leitura, a versão mais recente de cada vela substitui a anterior.
+    A leitura é feita com read_ticks/read_candles/read_directory (e por backtest.engine.load_candles).
+    """
+    def __init__(self, root: str, chunk_rows: int = CHUNK_ROWS, max_age: float = MAX_AGE,
+                 check_interval: float = CHECK_INTERVAL):
+        self.root = root
+        self.chunk_rows = max(1, chunk_rows)
+        self.max_age = max_age
+        self.check_interval = min(check_interval, max_age)
+        self._streams: dict[tuple[str, str], _Stream] = {}
+        self._last_epoch: dict[tuple[str, str], int] = {}  # Última vela fechada já gravada, por fluxo
+        self._history: dict[tuple[str, str], int] = {}     # history_version do builder nessa gravação
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="market-recorder")
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._lock: asyncio.Lock | None = None
+        self.stats = {'rows': 0, 'written': 0, 'chunks': 0, 'failed': 0}
+
+    def _stream(self, symbol: str, name: str) -> _Stream:
+        stream = self._streams.get((symbol, name))
+        if stream is None:
+            stream = self._streams[(symbol, name)] = _Stream(os.path.join(self.root, symbol, name), _columns(name))
+        return stream
+
+    def _added(self, stream: _Stream, rows: int):
+        if stream.since is None:
+            stream.since = time.monotonic()
+        stream.rows += rows
+        self.stats['rows'] += rows
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if stream.rows >= self.chunk_rows:
+            self._wake.set()
+
+    def add_tick(self, symbol: str, epoch: int, quote: float):
+        """Junta um tick ao fluxo "ticks" de `symbol`."""
+        stream = self._stream(symbol, TICKS)
+        stream.epochs.append(epoch)
+        stream.values.append(quote)
+        self._added(stream, 1)
+
+    def add_ticks(self, symbol: str, epochs, quotes):
+        """Junta vários ticks (ex: o histórico recebido à ligação)."""
+        if len(epochs):
+            stream = self._stream(symbol, TICKS)
+            stream.epochs.extend(int(epoch) for epoch in epochs)
+            stream.values.extend(float(quote) for quote in quotes)
+            self._added(stream, len(epochs))
+
+    def candle_listener(self, symbol: str):
+        """
+        Listener de CandleBuilder (`callback(event, builder)`) que grava as velas fechadas
+        ainda não gravadas do builder, a cada BAR_CLOSED. Se o histórico fechado foi reescrito
+        desde a última gravação (history_version mudou), grava de novo a janela inteira.
+        """
+        def on_candles(event: str, builder):
+            if event != BAR_CLOSED:
+                return
+            key = (symbol, candle_stream(builder.granularity))
+            arrays = builder.get_arrays(closed_only=True)
+            epochs = arrays['epoch']
+            last = self._last_epoch.get(key)
+            rewritten = self._history.get(key) != builder.history_version
+            first = 0 if rewritten or last is None else int(np.searchsorted(epochs, last, side='right'))
+            self._history[key] = builder.history_version
+            if first >= len(epochs):
+                return
+            stream = self._stream(*key)
+            stream.parts.append({col: arr[first:].copy() for col, arr in arrays.items()})
+            self._last_epoch[key] = int(epochs[-1])
+            self._added(stream, len(epochs) - first)
+        return on_candles
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush(force=False)
+
+    async def flush(self, force: bool = True) -> int:
+        """
+        Escreve os fluxos pendentes, cada um num pedaço novo, fora do loop.
+
+        :param force: Se False, só os fluxos com `chunk_rows` linhas ou com mais de `max_age` segundos.
+        :return: Número de linhas escritas.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            batches = []
+            for stream in self._streams.values():
+                if stream.rows and (force or stream.rows >= self.chunk_rows or now - stream.since >= self.max_age):
+                    batches.append((stream.directory, stream.take()))
+            if not batches:
+                return 0
+            loop = asyncio.get_running_loop()
+            written = 0
+            for directory, arrays in batches:
+                try:
+                    await loop.run_in_executor(self._executor, write_chunk, directory, arrays)
+                except Exception as e:
+                    # Os dados de mercado não voltam a ser pedidos: o pedaço perdido fica só no log
+                    self.stats['failed'] += 1
+                    logger.error("Falha ao gravar %d linhas em %s: %s", len(arrays['epoch']), directory, e)
+                    continue
+                written += len(arrays['epoch'])
+                self.stats['chunks'] += 1
+            self.stats['written'] += written
+            return written
+
+    async def close(self):
+        """Para a tarefa de fundo, grava tudo o que falta e termina a thread de escrita."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+        self._executor.shutdown(wait=True)
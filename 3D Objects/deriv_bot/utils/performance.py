@@ -0,0 +1,228 @@
+# utils/performance.py
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+
+from models.performance import PerformanceStats
+from models.trade import Trade
+
+logger = logging.getLogger(__name__)
+
+# Períodos dos agregados (segundos por balde; "all" é um único balde)
+PERIODS = {'all': 0, 'day': 86400, 'hour': 3600}
+ALL_STRATEGIES = "*"
+
+# Os agregados alterados são gravados (upsert em lote) a cada FLUSH_INTERVAL segundos
+FLUSH_INTERVAL = 5.0
+# Janelas máximas devolvidas por summary()
+MAX_DAYS = 366
+MAX_HOURS = 24 * 31
+
+
+@dataclass
+class Aggregate:
+    """Estatísticas de uma sequência de trades, atualizadas em O(1) por trade."""
+    trades: int = 0
+    wins: int = 0
+    losses: int = 0
+    profit: float = 0.0
+    peak: float = 0.0
+    max_drawdown: float = 0.0
+    streak: int = 0
+    max_win_streak: int = 0
+    max_loss_streak: int = 0
+
+    def add(self, profit: float):
+        """Junta o resultado de um trade (lucro >= 0 conta como vitória, como em process_sold_contract)."""
+        self.trades += 1
+        self.profit += profit
+        self.peak = max(self.peak, self.profit)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.profit)
+        if profit >= 0:
+            self.wins += 1
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.max_win_streak = max(self.max_win_streak, self.streak)
+        else:
+            self.losses += 1
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.max_loss_streak = max(self.max_loss_streak, -self.streak)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data['win_rate'] = self.wins / self.trades if self.trades else 0.0
+        data['profit'] = round(self.profit, 2)
+        data['peak'] = round(self.peak, 2)
+        data['max_drawdown'] = round(self.max_drawdown, 2)
+        return data
+
+
+_FIELDS = tuple(field.name for field in fields(Aggregate))
+
+
+def bucket_start(period: str, epoch: int) -> int:
+    size = PERIODS[period]
+    return epoch - epoch % size if size else 0
+
+
+class PerformanceStore:
+    """
+    Agregados de desempenho por utilizador e por estratégia, totais e por dia/hora.
+
+    Os agregados de um utilizador são carregados da tabela performance_stats uma vez (load) e
+    depois mantidos em memória: record() atualiza-os em O(estratégias) por contrato fechado e marca-os
+    para gravação; uma tarefa de fundo faz o upsert em lote dos alterados. summary() responde só a
+    partir da memória, em tempo independente do número de trades do utilizador.
+    Na primeira carga de um utilizador sem agregados gravados, estes são reconstruídos uma vez a
+    partir da tabela de trades (ex: trades anteriores a esta funcionalidade).
+    """
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._users: dict[int, dict[tuple[str, str, int], Aggregate]] = {}
+        self._strategies: dict[int, set[str]] = {}  # Estratégias com agregados, por utilizador
+        self._loading: dict[int, asyncio.Task] = {}
+        self._queued: dict[int, list[tuple]] = {}  # Trades fechados enquanto o utilizador carregava
+        self._dirty: set[tuple[int, str, str, int]] = set()
+        self._task: asyncio.Task | None = None
+        self._lock: asyncio.Lock | None = None
+
+    def is_loaded(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    async def load(self, user_id: int):
+        """Carrega (uma vez) os agregados do utilizador; pedidos simultâneos partilham a mesma carga."""
+        if user_id not in self._users:
+            await asyncio.shield(self._start_load(user_id))
+
+    def _start_load(self, user_id: int) -> asyncio.Task:
+        task = self._loading.get(user_id)
+        if task is None:
+            task = self._loading[user_id] = asyncio.create_task(self._load(user_id))
+            task.add_done_callback(lambda done: self._loaded(user_id, done))
+        return task
+
+    def _loaded(self, user_id: int, task: asyncio.Task):
+        del self._loading[user_id]
+        if not task.cancelled() and task.exception() is not None:
+            # Os trades em espera ficam na fila; a próxima chamada a load()/record() volta a tentar
+            logger.error("Falha ao carregar os agregados de desempenho: %s", task.exception(), extra={'user_id': user_id})
+
+    async def _load(self, user_id: int):
+        aggregates = {}
+        rows = await PerformanceStats.filter(user_id=user_id).values('strategy', 'period', 'bucket', *_FIELDS)
+        for row in rows:
+            key = (row.pop('strategy'), row.pop('period'), row.pop('bucket'))
+            aggregates[key] = Aggregate(**row)
+        self._strategies[user_id] = {strategy for strategy, period, _ in aggregates if period == 'all'}
+        self._strategies[user_id].discard(ALL_STRATEGIES)
+        self._users[user_id] = aggregates
+        if not rows:
+            await self._rebuild(user_id)
+        for args in self._queued.pop(user_id, ()):
+            self._apply(user_id, *args)
+        self._schedule()
+
+    async def _rebuild(self, user_id: int):
+        """Reconstrói os agregados a partir dos trades já gravados (só na primeira carga)."""
+        trades = await (Trade.filter(user_id=user_id, profit__isnull=False)
+                        .order_by('closed_at', 'id').values_list('profit', 'strategies', 'closed_at', 'bought_at'))
+        for profit, strategies, closed_at, bought_at in trades:
+            self._apply(user_id, profit, tuple(strategies or ()), closed_at or bought_at)
+        if trades:
+            logger.info("Agregados reconstruídos a partir de %d trades.", len(trades), extra={'user_id': user_id})
+
+    def record(self, user_id: int, profit: float, strategies=(), closed_at: datetime | None = None):
+        """
+        Junta um contrato fechado aos agregados do utilizador (total e por estratégia, em cada período).
+        Não espera pela base de dados; se o utilizador ainda não foi carregado, o trade é aplicado
+        quando a carga terminar.
+        """
+        args = (float(profit), tuple(strategies), closed_at or datetime.now(timezone.utc))
+        if user_id not in self._users:
+            self._queued.setdefault(user_id, []).append(args)
+            self._start_load(user_id)
+            return
+        self._apply(user_id, *args)
+        self._schedule()
+
+    def _apply(self, user_id: int, profit: float, strategies: tuple, closed_at: datetime):
+        aggregates = self._users[user_id]
+        self._strategies[user_id].update(strategies)
+        epoch = int(closed_at.timestamp())
+        for strategy in (ALL_STRATEGIES, *strategies):
+            for period in PERIODS:
+                key = (strategy, period, bucket_start(period, epoch))
+                aggregate = aggregates.get(key)
+                if aggregate is None:
+                    aggregate = aggregates[key] = Aggregate()
+                aggregate.add(profit)
+                self._dirty.add((user_id, *key))
+
+    def summary(self, user_id: int, days: int = 30, hours: int = 48, now: datetime | None = None) -> dict:
+        """
+        Totais do utilizador e de cada estratégia, e os baldes diários/horários das últimas
+        `days`/`hours` (com zeros nos baldes sem trades). Só lê a memória: chamar load() antes.
+        """
+        aggregates = self._users.get(user_id, {})
+        epoch = int((now or datetime.now(timezone.utc)).timestamp())
+
+        def series(period: str, count: int) -> list[dict]:
+            size, last = PERIODS[period], bucket_start(period, epoch)
+            out = []
+            for start in range(last - (count - 1) * size, last + 1, size):
+                aggregate = aggregates.get((ALL_STRATEGIES, period, start)) or Aggregate()
+                out.append({'start': datetime.fromtimestamp(start, timezone.utc).isoformat(), **aggregate.as_dict()})
+            return out
+
+        return {
+            'total': (aggregates.get((ALL_STRATEGIES, 'all', 0)) or Aggregate()).as_dict(),
+            'strategies': {
+                strategy: aggregates[(strategy, 'all', 0)].as_dict()
+                for strategy in sorted(self._strategies.get(user_id, ()))
+            },
+            'daily': series('day', max(1, min(days, MAX_DAYS))),
+            'hourly': series('hour', max(1, min(hours, MAX_HOURS))),
+        }
+
+    def _schedule(self):
+        if self._dirty and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Grava já os agregados alterados (upsert em lote). :return: Número de linhas gravadas."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                return 0
+            rows = [
+                PerformanceStats(user_id=user_id, strategy=strategy, period=period, bucket=bucket,
+                                 **asdict(self._users[user_id][(strategy, period, bucket)]))
+                for user_id, strategy, period, bucket in dirty
+            ]
+            try:
+                await PerformanceStats.bulk_create(rows, batch_size=500, on_conflict=['user_id', 'strategy', 'period', 'bucket'],
+                                                   update_fields=list(_FIELDS))
+            except Exception as e:
+                self._dirty |= dirty  # Volta a tentar no próximo ciclo
+                logger.error("Falha ao gravar %d agregados de desempenho: %s", len(rows), e)
+                self._schedule()
+                return 0
+            return len(rows)
+
+    async def close(self):
+        """Cancela a gravação agendada e grava o que falta (ex: no shutdown)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
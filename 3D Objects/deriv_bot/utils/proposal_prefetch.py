@@ -0,0 +1,105 @@
+# utils/proposal_prefetch.py
+
+import asyncio
+import logging
+import time
+
+from utils.deriv_client import DerivAPIError, DerivClient
+from utils.log_stream import level_no
+
+logger = logging.getLogger(__name__)
+
+# Idade máxima (segundos) de uma proposta para ser comprada diretamente
+PROPOSAL_MAX_AGE = 5.0
+# Espera máxima (segundos) entre tentativas de voltar a subscrever uma proposta
+RESUBSCRIBE_MAX_DELAY = 30
+
+
+class ProposalPrefetcher:
+    """
+    Mantém subscrições 'proposal' abertas para cada lado do contrato configurado
+    (ex: "buy" -> CALL e "sell" -> PUT) e guarda a proposta mais recente de cada um.
+    Quando surge um sinal, a sessão compra logo com o id guardado, poupando a ida e volta
+    da 'proposal' entre o sinal e o 'buy'.
+    """
+    def __init__(self, client: DerivClient, send_log=None):
+        self.client = client
+        self.send_log = send_log
+        self._payloads: dict[str, dict] = {}
+        self._latest: dict[str, tuple[float, dict]] = {}  # ação -> (hora de receção, proposta)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def _log(self, message: str, level: str = 'info'):
+        if self.send_log:
+            await self.send_log(message, level)
+        else:
+            logger.log(level_no(level), message)
+
+    async def sync(self, payloads: dict[str, dict]):
+        """
+        Alinha as subscrições com os pedidos atuais (ação -> payload 'proposal').
+        Lados cujo payload mudou (stake, duração, multiplicador...) são subscritos de novo.
+        """
+        for action in list(self._payloads):
+            if action not in payloads:
+                await self._stop(action)
+        for action, payload in payloads.items():
+            task = self._tasks.get(action)
+            if self._payloads.get(action) != payload or task is None or task.done():
+                await self._stop(action)
+                self._payloads[action] = payload
+                self._tasks[action] = asyncio.create_task(self._follow(action, payload))
+
+    def take(self, action: str, max_age: float = PROPOSAL_MAX_AGE) -> dict | None:
+        """
+        Retira a proposta mais recente de `action`, se for suficientemente recente.
+        Cada id só pode ser comprado uma vez, por isso a proposta deixa de estar disponível.
+        """
+        received_at, proposal = self._latest.pop(action, (None, None))
+        if proposal is None or time.monotonic() - received_at > max_age:
+            return None
+        return proposal
+
+    async def renew(self, action: str):
+        """Volta a subscrever `action` (depois de uma compra a proposta usada deixa de ser válida)."""
+        if (payload := self._payloads.get(action)) is not None:
+            await self._stop(action)
+            self._payloads[action] = payload
+            self._tasks[action] = asyncio.create_task(self._follow(action, payload))
+
+    async def close(self):
+        for action in list(self._tasks):
+            await self._stop(action)
+        self._payloads.clear()
+
+    async def _stop(self, action: str):
+        self._latest.pop(action, None)
+        self._payloads.pop(action, None)
+        if (task := self._tasks.pop(action, None)) and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _follow(self, action: str, payload: dict):
+        delay = 1
+        while self.client.connected:
+            stream = None
+            try:
+                stream = await self.client.subscribe(payload)
+                delay = 1
+                async for data in stream:
+                    if 'error' in data:
+                        await self._log(f"Fluxo de propostas '{action}' interrompido: {data['error'].get('message')}", 'warning')
+                        break
+                    if (proposal := data.get('proposal')) and proposal.get('id'):
+                        self._latest[action] = (time.monotonic(), proposal)
+            except (DerivAPIError, asyncio.TimeoutError) as e:
+                await self._log(f"Falha ao subscrever propostas '{action}': {e}", 'warning')
+            finally:
+                self._latest.pop(action, None)
+                if stream is not None:
+                    await stream.forget()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESUBSCRIBE_MAX_DELAY)
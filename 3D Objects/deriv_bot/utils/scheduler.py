@@ -0,0 +1,161 @@
+# utils/scheduler.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Prioridades dos pedidos de avaliação (menor = mais urgente)
+PRIORITY_HIGH = 0  # Sessão sem contrato aberto: pode negociar já
+PRIORITY_LOW = 1   # Sessão com contrato aberto: a avaliação pode esperar
+
+# Um pedido de baixa prioridade que espera mais do que isto passa à frente dos de alta (sem starvation)
+PROMOTE_AFTER = 1.0
+# Número de atrasos recentes guardados para as estatísticas
+DELAY_HISTORY = 1024
+
+
+@dataclass
+class _Request:
+    key: Any
+    run: Callable[[], Awaitable]
+    priority: int
+    enqueued: float
+
+
+class DecisionScheduler:
+    """
+    Agendador central das avaliações de todas as sessões.
+
+    As sessões não correm as avaliações por conta própria: pedem "a sessão X
+    precisa de ser avaliada" e o agendador decide quando. Assim, no fecho de uma vela,
+    centenas de sessões não disputam o CPU no mesmo milissegundo:
+      - pedidos repetidos da mesma sessão são fundidos (no máximo um à espera por sessão;
+        um pedido que chega durante a execução fica para depois, no fim da fila);
+      - no máximo `max_concurrent` avaliações correm ao mesmo tempo (só a avaliação: a compra
+        que dela resulte corre fora do agendador, para não ocupar a vaga à espera da Deriv);
+      - a fila é round-robin por sessão, com prioridade para as sessões sem contrato aberto;
+      - o atraso na fila (pedido -> início) de cada avaliação é medido (ver delay_stats()).
+    """
+    def __init__(self, max_concurrent: int = 8, promote_after: float = PROMOTE_AFTER):
+        self.max_concurrent = max(1, max_concurrent)
+        self.promote_after = promote_after
+        self._queues: tuple[deque, deque] = (deque(), deque())  # Uma fila por prioridade
+        self._queued: dict[Any, _Request] = {}                  # Pedido atual de cada sessão na fila
+        self._running: dict[Any, asyncio.Task] = {}
+        self._rerun: dict[Any, _Request] = {}                   # Pedidos recebidos durante a execução
+        self._delays: deque[float] = deque(maxlen=DELAY_HISTORY)
+        self.stats = {'requested': 0, 'coalesced': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+
+    @property
+    def queued(self) -> int:
+        """Número de sessões à espera de avaliação."""
+        return len(self._queued) + len(self._rerun)
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def request(self, key, run: Callable[[], Awaitable], priority: int = PRIORITY_HIGH) -> bool:
+        """
+        Pede uma avaliação da sessão `key`; `run` é a corrotina a executar (ex: session.decision_cycle).
+        Não espera pela execução.
+
+        :return: False se o pedido foi fundido com um que já estava à espera.
+        """
+        self.stats['requested'] += 1
+        pending = self._queued.get(key) or self._rerun.get(key)
+        if pending is not None:
+            self.stats['coalesced'] += 1
+            pending.run = run
+            if priority < pending.priority:
+                # Sobe de prioridade sem perder o lugar (nem o tempo de espera já acumulado)
+                pending = _Request(key, run, priority, pending.enqueued)
+                if key in self._rerun:
+                    self._rerun[key] = pending
+                else:
+                    self._enqueue(pending)
+            return False
+
+        req = _Request(key, run, priority, time.monotonic())
+        if key in self._running:
+            self._rerun[key] = req  # A sessão nunca é avaliada em paralelo consigo própria
+        else:
+            self._enqueue(req)
+            self._pump()
+        return True
+
+    def _enqueue(self, req: _Request):
+        # Entradas substituídas ficam nas filas e são ignoradas quando saem (_queued aponta para a atual)
+        self._queued[req.key] = req
+        self._queues[min(req.priority, PRIORITY_LOW)].append(req)
+
+    def _next(self) -> _Request | None:
+        high, low = self._queues
+        now = time.monotonic()
+        while high or low:
+            promote = low and now - low[0].enqueued >= self.promote_after
+            req = low.popleft() if promote or not high else high.popleft()
+            if self._queued.get(req.key) is req:
+                del self._queued[req.key]
+                return req
+        return None
+
+    def _pump(self):
+        while len(self._running) < self.max_concurrent:
+            req = self._next()
+            if req is None:
+                return
+            self._delays.append(time.monotonic() - req.enqueued)
+            self._running[req.key] = asyncio.create_task(self._execute(req))
+
+    async def _execute(self, req: _Request):
+        try:
+            await req.run()
+            self.stats['completed'] += 1
+        except asyncio.CancelledError:
+            self.stats['cancelled'] += 1
+        except Exception:
+            self.stats['failed'] += 1
+            logger.exception("Avaliação agendada falhou (%s).", req.key)
+        finally:
+            if self._running.get(req.key) is asyncio.current_task():
+                del self._running[req.key]
+            rerun = self._rerun.pop(req.key, None)
+            if rerun is not None:
+                self._enqueue(rerun)  # Vai para o fim da fila: as outras sessões passam à frente
+            self._pump()
+
+    def discard(self, key):
+        """
+        Esquece os pedidos da sessão `key` e cancela a avaliação em curso (ex: bot parado).
+        Uma compra já lançada pela sessão não é cancelada: não corre no agendador.
+        """
+        self._queued.pop(key, None)
+        self._rerun.pop(key, None)
+        task = self._running.get(key)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def delay_stats(self) -> dict:
+        """Atraso na fila das avaliações recentes (em milissegundos) e ocupação atual."""
+        delays = sorted(self._delays)
+        n = len(delays)
+
+        def percentile(q: float) -> float:
+            return round(delays[min(int(q * n), n - 1)] * 1000, 2) if n else 0.0
+
+        return {
+            'samples': n,
+            'mean_ms': round(sum(delays) / n * 1000, 2) if n else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': percentile(1.0),
+            'queued': self.queued,
+            'running': self.running,
+            **self.stats,
+        }
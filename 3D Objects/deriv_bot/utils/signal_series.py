@@ -0,0 +1,93 @@
+# utils/signal_series.py
+
+import numpy as np
+
+# Séries de sinais vetorizadas, usadas pelas funções signals() das estratégias e pelo backtest.
+# Convenção: um array int8 com o mesmo comprimento das velas, em que a posição i contém
+# o sinal que analyze() daria se a vela i fosse a última (+1 = UP/buy, -1 = DOWN/sell, 0 = nenhum).
+
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_NONE = 0
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Desloca a série `periods` velas para a frente (o valor da vela anterior), com NaN no início."""
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def to_signals(up: np.ndarray, down: np.ndarray, warmup: int) -> np.ndarray:
+    """
+    Junta as condições de compra e venda numa série de sinais.
+    Tal como em analyze(), UP tem prioridade quando ambas as condições se verificam,
+    e as primeiras `warmup - 1` velas (dados insuficientes) não geram sinal.
+    """
+    signals = np.where(up, SIGNAL_BUY, np.where(down, SIGNAL_SELL, SIGNAL_NONE)).astype(np.int8)
+    signals[:max(warmup - 1, 0)] = SIGNAL_NONE
+    return signals
+
+
+def no_signals(length: int) -> np.ndarray:
+    return np.zeros(length, dtype=np.int8)
+
+
+# Lógicas de combinação (logica_estrategia)
+LOGIC_OR = "OR"              # Maioria simples dos sinais
+LOGIC_AND = "AND"            # Unanimidade
+LOGIC_WEIGHTED = "WEIGHTED"  # Média pesada das pontuações, comparada com um limiar
+
+# Limiar padrão da lógica WEIGHTED (|pontuação média| a partir da qual se negoceia)
+DEFAULT_THRESHOLD = 0.5
+
+
+def threshold_decisions(total: np.ndarray, threshold: float) -> np.ndarray:
+    """Pontuação combinada -> decisão: compra a partir de +threshold, venda até -threshold (0 nunca decide)."""
+    total = np.asarray(total, dtype=np.float64)
+    buy = (total >= threshold) & (total > 0)
+    sell = (total <= -threshold) & (total < 0)
+    return np.where(buy, SIGNAL_BUY, np.where(sell, SIGNAL_SELL, SIGNAL_NONE)).astype(np.int8)
+
+
+def weighted_score(scores: np.ndarray, weights=None) -> np.ndarray:
+    """Média das pontuações (uma estratégia por linha) pesada por `weights`; 0 se o peso total for 0."""
+    scores = np.nan_to_num(np.asarray(scores, dtype=np.float64))
+    if scores.ndim == 1:
+        scores = scores[:, None]
+    w = np.ones(scores.shape[0]) if weights is None else np.asarray(weights, dtype=np.float64)
+    total = w.sum()
+    return w @ scores / total if total > 0 else np.zeros(scores.shape[1])
+
+
+def combine(scores: np.ndarray, logic: str = LOGIC_OR, weights=None,
+            threshold: float = DEFAULT_THRESHOLD) -> np.ndarray:
+    """
+    Combina as pontuações das estratégias numa série de decisões, com uma única redução vetorizada.
+    Serve tanto o bot ao vivo (um vetor com a pontuação de cada estratégia na última vela)
+    como o backtest (uma matriz, uma estratégia por linha e uma vela por coluna).
+
+    As pontuações estão em [-1, 1]: +1/-1 são os sinais UP/DOWN clássicos, valores intermédios
+    indicam a força do sinal e 0 (ou NaN) é a ausência de sinal.
+
+    OR: vence o lado com mais sinais; empate (ou nenhum sinal) não gera decisão.
+    AND: todas as estratégias têm de dar sinal no mesmo sentido.
+    WEIGHTED: média pesada das pontuações; decide quando |média| >= threshold.
+
+    :param weights: Peso de cada estratégia (só na lógica WEIGHTED; por omissão, todas 1).
+    :return: Array int8 de +1/-1/0 com uma posição por vela (1 posição para um vetor).
+    """
+    matrix = np.nan_to_num(np.asarray(scores, dtype=np.float64))
+    if matrix.ndim == 1:
+        matrix = matrix[:, None]  # Vetor de pontuações de uma vela: uma coluna
+    if matrix.shape[0] == 0:
+        return no_signals(matrix.shape[1])
+    if logic == LOGIC_AND:
+        all_buy = (matrix > 0).all(axis=0)
+        all_sell = (matrix < 0).all(axis=0)
+        return np.where(all_buy, SIGNAL_BUY, np.where(all_sell, SIGNAL_SELL, SIGNAL_NONE)).astype(np.int8)
+    if logic == LOGIC_WEIGHTED:
+        return threshold_decisions(weighted_score(matrix, weights), threshold)
+    balance = (matrix > 0).sum(axis=0) - (matrix < 0).sum(axis=0)
+    return np.sign(balance).astype(np.int8)
@@ -0,0 +1,216 @@
+# utils/strategy_executor.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from typing import Any, Callable
+
+from estrategia.plan import outcome_decided, to_score
+from estrategia.registry import get_strategy
+from estrategia.spec import TRIGGER_CLOSE
+from utils.candle_builder import SharedCandleBuffer, SharedCandleReader
+from utils.indicator_cache import CandleSnapshot, shared_indicator_cache
+
+# Modos de execução das estratégias
+EXECUTOR_INLINE = "inline"    # No próprio event loop (comportamento antigo)
+EXECUTOR_THREAD = "thread"    # Num ThreadPoolExecutor (NumPy/pandas libertam o GIL na maior parte do cálculo)
+EXECUTOR_PROCESS = "process"  # Num ProcessPoolExecutor (isolamento total do event loop)
+
+
+class StaleWork(Exception):
+    """O trabalho foi substituído por um mais recente da mesma sessão antes de começar."""
+
+
+class ExecutorBusy(Exception):
+    """A fila do executor está cheia; o trabalho foi recusado."""
+
+
+# Leitores dos segmentos partilhados já abertos por este processo (nome -> leitor)
+MAX_OPEN_READERS = 32
+_readers: OrderedDict[str, SharedCandleReader] = OrderedDict()
+
+
+def _shared_arrays(buffer: SharedCandleBuffer, triggers) -> tuple[dict[str, dict], int]:
+    """
+    Lê uma vez o segmento partilhado e deriva as velas de cada gatilho da mesma leitura.
+    :return: (gatilho -> colunas, history_version do builder nessa leitura).
+    """
+    reader = _readers.get(buffer.name)
+    if reader is None:
+        reader = _readers[buffer.name] = SharedCandleReader(buffer)
+        while len(_readers) > MAX_OPEN_READERS:
+            _readers.popitem(last=False)[1].close()
+    _readers.move_to_end(buffer.name)
+
+    columns = reader.read()
+    return {
+        trigger: {col: arr[:-1] for col, arr in columns.items()} if trigger == TRIGGER_CLOSE else columns
+        for trigger in triggers
+    }, reader.history_version
+
+
+def run_steps(steps: tuple[tuple[str, tuple, str, float], ...], arrays: dict[str, dict] | SharedCandleBuffer,
+              symbol: str | None, granularity: int | None, rule: tuple[str, float] | None = None,
+              known: tuple[tuple[float, float], ...] = (),
+              version: int | None = None) -> dict[str, tuple[float, str | None, float]]:
+    """
+    Executa o analyze() das estratégias fora do event loop (numa thread ou noutro processo).
+
+    :param steps: (nome, parâmetros, gatilho, peso) de cada estratégia, como em PlanStep, pela ordem de avaliação.
+    :param arrays: Velas de cada gatilho (gatilho -> colunas), já copiadas do CandleBuilder, ou o
+                   SharedCandleBuffer do builder, lido aqui diretamente da memória partilhada.
+    :param rule: (lógica, limiar) do plano; se definida, para assim que as restantes estratégias
+                 já não podem mudar a decisão (ver outcome_decided).
+    :param known: (pontuação, peso) das estratégias do plano já conhecidas (memorizadas ou de streams).
+    :param version: history_version do builder de onde as velas foram copiadas (chave da cache de
+                    indicadores); com o SharedCandleBuffer é lida do próprio segmento.
+    :return: nome -> (pontuação em [-1, 1], mensagem de erro ou None, segundos gastos),
+             só para as estratégias avaliadas.
+    """
+    if isinstance(arrays, SharedCandleBuffer):
+        arrays, version = _shared_arrays(arrays, {step[2] for step in steps})
+    snapshots = {
+        trigger: CandleSnapshot(columns, symbol, granularity, shared_indicator_cache, version)
+        for trigger, columns in arrays.items()
+    }
+    results = {}
+    scores = [score for score, _ in known]
+    weights = [weight for _, weight in known]
+    for i, (name, params, trigger, weight) in enumerate(steps):
+        if rule and outcome_decided(rule[0], scores, [step[3] for step in steps[i:]], weights, rule[1]):
+            break
+        start = time.perf_counter()
+        try:
+            score = to_score(get_strategy(name).analyze(snapshots[trigger], **dict(params)))
+            results[name] = (score, None, time.perf_counter() - start)
+        except Exception as e:
+            results[name] = (0.0, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+        scores.append(results[name][0])
+        weights.append(weight)
+    return results
+
+
+@dataclass
+class _Job:
+    func: Callable
+    args: tuple
+    future: asyncio.Future
+    is_current: Callable[[], bool] | None = None
+
+
+@dataclass
+class _Lane:
+    """Fila de uma sessão: no máximo um trabalho em execução e um à espera (o mais recente)."""
+    pending: _Job | None = None
+    task: asyncio.Task | None = None
+
+
+class StrategyExecutor:
+    """
+    Executa a avaliação das estratégias num pool de threads ou de processos, com:
+      - ordem por sessão: os trabalhos de uma mesma chave nunca correm em paralelo;
+      - descarte de trabalho obsoleto: cada sessão tem no máximo um trabalho à espera;
+        um novo pedido substitui o que ainda não começou (o antigo termina com StaleWork);
+      - fila limitada: no máximo `max_queue` trabalhos à espera no total (ExecutorBusy);
+      - concorrência limitada a `max_workers`, para que os trabalhos esperem aqui (onde ainda
+        podem ser substituídos) e não na fila interna do pool.
+    """
+    def __init__(self, mode: str = EXECUTOR_THREAD, max_workers: int = 4, max_queue: int = 64):
+        if mode not in (EXECUTOR_INLINE, EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"Modo de execução desconhecido: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self._pool: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._lanes: dict[Any, _Lane] = {}
+        self.stats = {'completed': 0, 'superseded': 0, 'stale': 0, 'rejected': 0}
+
+    @property
+    def queued(self) -> int:
+        """Número de trabalhos à espera (em todas as sessões)."""
+        return sum(1 for lane in self._lanes.values() if lane.pending is not None)
+
+    def _get_pool(self) -> Executor | None:
+        if self._pool is None and self.mode != EXECUTOR_INLINE:
+            if self.mode == EXECUTOR_PROCESS:
+                # Os processos herdam o resource_tracker: a memória partilhada das velas só é
+                # libertada pelo processo principal (CandleBuilder.close), nunca pelos workers
+                resource_tracker.ensure_running()
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="estrategias")
+        return self._pool
+
+    async def submit(self, key, func: Callable, *args, is_current: Callable[[], bool] | None = None):
+        """
+        Agenda func(*args) na fila da sessão `key` e espera pelo resultado.
+        Em modo "process", func e os argumentos têm de ser serializáveis (ex: run_steps).
+
+        :param is_current: Verificado quando o trabalho vai começar; se devolver False
+                           o trabalho é descartado com StaleWork (os dados já mudaram).
+        :raises StaleWork: Se foi substituído por um pedido mais recente ou deixou de ser atual.
+        :raises ExecutorBusy: Se a fila global estiver cheia.
+        """
+        lane = self._lanes.setdefault(key, _Lane())
+        if lane.pending is None and self.queued >= self.max_queue:
+            self.stats['rejected'] += 1
+            raise ExecutorBusy(f"Fila de estratégias cheia ({self.max_queue} pedidos à espera)")
+
+        loop = asyncio.get_running_loop()
+        job = _Job(func, args, loop.create_future(), is_current)
+        if lane.pending is not None and not lane.pending.future.done():
+            lane.pending.future.set_exception(StaleWork("Substituído por um pedido mais recente"))
+            self.stats['superseded'] += 1
+        lane.pending = job
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._drain(key, lane))
+        return await job.future
+
+    async def _drain(self, key, lane: _Lane):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        try:
+            while lane.pending is not None:
+                async with self._slots:
+                    job, lane.pending = lane.pending, None
+                    if job.future.done():  # Quem pediu desistiu (ex: sessão parada)
+                        continue
+                    if job.is_current is not None and not job.is_current():
+                        job.future.set_exception(StaleWork("Os dados mudaram antes do início da avaliação"))
+                        self.stats['stale'] += 1
+                        continue
+                    try:
+                        pool = self._get_pool()
+                        if pool is None:
+                            result = job.func(*job.args)
+                        else:
+                            result = await asyncio.get_running_loop().run_in_executor(pool, job.func, *job.args)
+                    except Exception as e:
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                    else:
+                        if not job.future.done():
+                            job.future.set_result(result)
+                        self.stats['completed'] += 1
+        finally:
+            if lane.pending is None and self._lanes.get(key) is lane:
+                del self._lanes[key]
+
+    def discard(self, key):
+        """Cancela o trabalho à espera da sessão `key` (o que já está a correr termina normalmente)."""
+        lane = self._lanes.get(key)
+        if lane and lane.pending is not None:
+            if not lane.pending.future.done():
+                lane.pending.future.cancel()
+            lane.pending = None
+
+    def shutdown(self):
+        for key in list(self._lanes):
+            self.discard(key)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
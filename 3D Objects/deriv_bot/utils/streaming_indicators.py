@@ -0,0 +1,451 @@
+# utils/streaming_indicators.py
+
+from collections import deque
+
+import numpy as np
+
+# Os indicadores abaixo reproduzem as fórmulas da biblioteca `ta` (mesma semente,
+# mesmos períodos mínimos), mas mantêm estado e atualizam em O(1) por vela fechada.
+#
+# Convenções:
+#   - update(...) confirma uma vela fechada no estado e retorna o novo valor.
+#   - peek(...) calcula o valor que resultaria da vela ainda aberta, sem alterar o estado.
+#   - Ambos retornam None enquanto o indicador não tem dados suficientes.
+
+# A cada RESYNC_EVERY atualizações as somas móveis são recalculadas do zero,
+# para que o erro de arredondamento não se acumule em sessões longas.
+RESYNC_EVERY = 1000
+
+
+class EMA:
+    """Média Móvel Exponencial (span=period, adjust=False), semeada com o primeiro valor."""
+    def __init__(self, period: int, alpha: float | None = None, seed: float | None = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.count = 0 if seed is None else 1
+        self.mean = seed
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.period
+
+    def _next(self, x: float) -> float:
+        return x if self.mean is None else self.mean + self.alpha * (x - self.mean)
+
+    def update(self, x: float) -> float | None:
+        self.mean = self._next(x)
+        self.count += 1
+        return self.mean if self.ready else None
+
+    def peek(self, x: float) -> float | None:
+        return self._next(x) if self.count + 1 >= self.period else None
+
+    @property
+    def value(self) -> float | None:
+        return self.mean if self.ready else None
+
+
+class RollingSum:
+    """Soma móvel de uma janela fixa, com ressincronização periódica."""
+    def __init__(self, window: int):
+        self.window = window
+        self.items = deque()
+        self.total = 0.0
+        self._updates = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.items) >= self.window
+
+    def update(self, x: float) -> float:
+        self.items.append(x)
+        self.total += x
+        if len(self.items) > self.window:
+            self.total -= self.items.popleft()
+        self._updates += 1
+        if self._updates % RESYNC_EVERY == 0:
+            self.total = sum(self.items)
+        return self.total
+
+    def peek(self, x: float) -> float:
+        total = self.total + x
+        if len(self.items) + 1 > self.window:
+            total -= self.items[0]
+        return total
+
+
+class SMA:
+    """Média Móvel Simples (rolling mean com min_periods=window)."""
+    def __init__(self, period: int):
+        self.period = period
+        self.sum = RollingSum(period)
+
+    def update(self, x: float) -> float | None:
+        total = self.sum.update(x)
+        return total / self.period if self.sum.full else None
+
+    def peek(self, x: float) -> float | None:
+        if len(self.sum.items) + 1 < self.period:
+            return None
+        return self.sum.peek(x) / self.period
+
+
+class RollingExtrema:
+    """
+    Máximo (ou mínimo) móvel com deque monotónica: O(1) amortizado por atualização.
+    A deque guarda (índice, valor) com valores estritamente decrescentes (modo 'max').
+    """
+    def __init__(self, window: int, mode: str = 'max'):
+        if mode not in ('max', 'min'):
+            raise ValueError("mode deve ser 'max' ou 'min'")
+        self.window = window
+        self.sign = 1.0 if mode == 'max' else -1.0
+        self.items = deque()
+        self.index = -1
+
+    @property
+    def full(self) -> bool:
+        return self.index + 1 >= self.window
+
+    def update(self, x: float) -> float | None:
+        self.index += 1
+        key = self.sign * x
+        while self.items and self.items[-1][1] <= key:
+            self.items.pop()
+        self.items.append((self.index, key))
+        if self.items[0][0] <= self.index - self.window:
+            self.items.popleft()
+        return self.value
+
+    def peek(self, x: float) -> float | None:
+        if self.index + 2 < self.window:
+            return None
+        key = self.sign * x
+        oldest = self.index + 1 - self.window  # Índice que sairia da janela
+        for idx, val in self.items:  # No máximo dois elementos são visitados
+            if idx > oldest:
+                key = max(key, val)
+                break
+        return self.sign * key
+
+    @property
+    def value(self) -> float | None:
+        return self.sign * self.items[0][1] if self.full and self.items else None
+
+
+class RSI:
+    """RSI de Wilder (ewm com alpha=1/period), igual a ta.momentum.RSIIndicator."""
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.up = EMA(period, alpha=1.0 / period)
+        self.down = EMA(period, alpha=1.0 / period)
+
+    @staticmethod
+    def _rsi(up: float | None, down: float | None) -> float | None:
+        if up is None or down is None:
+            return None
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+    def _moves(self, close: float) -> tuple[float, float]:
+        # Na `ta`, a primeira diferença (NaN) é tratada como ganho e perda zero
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        return max(diff, 0.0), max(-diff, 0.0)
+
+    def update(self, close: float) -> float | None:
+        gain, loss = self._moves(close)
+        self.prev_close = close
+        return self._rsi(self.up.update(gain), self.down.update(loss))
+
+    def peek(self, close: float) -> float | None:
+        gain, loss = self._moves(close)
+        return self._rsi(self.up.peek(gain), self.down.peek(loss))
+
+
+class MACD:
+    """MACD (linha, sinal, histograma), igual a ta.trend.MACD. Retorna (macd, signal, diff)."""
+    def __init__(self, fast: int = 12, slow: int = 26, sign: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(sign)
+
+    @staticmethod
+    def _result(macd: float | None, signal: float | None):
+        if macd is None or signal is None:
+            return None
+        return macd, signal, macd - signal
+
+    def update(self, close: float):
+        fast, slow = self.fast.update(close), self.slow.update(close)
+        if fast is None or slow is None:
+            return None
+        macd = fast - slow
+        return self._result(macd, self.signal.update(macd))
+
+    def peek(self, close: float):
+        fast, slow = self.fast.peek(close), self.slow.peek(close)
+        if fast is None or slow is None:
+            return None
+        macd = fast - slow
+        return self._result(macd, self.signal.peek(macd))
+
+
+class Bollinger:
+    """Bandas de Bollinger (média e desvio padrão populacional). Retorna (mavg, hband, lband)."""
+    def __init__(self, period: int = 20, dev: float = 2.0):
+        self.period = period
+        self.dev = dev
+        self.sum = RollingSum(period)
+        self.sum_sq = RollingSum(period)
+
+    def _bands(self, total: float, total_sq: float):
+        mean = total / self.period
+        std = max(total_sq / self.period - mean * mean, 0.0) ** 0.5
+        return mean, mean + self.dev * std, mean - self.dev * std
+
+    def update(self, close: float):
+        total, total_sq = self.sum.update(close), self.sum_sq.update(close * close)
+        return self._bands(total, total_sq) if self.sum.full else None
+
+    def peek(self, close: float):
+        if len(self.sum.items) + 1 < self.period:
+            return None
+        return self._bands(self.sum.peek(close), self.sum_sq.peek(close * close))
+
+
+def true_range(high: float, low: float, prev_close: float | None) -> float:
+    """True Range; sem fecho anterior é apenas high - low (como na `ta`)."""
+    if prev_close is None:
+        return high - low
+    return max(high, prev_close) - min(low, prev_close)
+
+
+class ATR:
+    """Average True Range de Wilder, igual a ta.volatility.AverageTrueRange."""
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.prev_close = None
+        self.count = 0
+        self.seed_sum = 0.0
+        self.atr = None
+
+    def _next(self, high: float, low: float, close: float):
+        tr = true_range(high, low, self.prev_close)
+        count = self.count + 1
+        if count < self.window:
+            return count, self.seed_sum + tr, None
+        if count == self.window:
+            return count, self.seed_sum + tr, (self.seed_sum + tr) / self.window
+        return count, self.seed_sum, (self.atr * (self.window - 1) + tr) / self.window
+
+    def update(self, high: float, low: float, close: float) -> float | None:
+        self.count, self.seed_sum, self.atr = self._next(high, low, close)
+        self.prev_close = close
+        return self.atr
+
+    def peek(self, high: float, low: float, close: float) -> float | None:
+        return self._next(high, low, close)[2]
+
+
+class ADX:
+    """
+    ADX com +DI/-DI (suavização de Wilder), igual a ta.trend.ADXIndicator.
+    Retorna (adx, plus_di, minus_di); adx é None durante o aquecimento (2 * window - 1 velas).
+    """
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.prev = None  # (high, low, close) da vela anterior
+        self.count = 0
+        self.trs = self.dip = self.din = 0.0
+        self.dx_seed = 0.0
+        self.adx = None
+
+    def _moves(self, high: float, low: float, close: float) -> tuple[float, float, float]:
+        prev_high, prev_low, prev_close = self.prev
+        tr = true_range(high, low, prev_close)
+        diff_up, diff_down = high - prev_high, prev_low - low
+        pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+        neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+        return tr, pos, neg
+
+    def _next(self, high: float, low: float, close: float):
+        if self.prev is None:
+            return None
+        w = self.window
+        count = self.count + 1
+        tr, pos, neg = self._moves(high, low, close)
+        if count <= w:
+            # Somas iniciais das primeiras `window` variações
+            trs, dip, din = self.trs + tr, self.dip + pos, self.din + neg
+        else:
+            trs = self.trs - self.trs / w + tr
+            dip = self.dip - self.dip / w + pos
+            din = self.din - self.din / w + neg
+        state = [count, trs, dip, din, self.dx_seed, self.adx, None]
+        if count < w:
+            return state
+
+        plus_di = 100 * dip / trs if trs != 0 else 0.0
+        minus_di = 100 * din / trs if trs != 0 else 0.0
+        di_sum = plus_di + minus_di
+        dx = 100 * abs(plus_di - minus_di) / di_sum if di_sum != 0 else 0.0
+
+        if count < 2 * w:
+            state[4] = self.dx_seed + dx
+            if count == 2 * w - 1:
+                state[5] = state[4] / w
+        else:
+            state[5] = (self.adx * (w - 1) + dx) / w
+        state[6] = (state[5], plus_di, minus_di)
+        return state
+
+    def update(self, high: float, low: float, close: float):
+        state = self._next(high, low, close)
+        self.prev = (high, low, close)
+        if state is None:
+            return None
+        self.count, self.trs, self.dip, self.din, self.dx_seed, self.adx, result = state
+        return result
+
+    def peek(self, high: float, low: float, close: float):
+        state = self._next(high, low, close)
+        return state[6] if state else None
+
+
+class WilliamsR:
+    """Williams %R, igual a ta.momentum.WilliamsRIndicator (máximo/mínimo via deque monotónica)."""
+    def __init__(self, lbp: int = 14):
+        self.highest = RollingExtrema(lbp, 'max')
+        self.lowest = RollingExtrema(lbp, 'min')
+
+    @staticmethod
+    def _wr(hh: float | None, ll: float | None, close: float) -> float | None:
+        if hh is None or ll is None or hh == ll:
+            return None
+        return -100 * (hh - close) / (hh - ll)
+
+    def update(self, high: float, low: float, close: float) -> float | None:
+        return self._wr(self.highest.update(high), self.lowest.update(low), close)
+
+    def peek(self, high: float, low: float, close: float) -> float | None:
+        return self._wr(self.highest.peek(high), self.lowest.peek(low), close)
+
+
+class VWAP:
+    """VWAP móvel (soma de preço típico * volume / soma do volume numa janela)."""
+    def __init__(self, window: int = 14):
+        self.pv = RollingSum(window)
+        self.volume = RollingSum(window)
+
+    @staticmethod
+    def _vwap(pv: float, volume: float) -> float | None:
+        return pv / volume if volume != 0 else None
+
+    def update(self, high: float, low: float, close: float, volume: float) -> float | None:
+        typical = (high + low + close) / 3.0
+        pv, vol = self.pv.update(typical * volume), self.volume.update(volume)
+        return self._vwap(pv, vol) if self.volume.full else None
+
+    def peek(self, high: float, low: float, close: float, volume: float) -> float | None:
+        if len(self.volume.items) + 1 < self.volume.window:
+            return None
+        typical = (high + low + close) / 3.0
+        return self._vwap(self.pv.peek(typical * volume), self.volume.peek(volume))
+
+
+class StreamingSignal:
+    """
+    Base para a versão streaming de uma estratégia.
+
+    Cada subclasse define `_compute(candle, commit)`, que devolve o "instantâneo" dos
+    indicadores para uma vela, e `_decide(prev, last)`, que aplica a mesma regra de sinal
+    usada pelo `analyze()` do módulo. Assim:
+      - update(candle) confirma uma vela fechada e retorna o sinal dessa vela;
+      - peek(candle) retorna o sinal que a vela ainda aberta produziria.
+    """
+    # Estratégias que só olham para a última vela (ex: Bollinger) não precisam do valor anterior
+    needs_prev = True
+
+    def __init__(self):
+        self._last = None
+
+    def _compute(self, candle: dict, commit: bool):
+        raise NotImplementedError
+
+    def _decide(self, prev, last) -> str | None:
+        raise NotImplementedError
+
+    def _signal(self, prev, last) -> str | None:
+        if last is None or (self.needs_prev and prev is None):
+            return None
+        return self._decide(prev, last)
+
+    def update(self, candle: dict) -> str | None:
+        last = self._compute(candle, commit=True)
+        prev, self._last = self._last, last
+        return self._signal(prev, last)
+
+    def peek(self, candle: dict) -> str | None:
+        return self._signal(self._last, self._compute(candle, commit=False))
+
+    def replay(self, candles: dict) -> str | None:
+        """
+        Alimenta o histórico (dicionário de arrays, como CandleBuilder.get_arrays()) e
+        trata a última vela como a vela aberta: o resultado equivale ao analyze() do DataFrame.
+        """
+        columns = list(candles)
+        rows = [dict(zip(columns, values)) for values in zip(*candles.values())]
+        if not rows:
+            return None
+        for row in rows[:-1]:
+            self.update(row)
+        return self.peek(rows[-1])
+
+
+class ClosedBarStream:
+    """
+    Mantém um StreamingSignal em sincronia com as velas fechadas de um CandleBuilder.
+    Cada vela que fecha é confirmada com update(), em O(1); se o histórico fechado for
+    reescrito (ver CandleBuilder.history_version) o estado é reconstruído com as velas do buffer.
+    peek() dá o sinal da vela ainda aberta (estratégias TRIGGER_UPDATE).
+    """
+    def __init__(self, factory):
+        """:param factory: Chamável sem argumentos que cria um StreamingSignal novo."""
+        self.factory = factory
+        self.stream = None
+        self.signal = None
+        self._mark = None  # (history_version, epoch da última vela confirmada)
+
+    def update(self, builder) -> str | None:
+        """Sinal da última vela fechada, igual ao analyze() sobre as velas fechadas do builder."""
+        arrays = builder.get_arrays(closed_only=True)
+        epochs = arrays['epoch']
+        if len(epochs) == 0:
+            self.stream, self.signal, self._mark = None, None, None
+            return None
+
+        mark = (builder.history_version, int(epochs[-1]))
+        if mark == self._mark:
+            return self.signal
+
+        start = 0
+        if self.stream is not None and self._mark[0] == builder.history_version:
+            start = int(np.searchsorted(epochs, self._mark[1], side='right'))
+        if start == 0:
+            # Primeira vez, histórico reescrito ou velas perdidas entre chamadas: recomeça
+            self.stream = self.factory()
+        columns = list(arrays)
+        for i in range(start, len(epochs)):
+            self.signal = self.stream.update({col: arrays[col][i] for col in columns})
+        self._mark = mark
+        return self.signal
+
+    def peek(self, builder) -> str | None:
+        """Sinal da vela aberta, igual ao analyze() sobre todas as velas do builder (incluindo a aberta)."""
+        self.update(builder)
+        arrays = builder.get_arrays()
+        if len(arrays['epoch']) <= builder.closed_size or self.stream is None:
+            return None
+        return self.stream.peek({col: arr[-1] for col, arr in arrays.items()})
@@ -0,0 +1,163 @@
+# utils/trade_journal.py
+
+import asyncio
+import logging
+
+from tortoise.exceptions import FieldError, IntegrityError, ValidationError
+
+from models.trade import Trade
+
+logger = logging.getLogger(__name__)
+
+# Os trades são inseridos de uma só vez a cada BATCH_SIZE registos ou FLUSH_INTERVAL segundos
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 5.0
+# Máximo de trades à espera (ex: base de dados em baixo); acima disso os mais antigos são descartados
+MAX_BUFFER = 10000
+# Depois de MAX_FAILURES falhas seguidas, o lote é gravado trade a trade e os trades recusados
+# vão para a dead letter, em vez de bloquearem a fila para sempre
+MAX_FAILURES = 3
+# Após uma falha, a próxima tentativa espera flush_interval * 2^falhas, até MAX_BACKOFF segundos
+MAX_BACKOFF = 300.0
+# Erros que indicam um trade inválido (e não uma base de dados indisponível)
+DATA_ERRORS = (IntegrityError, ValidationError, FieldError, ValueError, TypeError)
+
+
+class TradeJournal:
+    """
+    Diário de trades com escrita diferida (write-behind).
+
+    record() só guarda o trade em memória e retorna logo: a sessão nunca espera pelo SQLite/Postgres.
+    Uma tarefa de fundo insere os trades pendentes com um único bulk_create a cada `batch_size`
+    trades ou `flush_interval` segundos. Se a escrita falhar, o lote volta para a frente da fila e
+    é tentado de novo com espera exponencial; após `max_failures` falhas seguidas é gravado trade
+    a trade, e os trades que a base de dados recusa são registados no log e guardados em
+    `dead_letters`, para não bloquearem os restantes.
+    """
+    def __init__(self, model=Trade, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_buffer: int = MAX_BUFFER, max_failures: int = MAX_FAILURES):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.max_failures = max(1, max_failures)
+        self._buffer: list = []
+        self._failures = 0  # Falhas seguidas de escrita
+        self.dead_letters: list[dict] = []  # Trades recusados pela base de dados (campos + erro)
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._lock: asyncio.Lock | None = None
+        self.stats = {'recorded': 0, 'written': 0, 'batches': 0, 'failed': 0, 'dropped': 0, 'dead': 0}
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, **fields):
+        """Junta um trade (campos do modelo Trade) à fila de escrita, sem esperar."""
+        self._buffer.append(self.model(**fields))
+        self.stats['recorded'] += 1
+        self._trim()
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _trim(self):
+        if len(self._buffer) > self.max_buffer:
+            excess = len(self._buffer) - self.max_buffer
+            del self._buffer[:excess]
+            self.stats['dropped'] += excess
+            logger.error("Diário de trades cheio: %d trades descartados.", excess)
+
+    def _requeue(self, rows: list):
+        """Devolve trades não gravados à frente da fila (são os mais antigos)."""
+        self._buffer[:0] = rows
+        self._trim()
+
+    async def _run(self):
+        while True:
+            if self._failures:
+                # Espera exponencial: lotes cheios não antecipam a nova tentativa
+                await asyncio.sleep(min(self.flush_interval * 2 ** self._failures, MAX_BACKOFF))
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Escreve já os trades pendentes. :return: Número de trades escritos."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            written = 0
+            while self._buffer:
+                # O lote sai da fila antes do await: record() pode descartar a cabeça da fila entretanto
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:len(batch)]
+                try:
+                    await self.model.bulk_create(batch)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    self._failures += 1
+                    logger.error("Falha ao gravar %d trades (%d seguidas): %s", len(batch), self._failures, e)
+                    if self._failures < self.max_failures:
+                        # Volta à fila para a próxima tentativa (a base de dados pode estar a reiniciar)
+                        self._requeue(batch)
+                        break
+                    saved = await self._write_rows(batch)
+                    if saved is None:
+                        break
+                    written += saved
+                    continue
+                self._failures = 0
+                written += len(batch)
+                self.stats['written'] += len(batch)
+                self.stats['batches'] += 1
+            return written
+
+    async def _write_rows(self, batch: list) -> int | None:
+        """
+        Grava um lote que falhou repetidamente, trade a trade. Os trades recusados vão para a dead letter.
+        Se nenhum passar e nenhum erro for de dados, a base de dados está em baixo: o lote volta à fila.
+
+        :return: Número de trades gravados, ou None se o lote voltou à fila.
+        """
+        saved, rejected = 0, []
+        for row in batch:
+            try:
+                await row.save()
+            except Exception as e:
+                rejected.append((row, e))
+            else:
+                saved += 1
+        if not saved and not any(isinstance(e, DATA_ERRORS) for _, e in rejected):
+            self._requeue(batch)
+            return None
+        self._failures = 0
+        self.stats['written'] += saved
+        for row, e in rejected:
+            fields = {name: value for name, value in vars(row).items() if not name.startswith('_')}
+            self.dead_letters.append({'fields': fields, 'error': repr(e)})
+            self.stats['dead'] += 1
+            logger.error("Trade recusado pela base de dados, posto de lado: %s (%r)", e, fields,
+                         extra={'user_id': fields.get('user_id')})
+        del self.dead_letters[:-self.max_buffer]
+        return saved
+
+    async def close(self):
+        """Para a tarefa de fundo e grava o que falta (ex: no shutdown, antes de fechar a base de dados)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error("%d trades não foram gravados no shutdown.", len(self._buffer))